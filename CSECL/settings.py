@@ -90,6 +90,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # 并发写入时等待写锁的秒数（默认5秒）
+        'OPTIONS': {'timeout': 20},
+        # 测试库使用文件而非共享内存库：多线程测试需要文件库的锁等待，共享内存库会直接报 table is locked
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -114,6 +118,40 @@ DATABASES = {
 #         #'ATOMIC_REQUESTS': True,  # 启用自动事务
 #     }
 
+# 缓存：帖子列表版本号、评论 ETag、未读计数、限流计数等由多个进程（多个 Web worker、通知 worker、清理任务）
+# 共同读写，必须使用跨进程共享的后端，不能用默认的进程内 LocMemCache（一个进程的失效另一个进程看不到）
+# - 生产环境设置 REDIS_URL 使用 Redis（单次读写约 0.1ms）
+# - 未设置时使用数据库缓存表（由迁移 0014 创建），同样跨进程一致，但每次写缓存都是一次数据库写事务；
+#   其 incr 是先读后写、并发时丢失更新，因此未读计数不走缓存（直接查询数据库），版本号写入新的唯一值
+#   （见 interview.service.forum.cache_has_atomic_incr）
+# 限流计数（throttle）每个写请求都要读写，单独使用支持原子 incr 的低延迟后端：有 Redis 时用 Redis，
+# 否则用进程内 LocMemCache（每个进程各自计数，多进程部署时实际上限为 进程数 × 速率，生产环境应设置 REDIS_URL）
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        },
+        'throttle': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'throttle',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+        'throttle': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'throttle',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        },
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -206,6 +244,20 @@ REST_FRAMEWORK = {
     # 'DEFAULT_AUTHENTICATION_CLASSES': ['Login.service.jwt.JWTQueryParamsAuthentication', ],
     # 异常返回格式控制
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
+    # 应用前的可信反向代理层数：限流按 X-Forwarded-For 右起第 N 个地址识别客户端；
+    # 直连（0）时只用 REMOTE_ADDR，不信任客户端可伪造的 X-Forwarded-For
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
+    # 论坛写接口限流（interview.throttling）：<scope> 按用户，<scope>_ip 按 IP，超限返回 429
+    'DEFAULT_THROTTLE_RATES': {
+        'post_create': '10/min',
+        'post_create_ip': '60/min',
+        'comment_create': '30/min',
+        'comment_create_ip': '120/min',
+        'like': '120/min',
+        'like_ip': '600/min',
+        'announcement': '10/min',
+        'announcement_ip': '30/min',
+    },
 }
 
 # python manage.py runserver
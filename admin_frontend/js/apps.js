@@ -2,6 +2,7 @@
 let currentPage = 1;
 let currentAppId = null;
 let currentData = [];
+let currentQueryUrl = '';  // 当前列表的查询地址，导出时附加 view=full 获取全部字段
 
 document.addEventListener('DOMContentLoaded', function() {
   checkLoginStatus();
@@ -22,6 +23,8 @@ function bindEvents() {
   document.getElementById('searchBtn').addEventListener('click', () => { currentPage = 1; loadData(); });
   document.getElementById('addBtn').addEventListener('click', () => { openAddModal(); });
   document.getElementById('exportBtn').addEventListener('click', exportData);
+  document.getElementById('importBtn').addEventListener('click', () => { document.getElementById('importFile').click(); });
+  document.getElementById('importFile').addEventListener('change', importData);
   document.getElementById('logout').addEventListener('click', logout);
   document.getElementById('prevBtn').addEventListener('click', () => { if (currentPage > 1) { currentPage--; loadData(); } });
   document.getElementById('nextBtn').addEventListener('click', () => { currentPage++; loadData(); });
@@ -47,16 +50,19 @@ async function loadData() {
     }
 
     if (searchName) {
-      const response = await fetch(`/admin/applications/by-name/?name=${searchName}`, { credentials: 'include' });
+      params.append('name', searchName);
+      currentQueryUrl = `/admin/applications/by-name/?${params}`;
+      const response = await fetch(currentQueryUrl, { credentials: 'include' });
       const data = await response.json();
-      if (data.success) { currentData = data.data; renderTable(data.data); updateStats(data.data); clearMessage(); } else { showMessage(data.message, 'error'); }
+      if (data.success) { currentData = data.data; renderTable(data.data); updatePagination(data.pagination); updateStats(data.data); clearMessage(); } else { showMessage(data.message, 'error'); }
       return;
     }
 
     if (direction) params.append('direction', direction);
     if (grade) params.append('grade', grade);
 
-    const response = await fetch(`/admin/applications/?${params}`, { credentials: 'include' });
+    currentQueryUrl = `/admin/applications/?${params}`;
+    const response = await fetch(currentQueryUrl, { credentials: 'include' });
     if (response.status === 401) { showMessage('登录已过期，请重新登录', 'error'); setTimeout(() => { window.location.href = 'index.html'; }, 2000); return; }
     const data = await response.json();
     if (data.success) { currentData = data.data; renderTable(data.data); updatePagination(data.pagination); updateStats(data.data); clearMessage(); } else { showMessage(data.message || '加载失败', 'error'); }
@@ -175,13 +181,25 @@ async function handleAddSubmit(e) {
 }
 
 // 导出数据功能
-function exportData() {
+async function exportData() {
   if (currentData.length === 0) {
     showMessage('没有数据可导出', 'error');
     return;
   }
 
-  const csvContent = generateCSV(currentData);
+  // 列表只返回表格展示的列，导出时按同样的条件取全部字段
+  let rows;
+  try {
+    const response = await fetch(`${currentQueryUrl}&view=full`, { credentials: 'include' });
+    const data = await response.json();
+    if (!data.success) { showMessage(data.message || '导出失败', 'error'); return; }
+    rows = data.data;
+  } catch (e) {
+    showMessage('网络错误', 'error');
+    return;
+  }
+
+  const csvContent = generateCSV(rows);
   const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
   const link = document.createElement('a');
   const url = URL.createObjectURL(blob);
@@ -194,6 +212,28 @@ function exportData() {
   showMessage('数据导出成功', 'success');
 }
 
+// 批量导入 CSV / XLSX（表头可使用导出文件的列名），完成后显示导入结果和前几条错误
+async function importData(e) {
+  const file = e.target.files[0];
+  e.target.value = '';
+  if (!file) return;
+  const formData = new FormData();
+  formData.append('file', file);
+  try {
+    showMessage('导入中...', 'info');
+    const response = await fetch('/admin/applications/import/', { method: 'POST', body: formData, credentials: 'include' });
+    const data = await response.json();
+    if (!data.success) { showMessage(data.message || '导入失败', 'error'); return; }
+    const errors = data.errors.slice(0, 5).map(err => `第${err.row}行：${err.message}`).join('；');
+    const summary = `共 ${data.total} 行，导入 ${data.created} 行，失败 ${data.failed} 行`;
+    currentPage = 1;
+    await loadData();
+    showMessage(errors ? `${summary}。${errors}${data.failed > 5 ? '……' : ''}` : summary, data.failed ? 'error' : 'success');
+  } catch (err) {
+    showMessage('网络错误', 'error');
+  }
+}
+
 function generateCSV(data) {
   const headers = ['ID', '姓名', '学号', '年级', '专业班级', '手机号', '邮箱', '高考数学', '高考英语', '意向方向', '擅长领域', '报名原因', '未来规划', '项目经历', '其他实验室', '分数', '备注', '报名时间'];
   const rows = data.map(item => [
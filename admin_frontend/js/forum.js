@@ -4,6 +4,10 @@ document.addEventListener('DOMContentLoaded', () => {
   load();
   document.getElementById('prevBtn').addEventListener('click', ()=>{ if(page>1){ page--; load(); }});
   document.getElementById('nextBtn').addEventListener('click', ()=>{ page++; load(); });
+  document.getElementById('selectAll').addEventListener('change', e=>{
+    document.querySelectorAll('.row-check').forEach(c=>{ c.checked = e.target.checked; });
+  });
+  document.getElementById('bulkBtn').addEventListener('click', bulk);
 });
 
 async function load(){
@@ -19,9 +23,11 @@ async function load(){
 
 function render(list){
   const tb = document.getElementById('postTable');
-  if(!list || list.length===0){ tb.innerHTML = `<tr><td colspan="8" style="text-align:center; padding:40px; color:#999;">暂无数据</td></tr>`; return; }
+  if(!list || list.length===0){ tb.innerHTML = `<tr><td colspan="9" style="text-align:center; padding:40px; color:#999;">暂无数据</td></tr>`; return; }
+  document.getElementById('selectAll').checked = false;
   tb.innerHTML = list.map(p=>`
     <tr>
+      <td><input type="checkbox" class="row-check" value="${p.id}"></td>
       <td>
         <div class="actions">
           <button class="btn btn-primary" onclick="pin(${p.id})" title="置顶/取消置顶"><i class="fas fa-thumbtack"></i></button>
@@ -44,6 +50,24 @@ async function pin(id){ await action(`/admin/forum/posts/${id}/pin/`); }
 async function feature(id){ await action(`/admin/forum/posts/${id}/feature/`); }
 async function del(id){ if(!confirm('确定删除该帖子吗？')) return; await action(`/admin/forum/posts/${id}/delete/`); }
 
+// 选中的帖子一次请求批量处理
+async function bulk(){
+  const ids = [...document.querySelectorAll('.row-check:checked')].map(c=>Number(c.value));
+  if(ids.length===0){ show('error','请先选择帖子'); return; }
+  const act = document.getElementById('bulkAction').value;
+  if(act==='delete' && !confirm(`确定删除选中的 ${ids.length} 个帖子吗？`)) return;
+  try{
+    const res = await fetch('/admin/forum/posts/bulk/', {
+      method:'POST', credentials:'include',
+      headers:{ 'Content-Type':'application/json' },
+      body: JSON.stringify({ action: act, ids })
+    });
+    const data = await res.json();
+    if(data.success){ show('success',`操作成功，影响 ${data.affected} 个帖子`); load(); }
+    else { show('error', data.message||'操作失败'); }
+  }catch(e){ show('error','网络错误'); }
+}
+
 async function action(url){
   try{
     const res = await fetch(url, { method:'POST', credentials:'include' });
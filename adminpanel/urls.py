@@ -12,6 +12,7 @@ urlpatterns = [
     # applications CRUD + extras
     path('applications/', views.application_list, name='admin_application_list'),
     path('applications/create/', views.application_create, name='admin_application_create'),
+    path('applications/import/', views.application_import, name='admin_application_import'),
     path('applications/<int:app_id>/', views.application_detail, name='admin_application_detail'),
     path('applications/<int:app_id>/update/', views.application_update, name='admin_application_update'),
     path('applications/<int:app_id>/delete/', views.application_delete, name='admin_application_delete'),
@@ -32,7 +33,9 @@ urlpatterns = [
 
     # forum admin
     path('forum/posts/', views.forum_posts, name='admin_forum_posts'),
+    path('forum/posts/bulk/', views.forum_posts_bulk, name='admin_forum_posts_bulk'),
     path('forum/posts/<int:post_id>/pin/', views.forum_post_pin, name='admin_forum_post_pin'),
     path('forum/posts/<int:post_id>/feature/', views.forum_post_feature, name='admin_forum_post_feature'),
     path('forum/posts/<int:post_id>/delete/', views.forum_post_delete, name='admin_forum_post_delete'),
+    path('forum/comments/<int:comment_id>/delete/', views.forum_comment_delete, name='admin_forum_comment_delete'),
 ]
\ No newline at end of file
@@ -5,9 +5,14 @@ from django.contrib.auth import login as dj_login, logout as dj_logout, authenti
 from django.core.paginator import Paginator
 from interview.models import StudentApplication
 from interview.models import Post
-from interview.service.forum import NotificationService
+from interview.service.application_import import ApplicationImportService, IMPORT_FORMATS, detect_format
+from interview.service.application_search import ApplicationSearchService
+from interview.service.forum import (NotificationService, PostService, CommentService, BULK_ACTIONS,
+                                     BULK_MODERATION_LIMIT)
 from interview.services import interview_services
+from interview.serializers import application_summary_values, application_detail_values
 from django.core.cache import cache
+from django.db import transaction
 import json
 
 
@@ -21,6 +26,7 @@ def admin_index(request):
             'logout': '/admin/auth/logout/',
             'applications_list': '/admin/applications/',
             'applications_create': '/admin/applications/create/',
+            'applications_import': '/admin/applications/import/',
             'application_detail': '/admin/applications/<id>/',
             'application_update': '/admin/applications/<id>/update/',
             'application_delete': '/admin/applications/<id>/delete/',
@@ -33,7 +39,8 @@ def admin_index(request):
             'forum_posts': '/admin/forum/posts/',
             'forum_post_pin': '/admin/forum/posts/<id>/pin/',
             'forum_post_feature': '/admin/forum/posts/<id>/feature/',
-            'forum_post_delete': '/admin/forum/posts/<id>/delete/'
+            'forum_post_delete': '/admin/forum/posts/<id>/delete/',
+            'forum_comment_delete': '/admin/forum/comments/<id>/delete/'
         }
     })
 
@@ -67,6 +74,18 @@ def _require_login(request):
     if not getattr(request, 'user', None) or not request.user.is_authenticated:
         return JsonResponse({"success": False, "message": "未登录"}, status=401)
     return None
+
+
+# 报名列表的返回视图：summary 只含表格展示的列（默认），full 为全部字段（导出用）
+APPLICATION_VIEWS = {'summary': application_summary_values, 'full': application_detail_values}
+# 按姓名检索每页的最大条数
+APPLICATION_PAGE_SIZE_LIMIT = 100
+
+
+def _application_values(request):
+    return APPLICATION_VIEWS.get(request.GET.get('view') or 'summary')
+
+
 # --- Forum admin: list & actions ---
 @require_http_methods(["GET"])
 def forum_posts(request):
@@ -103,13 +122,12 @@ def forum_post_pin(request, post_id: int):
     not_logged = _require_login(request)
     if not_logged:
         return not_logged
-    try:
-        post = Post.objects.get(id=post_id)
-        post.is_sticky = not post.is_sticky
-        post.save()
-        return JsonResponse({'success': True, 'is_sticky': post.is_sticky})
-    except Post.DoesNotExist:
+    is_sticky = Post.objects.filter(id=post_id).values_list('is_sticky', flat=True).first()
+    if is_sticky is None:
         return JsonResponse({'success': False, 'message': '帖子不存在'}, status=404)
+    # 与批量管理相同：条件 UPDATE 只写置顶字段，不会用读到的旧值覆盖并发更新的计数
+    PostService.bulk_moderate('unpin' if is_sticky else 'pin', [post_id])
+    return JsonResponse({'success': True, 'is_sticky': not is_sticky})
 
 
 @csrf_exempt
@@ -118,15 +136,12 @@ def forum_post_feature(request, post_id: int):
     not_logged = _require_login(request)
     if not_logged:
         return not_logged
-    try:
-        post = Post.objects.get(id=post_id)
-        if hasattr(post, 'is_featured'):
-            post.is_featured = not post.is_featured
-            post.save()
-            return JsonResponse({'success': True, 'is_featured': post.is_featured})
-        return JsonResponse({'success': False, 'message': '未支持加精字段'}, status=400)
-    except Post.DoesNotExist:
+    is_featured = Post.objects.filter(id=post_id).values_list('is_featured', flat=True).first()
+    if is_featured is None:
         return JsonResponse({'success': False, 'message': '帖子不存在'}, status=404)
+    # 加精字段与热度分在同一条 UPDATE 中修改
+    PostService.bulk_moderate('unfeature' if is_featured else 'feature', [post_id])
+    return JsonResponse({'success': True, 'is_featured': not is_featured})
 
 
 @csrf_exempt
@@ -135,12 +150,45 @@ def forum_post_delete(request, post_id: int):
     not_logged = _require_login(request)
     if not_logged:
         return not_logged
-    try:
-        post = Post.objects.get(id=post_id)
-        post.delete()
-        return JsonResponse({'success': True})
-    except Post.DoesNotExist:
+    # 评论、点赞、通知由 purge_deleted_posts 后台清理
+    if not PostService.delete_posts([post_id]):
         return JsonResponse({'success': False, 'message': '帖子不存在'}, status=404)
+    PostService.bump_feed_version()
+    return JsonResponse({'success': True})
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def forum_comment_delete(request, comment_id: int):
+    not_logged = _require_login(request)
+    if not_logged:
+        return not_logged
+    # 同一事务内删除评论与搜索索引，并原子递减帖子评论计数
+    if not CommentService.delete_comments([comment_id]):
+        return JsonResponse({'success': False, 'message': '评论不存在'}, status=404)
+    return JsonResponse({'success': True})
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def forum_posts_bulk(request):
+    """批量管理帖子：{"action": "pin|unpin|feature|unfeature|delete", "ids": [1, 2, 3]}"""
+    not_logged = _require_login(request)
+    if not_logged:
+        return not_logged
+    try:
+        payload = json.loads(request.body.decode('utf-8') or '{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'message': '请求数据格式错误，需要有效的 JSON'}, status=400)
+    action = payload.get('action')
+    ids = payload.get('ids')
+    if action not in BULK_ACTIONS:
+        return JsonResponse({'success': False, 'message': f"action 只能为 {'、'.join(BULK_ACTIONS)}"}, status=400)
+    if (not isinstance(ids, list) or not ids or len(ids) > BULK_MODERATION_LIMIT
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+        return JsonResponse({'success': False, 'message': f'ids 必须为非空整数数组，且不超过 {BULK_MODERATION_LIMIT} 个'},
+                            status=400)
+    return JsonResponse(PostService.bulk_moderate(action, ids))
 
 
 # --- Applications: Read list ---
@@ -157,44 +205,26 @@ def application_list(request):
     direction = request.GET.get('direction')
     grade = request.GET.get('grade')
 
-    qs = StudentApplication.objects.all().order_by('-created_at')
+    values = _application_values(request)
+    if values is None:
+        return JsonResponse({'success': False, 'message': 'view 只能为 summary 或 full'}, status=400)
+
+    qs = StudentApplication.objects.all().order_by('-created_at', '-id')
     if keyword:
-        qs = qs.filter(number__icontains=keyword)
+        # 学号前缀检索走检索词索引
+        qs = ApplicationSearchService.filter_by_number(qs, keyword)
     if direction:
         qs = qs.filter(follow_direction__icontains=direction)
     if grade:
         qs = qs.filter(grade=grade)
 
-    paginator = Paginator(qs, page_size)
+    # 只查询返回的列，列表默认不加载大文本字段
+    paginator = Paginator(qs.values_list(*values.columns()), page_size)
     page_obj = paginator.get_page(page)
 
-    def to_dict(obj: StudentApplication):
-        return {
-            'id': obj.id,
-            'name': obj.name,
-            'number': obj.number,
-            'grade': obj.grade,
-            'major': obj.major,
-            'phone_number': obj.phone_number,
-            'email': getattr(obj, 'email', None),
-            'gaokao_math': obj.gaokao_math,
-            'gaokao_english': obj.gaokao_english,
-            'follow_direction': obj.follow_direction,
-            'good_at': obj.good_at,
-            'reason': obj.reason,
-            'future': obj.future,
-            'experience': getattr(obj, 'experience', None),
-            'other_lab': getattr(obj, 'other_lab', None),
-            'value': obj.value,
-            'admin_remark': getattr(obj, 'admin_remark', None),
-            'book_time': obj.book_time,
-            'created_at': obj.created_at,
-        }
-
-    data = [to_dict(x) for x in page_obj.object_list]
     return JsonResponse({
         'success': True,
-        'data': data,
+        'data': values.serialize_rows(page_obj.object_list),
         'pagination': {
             'current_page': page_obj.number,
             'total_pages': paginator.num_pages,
@@ -207,42 +237,38 @@ def application_list(request):
 # --- Applications: Query by name ---
 @require_http_methods(["GET"])
 def application_by_name(request):
-    """Query applications by exact or fuzzy student name."""
+    """Query applications by exact or fuzzy student name, ranked and paginated."""
     not_logged = _require_login(request)
     if not_logged:
         return not_logged
 
+    try:
+        page = int(request.GET.get('page', 1))
+        page_size = max(1, min(int(request.GET.get('page_size', 10)), APPLICATION_PAGE_SIZE_LIMIT))
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'page 和 page_size 必须为整数'}, status=400)
     name = (request.GET.get('name') or '').strip()
     if not name:
         return JsonResponse({'success': False, 'message': 'name 不能为空'}, status=400)
 
-    qs = StudentApplication.objects.filter(name__icontains=name).order_by('-created_at')
-
-    def to_dict(obj: StudentApplication):
-        return {
-            'id': obj.id,
-            'name': obj.name,
-            'number': obj.number,
-            'grade': obj.grade,
-            'major': obj.major,
-            'phone_number': obj.phone_number,
-            'email': getattr(obj, 'email', None),
-            'gaokao_math': obj.gaokao_math,
-            'gaokao_english': obj.gaokao_english,
-            'follow_direction': obj.follow_direction,
-            'good_at': obj.good_at,
-            'reason': obj.reason,
-            'future': obj.future,
-            'experience': getattr(obj, 'experience', None),
-            'other_lab': getattr(obj, 'other_lab', None),
-            'value': obj.value,
-            'admin_remark': getattr(obj, 'admin_remark', None),
-            'book_time': obj.book_time,
-            'created_at': obj.created_at,
-        }
+    values = _application_values(request)
+    if values is None:
+        return JsonResponse({'success': False, 'message': 'view 只能为 summary 或 full'}, status=400)
 
-    data = [to_dict(x) for x in qs]
-    return JsonResponse({'success': True, 'data': data})
+    qs = ApplicationSearchService.filter_by_name(StudentApplication.objects.all(), name)
+    paginator = Paginator(qs.values_list(*values.columns()), page_size)
+    page_obj = paginator.get_page(page)
+
+    return JsonResponse({
+        'success': True,
+        'data': values.serialize_rows(page_obj.object_list),
+        'pagination': {
+            'current_page': page_obj.number,
+            'total_pages': paginator.num_pages,
+            'total_items': paginator.count,
+            'page_size': page_size
+        }
+    })
 
 
 # --- Applications: Result by number (reuse interview_services) ---
@@ -271,23 +297,46 @@ def application_create(request):
         payload = json.loads(request.body.decode('utf-8') or '{}')
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'message': '请求数据格式错误，需要有效的 JSON'}, status=400)
-    obj = StudentApplication.objects.create(
-        name=payload.get('name') or '',
-        number=payload.get('number') or '',
-        grade=payload.get('grade') or '',
-        phone_number=payload.get('phone_number') or '',
-        gaokao_math=int(payload.get('gaokao_math') or 0),
-        gaokao_english=int(payload.get('gaokao_english') or 0),
-        follow_direction=payload.get('follow_direction') or '',
-        good_at=payload.get('good_at') or '',
-        reason=payload.get('reason') or '',
-        future=payload.get('future') or '',
-        value=str(payload.get('value') or ''),
-        admin_remark=payload.get('admin_remark') or '',
-    )
+    with transaction.atomic():
+        obj = StudentApplication.objects.create(
+            name=payload.get('name') or '',
+            number=payload.get('number') or '',
+            grade=payload.get('grade') or '',
+            phone_number=payload.get('phone_number') or '',
+            gaokao_math=int(payload.get('gaokao_math') or 0),
+            gaokao_english=int(payload.get('gaokao_english') or 0),
+            follow_direction=payload.get('follow_direction') or '',
+            good_at=payload.get('good_at') or '',
+            reason=payload.get('reason') or '',
+            future=payload.get('future') or '',
+            value=str(payload.get('value') or ''),
+            admin_remark=payload.get('admin_remark') or '',
+        )
+        ApplicationSearchService.index(obj)
     return JsonResponse({'success': True, 'id': obj.id})
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def application_import(request):
+    """Bulk import applications from an uploaded CSV/XLSX file (multipart field "file")."""
+    not_logged = _require_login(request)
+    if not_logged:
+        return not_logged
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'success': False, 'message': '请上传文件（字段名 file）'}, status=400)
+    file_format = request.POST.get('format') or detect_format(upload.name)
+    if file_format not in IMPORT_FORMATS:
+        return JsonResponse({'success': False, 'message': '只支持 CSV 或 XLSX 文件'}, status=400)
+    report = ApplicationImportService.import_file(
+        upload, file_format,
+        encoding=request.POST.get('encoding') or 'utf-8-sig',
+        dry_run=request.POST.get('dry_run') in ('1', 'true'),
+    )
+    return JsonResponse(report, status=200 if report['success'] else 400)
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def application_update(request, app_id: int):
@@ -311,7 +360,10 @@ def application_update(request, app_id: int):
         obj.gaokao_math = int(payload.get('gaokao_math') or 0)
     if 'gaokao_english' in payload:
         obj.gaokao_english = int(payload.get('gaokao_english') or 0)
-    obj.save()
+    with transaction.atomic():
+        obj.save()
+        if 'name' in payload or 'number' in payload:
+            ApplicationSearchService.index(obj)
     return JsonResponse({'success': True})
 
 
@@ -323,7 +375,9 @@ def application_delete(request, app_id: int):
     if not_logged:
         return not_logged
     try:
-        StudentApplication.objects.get(id=app_id).delete()
+        with transaction.atomic():
+            StudentApplication.objects.get(id=app_id).delete()
+            ApplicationSearchService.remove([app_id])
         return JsonResponse({'success': True})
     except StudentApplication.DoesNotExist:
         return JsonResponse({'success': False, 'message': '记录不存在'}, status=404)
@@ -336,32 +390,11 @@ def application_detail(request, app_id: int):
     not_logged = _require_login(request)
     if not_logged:
         return not_logged
-    try:
-        obj = StudentApplication.objects.get(id=app_id)
-    except StudentApplication.DoesNotExist:
+    data = application_detail_values.serialize_rows(
+        StudentApplication.objects.filter(id=app_id).values_list(*application_detail_values.columns()))
+    if not data:
         return JsonResponse({'success': False, 'message': '记录不存在'}, status=404)
-
-    return JsonResponse({'success': True, 'data': {
-        'id': obj.id,
-        'name': obj.name,
-        'number': obj.number,
-        'grade': obj.grade,
-        'major': getattr(obj, 'major', None),
-        'phone_number': obj.phone_number,
-        'gaokao_math': obj.gaokao_math,
-        'gaokao_english': obj.gaokao_english,
-        'follow_direction': obj.follow_direction,
-        'good_at': obj.good_at,
-        'email': getattr(obj, 'email', None),
-        'other_lab': getattr(obj, 'other_lab', None),
-        'experience': getattr(obj, 'experience', None),
-        'reason': obj.reason,
-        'future': obj.future,
-        'value': obj.value,
-        'admin_remark': getattr(obj, 'admin_remark', None),
-        'book_time': obj.book_time,
-        'created_at': obj.created_at,
-    }})
+    return JsonResponse({'success': True, 'data': data[0]})
 
 
 # --- Applications: Score & Remark ---
@@ -445,15 +478,17 @@ def list_announcements(request):
     if not_logged:
         return not_logged
     # 读取最新20条公告（含广播），按时间倒序
-    from interview.models import Notification
-    qs = Notification.objects.filter(notification_type='announcement').order_by('-created_at')[:20]
+    from interview.models import Announcement
+    qs = Announcement.objects.order_by('-created_at')[:20]
     data = [{
-        'id': n.id,
-        'message': n.message,
-        'created_at': n.created_at,
-        'recipient_user_id': n.recipient_user_id,
-        'sender_user_id': n.sender_user_id,
-    } for n in qs]
+        'id': a.id,
+        'message': a.message,
+        'created_at': a.created_at,
+        'recipient_user_id': None if a.is_broadcast else f'共{a.recipient_count}人',
+        'recipient_count': a.recipient_count,
+        'is_broadcast': a.is_broadcast,
+        'sender_user_id': a.sender_user_id,
+    } for a in qs]
     return JsonResponse({'success': True, 'data': data})
 
 
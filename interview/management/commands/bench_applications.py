@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.http import JsonResponse
+
+from interview.models import StudentApplication
+from interview.serializers import application_summary_values, application_detail_values
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = '报名列表基准测试：对比加载整行与只查询列表列的响应体大小和耗时（数据在事务中生成并回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='生成的报名数量')
+        parser.add_argument('--sizes', default='10,100,1000', help='逗号分隔的每页行数')
+        parser.add_argument('--repeat', type=int, default=5, help='每个规模重复次数，取最小值')
+
+    def handle(self, *args, **options):
+        sizes = [int(x) for x in options['sizes'].split(',') if x.strip()]
+        self.stdout.write(f"{'rows':>6} {'full bytes':>12} {'summary bytes':>14} {'full ms':>9} {'summary ms':>11} {'speedup':>8}")
+        try:
+            with transaction.atomic():
+                self._run(options['rows'], sizes, options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, count, sizes, repeat):
+        StudentApplication.objects.bulk_create([
+            StudentApplication(
+                name=f'学生{i}', number=f'2024{i:06d}', grade='大一', major='计算机2401班', other_lab='无',
+                email=f's{i}@example.com', phone_number=f'138{i:08d}', gaokao_math=120, gaokao_english=130,
+                follow_direction='后端', future='继续深造', good_at='擅长领域' * 50, reason='申请理由' * 150,
+                experience='项目经历' * 200, admin_remark='备注' * 50,
+            ) for i in range(count)
+        ], batch_size=500)
+        queryset = StudentApplication.objects.order_by('-created_at', '-id')
+
+        for size in sizes:
+            # 改造前：加载整行模型实例并输出全部字段
+            full = lambda: JsonResponse({'data': application_detail_values.serialize_objects(queryset[:size])})
+            summary = lambda: JsonResponse({'data': application_summary_values.serialize_rows(
+                queryset.values_list(*application_summary_values.columns())[:size])})
+            full_time, full_bytes = self._best(repeat, full)
+            summary_time, summary_bytes = self._best(repeat, summary)
+            self.stdout.write(
+                f'{size:>6} {full_bytes:>12} {summary_bytes:>14} {full_time * 1000:>9.2f} '
+                f'{summary_time * 1000:>11.2f} {full_time / summary_time:>7.1f}x')
+
+    @staticmethod
+    def _best(repeat, func):
+        best = float('inf')
+        size = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            size = len(func().content)
+            best = min(best, time.perf_counter() - start)
+        return best, size
@@ -0,0 +1,59 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from interview.models import Post, Comment
+from interview.service.forum import CommentService
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = '评论树接口基准测试：在事务中生成不同规模的评论并回滚，输出耗时以验证线性增长'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,5000,10000,20000', help='逗号分隔的评论数量')
+        parser.add_argument('--repeat', type=int, default=3, help='每个规模重复次数，取最小值')
+
+    def handle(self, *args, **options):
+        sizes = [int(x) for x in options['sizes'].split(',') if x.strip()]
+        self.stdout.write(f"{'comments':>10} {'query+tree ms':>14} {'build ms':>10} {'us/comment':>11}")
+        for size in sizes:
+            try:
+                with transaction.atomic():
+                    total, build = self._run(size, options['repeat'])
+                    raise _Rollback
+            except _Rollback:
+                pass
+            self.stdout.write(f'{size:>10} {total * 1000:>14.1f} {build * 1000:>10.1f} {total / size * 1e6:>11.2f}')
+
+    def _run(self, size, repeat):
+        post = Post.objects.create(title='bench', content='bench')
+        rng = random.Random(size)
+        # 约 1/5 为顶层评论，其余随机回复已存在的评论
+        Comment.objects.bulk_create(
+            [Comment(post_id=post.id, user_id=f'u{i % 97}', content=f'c{i}') for i in range(size)],
+            batch_size=500,
+        )
+        ids = list(Comment.objects.filter(post_id=post.id).order_by('id').values_list('id', flat=True))
+        replies = []
+        for pos, cid in enumerate(ids):
+            if pos and rng.random() > 0.2:
+                replies.append(Comment(id=cid, parent_comment_id=ids[rng.randrange(pos)]))
+        Comment.objects.bulk_update(replies, ['parent_comment_id'], batch_size=500)
+
+        total = build = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            CommentService.get_comment_tree(post.id)
+            total = min(total, time.perf_counter() - start)
+
+            comments = list(Comment.objects.filter(post_id=post.id).order_by('created_at', 'id'))
+            start = time.perf_counter()
+            CommentService.build_comment_tree(comments)
+            build = min(build, time.perf_counter() - start)
+        return total, build
@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Substr
+
+from interview.models import Post, Comment, Notification
+from interview.serializers import (PostListSerializer, CommentSerializer, NotificationSerializer,
+                                   post_list_values, comment_values, notification_values)
+from interview.service.forum import POST_EXCERPT_LENGTH
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = '序列化基准测试：对比 ModelSerializer 与 .values_list() 快速序列化器的每秒行数（数据在事务中生成并回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100,1000', help='逗号分隔的每页行数')
+        parser.add_argument('--repeat', type=int, default=5, help='每个规模重复次数，取最小值')
+
+    def handle(self, *args, **options):
+        sizes = [int(x) for x in options['sizes'].split(',') if x.strip()]
+        self.stdout.write(f"{'target':>12} {'rows':>6} {'model rows/s':>14} {'values rows/s':>14} {'speedup':>8}")
+        try:
+            with transaction.atomic():
+                self._run(sizes, options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, sizes, repeat):
+        largest = max(sizes)
+        post = Post.objects.create(title='bench', content='bench')
+        Post.objects.bulk_create(
+            [Post(title=f'帖子{i}', content='正文' * 500, user_id=f'u{i % 97}') for i in range(largest)],
+            batch_size=500,
+        )
+        Comment.objects.bulk_create(
+            [Comment(post_id=post.id, user_id=f'u{i % 97}', content=f'评论{i}') for i in range(largest)],
+            batch_size=500,
+        )
+        Notification.objects.bulk_create(
+            [Notification(recipient_user_id='bench', sender_user_id=f'u{i % 97}', notification_type='reply',
+                          message=f'通知{i}', post_id=post.id) for i in range(largest)],
+            batch_size=500,
+        )
+
+        targets = [
+            ('post', PostListSerializer, post_list_values,
+             Post.objects.annotate(excerpt=Substr('content', 1, POST_EXCERPT_LENGTH)).defer('content')),
+            ('comment', CommentSerializer, comment_values, Comment.objects.filter(post_id=post.id)),
+            ('notification', NotificationSerializer, notification_values,
+             Notification.objects.filter(recipient_user_id='bench')),
+        ]
+        for name, serializer_class, values, queryset in targets:
+            for size in sizes:
+                model = self._best(repeat, lambda: serializer_class(queryset[:size], many=True).data)
+                fast = self._best(repeat, lambda: values.serialize_rows(
+                    queryset.values_list(*values.columns())[:size]))
+                self.stdout.write(
+                    f'{name:>12} {size:>6} {size / model:>14.0f} {size / fast:>14.0f} {model / fast:>7.1f}x')
+
+    @staticmethod
+    def _best(repeat, func):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
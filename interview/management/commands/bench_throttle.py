@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.decorators import api_view, throttle_classes
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from interview.throttling import write_throttles
+
+# 限流为每个写请求增加的耗时上限（微秒）
+OVERHEAD_BUDGET_US = 1000
+
+
+class Command(BaseCommand):
+    help = '限流基准测试：测量写接口限流在当前缓存后端上每个请求增加的耗时，超过 1ms 时以错误退出'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='每轮请求数')
+        parser.add_argument('--users', type=int, default=100, help='轮换使用的用户标识数量')
+        parser.add_argument('--repeat', type=int, default=5, help='重复次数，取最小值')
+        parser.add_argument('--scope', default='like', help='限流范围（REST_FRAMEWORK.DEFAULT_THROTTLE_RATES 中的键）')
+
+    def handle(self, *args, **options):
+        throttles = write_throttles(options['scope'])
+
+        @api_view(['POST'])
+        def plain(request):
+            return Response({'success': True})
+
+        @api_view(['POST'])
+        @throttle_classes(throttles)
+        def throttled(request):
+            return Response({'success': True})
+
+        factory = APIRequestFactory()
+        requests = [factory.post('/bench/', HTTP_X_USER_ID=f'bench-{i % options["users"]}',
+                                 REMOTE_ADDR=f'10.0.{i % options["users"] // 256}.{i % 256}')
+                    for i in range(options['requests'])]
+
+        checks = [throttle() for throttle in throttles]
+        self.stdout.write(f'限流缓存后端   {type(checks[0].cache).__name__}')
+        check_only = self._best(options['repeat'], lambda: [
+            throttle.allow_request(request, None) for request in requests for throttle in checks])
+        baseline = self._best(options['repeat'], lambda: [plain(request) for request in requests])
+        with_throttle = self._best(options['repeat'], lambda: [throttled(request) for request in requests])
+
+        count = len(requests)
+        overhead = (with_throttle - baseline) / count * 1e6
+        self.stdout.write(f'限流检查       {check_only / count * 1e6:8.1f} µs/请求')
+        self.stdout.write(f'无限流视图     {baseline / count * 1e6:8.1f} µs/请求')
+        self.stdout.write(f'有限流视图     {with_throttle / count * 1e6:8.1f} µs/请求')
+        message = f'增加耗时       {overhead:8.1f} µs/请求'
+        if overhead >= OVERHEAD_BUDGET_US:
+            raise CommandError(f'{message}，超出 {OVERHEAD_BUDGET_US} µs 的预算')
+        self.stdout.write(self.style.SUCCESS(message))
+
+    @staticmethod
+    def _best(repeat, func):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
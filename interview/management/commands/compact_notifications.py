@@ -0,0 +1,47 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from interview.service.forum import NotificationService, NOTIFICATION_RETENTION_DAYS
+
+
+class Command(BaseCommand):
+    help = ('通知压缩与归档：合并同一目标的重复点赞通知，并把超过保留期的已读通知分批移入归档表（或删除）；'
+            '建议每天定时执行（如 cron）')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=NOTIFICATION_RETENTION_DAYS, help='已读通知保留天数')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的通知数量（合并时为分组数量）')
+        parser.add_argument('--delete', action='store_true', help='直接删除过期的已读通知，不写归档表')
+        parser.add_argument('--skip-collapse', action='store_true', help='不合并点赞通知')
+        parser.add_argument('--sleep', type=float, default=0, help='批次之间的间隔（秒），降低对线上写入的影响')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        pause = options['sleep']
+
+        collapsed = 0
+        if not options['skip_collapse']:
+            while True:
+                deleted = NotificationService.collapse_like_notifications(batch_size)
+                if not deleted:
+                    break
+                collapsed += deleted
+                time.sleep(pause)
+
+        before = timezone.now() - timedelta(days=options['days'])
+        archived = 0
+        last_id = 0
+        while True:
+            count, last_id = NotificationService.archive_read_notifications(
+                before, last_id, batch_size, delete=options['delete'])
+            if last_id is None:
+                break
+            archived += count
+            time.sleep(pause)
+
+        action = '删除' if options['delete'] else '归档'
+        self.stdout.write(self.style.SUCCESS(
+            f'合并点赞通知 {collapsed} 条，{action} {options["days"]} 天前的已读通知 {archived} 条'))
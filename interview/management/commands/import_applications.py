@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from interview.service.application_import import (ApplicationImportService, IMPORT_CHUNK_SIZE, IMPORT_FORMATS,
+                                                  detect_format)
+
+
+class Command(BaseCommand):
+    help = '从 CSV / XLSX 文件批量导入报名：逐行校验，按块在事务中批量写入，输出逐行错误报告'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV 或 XLSX 文件路径')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='文件格式，默认按扩展名判断')
+        parser.add_argument('--encoding', default='utf-8-sig', help='CSV 编码（Excel 导出的中文 CSV 常为 gbk）')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='每个事务写入的行数')
+        parser.add_argument('--dry-run', action='store_true', help='只校验，不写入')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        if file_format is None:
+            raise CommandError('无法判断文件格式，请使用 --format 指定 csv 或 xlsx')
+        start = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as file:
+                report = ApplicationImportService.import_file(
+                    file, file_format, encoding=options['encoding'], chunk_size=max(1, options['chunk_size']),
+                    dry_run=options['dry_run'])
+        except OSError as e:
+            raise CommandError(f'无法读取文件：{e}')
+
+        for error in report['errors']:
+            self.stdout.write(f"第 {error['row']} 行（学号 {error['number'] or '-'}）：{error['message']}")
+        if report['errors_truncated']:
+            self.stdout.write('……错误过多，其余未列出')
+        action = '可导入' if options['dry_run'] else '导入'
+        summary = (f"共 {report['total']} 行，{action} {report['created']} 行，失败 {report['failed']} 行，"
+                   f'耗时 {time.perf_counter() - start:.2f}s')
+        if not report['success']:
+            raise CommandError(f"{report['message']}（{summary}）")
+        self.stdout.write(self.style.SUCCESS(summary))
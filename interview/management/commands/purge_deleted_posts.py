@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from interview.service.forum import PostService
+
+
+class Command(BaseCommand):
+    help = '后台清理已删除帖子（墓碑）的评论、点赞与通知：每批一个短事务，批次之间可暂停以让出写锁'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批删除的行数')
+        parser.add_argument('--sleep', type=float, default=0.05, help='批次之间的间隔（秒）')
+        parser.add_argument('--interval', type=float, default=5.0, help='没有待清理的墓碑时的轮询间隔（秒）')
+        parser.add_argument('--once', action='store_true', help='清理完当前积压后退出')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        purged = 0
+        try:
+            while True:
+                # 常驻进程：每批之前丢弃超过 CONN_MAX_AGE 或已失效的连接（如数据库重启、MySQL wait_timeout 断开）
+                close_old_connections()
+                count = PostService.purge_deleted_posts(batch_size)
+                purged += count
+                if count:
+                    time.sleep(options['sleep'])
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'共清理 {purged} 行'))
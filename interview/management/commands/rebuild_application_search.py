@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from interview.service.application_search import ApplicationSearchService, INDEX_BATCH_SIZE, lazy_pinyin
+
+
+class Command(BaseCommand):
+    help = '重建报名姓名/学号检索词：按主键分批重写，每批一个短事务，并清除已删除报名的检索词'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=INDEX_BATCH_SIZE, help='每批报名数量')
+
+    def handle(self, *args, **options):
+        if lazy_pinyin is None:
+            self.stdout.write('未安装 pypinyin，跳过拼音检索词')
+        start = time.perf_counter()
+        total = ApplicationSearchService.rebuild(max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f'已重建 {total} 条报名的检索词，耗时 {time.perf_counter() - start:.2f}s'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from interview.service.search import SearchService
+
+
+class Command(BaseCommand):
+    help = '清空并分批重建论坛全文搜索索引（SQLite FTS5；MySQL 的 FULLTEXT 索引由数据库自动维护）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批写入的帖子/评论数量')
+        parser.add_argument('--verbose-progress', action='store_true', help='输出每批的进度')
+
+    def handle(self, *args, **options):
+        if not SearchService.is_fts5():
+            self.stdout.write('当前数据库使用 FULLTEXT 索引，无需重建')
+            return
+        stdout = self.stdout if options['verbose_progress'] else None
+        total = SearchService.rebuild(max(1, options['batch_size']), stdout)
+        self.stdout.write(self.style.SUCCESS(f'已重建搜索索引，共 {total} 条'))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from interview.models import Post, Like
+from interview.service.forum import PostService, compute_hot_score, hot_score_expression
+
+
+class Command(BaseCommand):
+    help = '按帖子分批修正点赞数（取自 Like 表）并重算热度分，修正增量刷新遗漏或计数漂移；可定期执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的帖子数量')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        # 真实点赞数作为相关子查询写在 UPDATE 中，不会覆盖并发点赞做的 F('like_count') 增减
+        actual_likes = Coalesce(Subquery(
+            Like.objects.filter(post_id=OuterRef('pk')).order_by()
+            .values('post_id').annotate(n=Count('id')).values('n')
+        ), 0)
+        last_id = 0
+        checked = likes_fixed = updated = 0
+
+        while True:
+            ids = list(Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            checked += len(ids)
+            batch = Post.objects.filter(id__gte=ids[0], id__lte=last_id)
+
+            with transaction.atomic():
+                # 先修正点赞数，热度分按修正后的计数计算，两列保持一致
+                likes_fixed += batch.exclude(like_count=actual_likes).update(like_count=actual_likes)
+                posts = batch.only('id', 'comment_count', 'like_count', 'is_featured', 'created_at', 'hot_score')
+                changed = [post for post in posts if abs(post.hot_score - compute_hot_score(
+                    post.comment_count, post.like_count, post.is_featured, post.created_at)) > 1e-9]
+                # 热度分在 SQL 中按当前计数计算（与增量刷新相同），只更新有偏差的帖子
+                for post in changed:
+                    Post.objects.filter(pk=post.id).update(hot_score=hot_score_expression(post.created_at))
+            updated += len(changed)
+
+        if updated or likes_fixed:
+            PostService.bump_feed_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'共检查 {checked} 个帖子，修正 {likes_fixed} 个点赞数，更新 {updated} 个热度分'))
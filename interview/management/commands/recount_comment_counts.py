@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from interview.models import Post, Comment
+from interview.service.forum import PostService
+
+
+class Command(BaseCommand):
+    help = '按帖子分批重新统计 Post.comment_count，修正计数漂移'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的帖子数量')
+        parser.add_argument('--dry-run', action='store_true', help='只统计需要修正的帖子，不写入')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        dry_run = options['dry_run']
+        # 真实评论数作为相关子查询写在 UPDATE 中：读和写是同一条语句，
+        # 不会覆盖统计之后、写入之前 create_comment 做的 F('comment_count') + 1
+        actual = Coalesce(Subquery(
+            Comment.objects.filter(post_id=OuterRef('pk')).order_by()
+            .values('post_id').annotate(n=Count('id')).values('n')
+        ), 0)
+        last_id = 0
+        checked = fixed = 0
+
+        while True:
+            ids = list(Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            checked += len(ids)
+
+            drifted = Post.objects.filter(id__gte=ids[0], id__lte=last_id).exclude(comment_count=actual)
+            fixed += drifted.count() if dry_run else drifted.update(comment_count=actual)
+
+        if fixed and not dry_run:
+            PostService.bump_feed_version()
+        action = '需要修正' if dry_run else '已修正'
+        self.stdout.write(self.style.SUCCESS(f'共检查 {checked} 个帖子，{action} {fixed} 个评论计数'))
@@ -0,0 +1,61 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from interview.service.forum import NotificationService
+
+
+class Command(BaseCommand):
+    help = '通知发件箱 worker：线程池批量消费发件箱事件并生成通知'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='线程数量')
+        parser.add_argument('--batch-size', type=int, default=100, help='每批领取的事件数量')
+        parser.add_argument('--interval', type=float, default=1.0, help='发件箱为空时的轮询间隔（秒），即通知的最大延迟')
+        parser.add_argument('--once', action='store_true', help='处理完当前积压后退出')
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.processed = 0
+        self.lock = threading.Lock()
+        workers = max(1, options['workers'])
+
+        self.stdout.write(f'通知 worker 启动：{workers} 个线程，每批 {options["batch_size"]} 条')
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(self._run, options['batch_size'], options['interval'], options['once'])
+                for _ in range(workers)
+            ]
+            try:
+                while not all(f.done() for f in futures):
+                    time.sleep(0.2)
+            except KeyboardInterrupt:
+                self.stop.set()
+            for f in futures:
+                f.result()
+        self.stdout.write(self.style.SUCCESS(f'通知 worker 退出，共处理 {self.processed} 个事件'))
+
+    def _run(self, batch_size, interval, once):
+        worker_id = str(uuid.uuid4())
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    count = NotificationService.process_outbox(batch_size, worker_id)
+                except Exception as e:
+                    self.stderr.write(f'处理发件箱失败：{e}')
+                    count = 0
+                    if once:
+                        break
+                with self.lock:
+                    self.processed += count
+                if count == 0:
+                    if once:
+                        break
+                    self.stop.wait(interval)
+        finally:
+            connection.close()
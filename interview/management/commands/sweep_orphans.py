@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from interview.models import Post, Comment, Like, Notification
+from interview.service.forum import NotificationService
+from interview.service.search import SearchService
+
+
+class Command(BaseCommand):
+    help = ('一次性清理历史遗留的孤儿数据：所属帖子已不存在的评论、点赞、通知，以及所属评论已不存在的点赞；'
+            '按主键分段扫描，每段一次删除')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每段扫描的行数')
+        parser.add_argument('--sleep', type=float, default=0, help='段之间的间隔（秒）')
+        parser.add_argument('--dry-run', action='store_true', help='只统计，不删除')
+
+    def handle(self, *args, **options):
+        post_missing = ~Exists(Post.objects.filter(pk=OuterRef('post_id')))
+        comment_missing = ~Exists(Comment.objects.filter(pk=OuterRef('comment_id')))
+        # 先清评论，评论被清理后其点赞在后面一并成为孤儿
+        targets = [
+            ('评论', Comment, post_missing),
+            ('点赞', Like, Q(post_id__isnull=False) & post_missing | Q(comment_id__isnull=False) & comment_missing),
+            ('通知', Notification, Q(post_id__isnull=False) & post_missing),
+        ]
+        for label, model, condition in targets:
+            found = self._sweep(model, condition, options)
+            action = '发现' if options['dry_run'] else '删除'
+            self.stdout.write(f'{label}：{action}孤儿 {found} 条')
+        self.stdout.write(self.style.SUCCESS('孤儿数据清理完成'))
+
+    def _sweep(self, model, condition, options):
+        batch_size = max(1, options['batch_size'])
+        last_id = 0
+        total = 0
+        while True:
+            ids = list(model.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return total
+            last_id = ids[-1]
+            orphans = model.objects.filter(condition, pk__gte=ids[0], pk__lte=last_id).order_by()
+            if options['dry_run']:
+                total += orphans.count()
+                continue
+            if model is Notification:
+                # 删除的通知可能未读
+                rows = list(orphans.values_list('pk', 'recipient_user_id'))
+                NotificationService.invalidate_unread_count({row[1] for row in rows})
+                orphan_ids = [row[0] for row in rows]
+            else:
+                orphan_ids = list(orphans.values_list('pk', flat=True))
+            if orphan_ids:
+                with transaction.atomic():
+                    if model is Comment:
+                        # 评论的全文索引行与评论同一事务删除
+                        SearchService.remove_comments(orphan_ids)
+                    total += model.objects.filter(pk__in=orphan_ids).delete()[0]
+            time.sleep(options['sleep'])
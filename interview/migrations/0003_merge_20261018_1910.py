@@ -0,0 +1,14 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview', '0002_like_and_notification_types'),
+        ('interview', '0002_studentapplication_email_and_more'),
+    ]
+
+    operations = [
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview', '0003_merge_20261018_1910'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='is_featured',
+            field=models.BooleanField(default=False, verbose_name='是否加精'),
+        ),
+        migrations.AddField(
+            model_name='studentapplication',
+            name='admin_remark',
+            field=models.TextField(blank=True, null=True, verbose_name='管理员备注'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('reply', '回复'), ('system', '系统通知'), ('like', '点赞'), ('post', '发帖'), ('announcement', '公告')], max_length=20, verbose_name='通知类型'),
+        ),
+        migrations.AlterField(
+            model_name='studentapplication',
+            name='follow_direction',
+            field=models.CharField(default='null', max_length=255, verbose_name='发展方向'),
+        ),
+        migrations.AlterField(
+            model_name='studentapplication',
+            name='future',
+            field=models.CharField(default='null', max_length=255, verbose_name='未来规划'),
+        ),
+        migrations.AlterField(
+            model_name='studentapplication',
+            name='gaokao_english',
+            field=models.IntegerField(default='null', verbose_name='高考英语成绩'),
+        ),
+        migrations.AlterField(
+            model_name='studentapplication',
+            name='gaokao_math',
+            field=models.IntegerField(default='null', verbose_name='高考数学成绩'),
+        ),
+        migrations.AlterField(
+            model_name='studentapplication',
+            name='grade',
+            field=models.CharField(max_length=255, verbose_name='年级'),
+        ),
+        migrations.AlterField(
+            model_name='studentapplication',
+            name='major',
+            field=models.CharField(default='null', max_length=255, verbose_name='专业班级'),
+        ),
+        migrations.AlterField(
+            model_name='studentapplication',
+            name='name',
+            field=models.CharField(max_length=255, verbose_name='学生姓名'),
+        ),
+        migrations.AlterField(
+            model_name='studentapplication',
+            name='other_lab',
+            field=models.CharField(max_length=255, verbose_name='其他实验室报名情况'),
+        ),
+        migrations.AlterField(
+            model_name='studentapplication',
+            name='phone_number',
+            field=models.CharField(default='null', max_length=255, verbose_name='联系电话'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post_id', 'created_at'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient_user_id', 'is_read', 'created_at'], name='notif_recipient_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_sticky', 'created_at'], name='post_sticky_created_idx'),
+        ),
+    ]
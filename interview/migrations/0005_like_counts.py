@@ -0,0 +1,36 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:13
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_like_counts(apps, schema_editor):
+    """按已有点赞记录回填计数"""
+    Like = apps.get_model('interview', 'Like')
+    for model_name, field in (('Post', 'post_id'), ('Comment', 'comment_id')):
+        Model = apps.get_model('interview', model_name)
+        counts = (Like.objects.filter(**{field: OuterRef('pk')})
+                  .order_by().values(field).annotate(n=Count('id')).values('n'))
+        Model.objects.update(like_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview', '0004_forum_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.IntegerField(default=0, verbose_name='点赞次数'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.IntegerField(default=0, verbose_name='点赞次数'),
+        ),
+        migrations.RunPython(backfill_like_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:15
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def move_broadcast_notifications(apps, schema_editor):
+    """将旧的广播通知（recipient_user_id 为空）迁入公告表"""
+    Notification = apps.get_model('interview', 'Notification')
+    Announcement = apps.get_model('interview', 'Announcement')
+    broadcasts = Notification.objects.filter(recipient_user_id__isnull=True).order_by('created_at', 'id')
+    Announcement.objects.bulk_create([
+        Announcement(
+            sender_user_id=n.sender_user_id,
+            message=n.message,
+            is_broadcast=True,
+            created_at=n.created_at,
+        ) for n in broadcasts
+    ], batch_size=500)
+    broadcasts.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview', '0005_like_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Announcement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sender_user_id', models.CharField(blank=True, max_length=36, null=True, verbose_name='发布者标识')),
+                ('message', models.CharField(max_length=200, verbose_name='公告内容')),
+                ('is_broadcast', models.BooleanField(default=True, verbose_name='是否广播')),
+                ('recipient_count', models.IntegerField(default=0, verbose_name='定向接收人数')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='发布时间')),
+            ],
+            options={
+                'db_table': 'interview_announcement',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnouncementCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=36, unique=True, verbose_name='用户标识')),
+                ('last_read_id', models.BigIntegerField(default=0, verbose_name='已读到的公告ID')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'db_table': 'interview_announcement_cursor',
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnouncementReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('announcement_id', models.IntegerField(verbose_name='公告ID')),
+                ('user_id', models.CharField(max_length=36, verbose_name='用户标识')),
+                ('read_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='已读时间')),
+            ],
+            options={
+                'db_table': 'interview_announcement_receipt',
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnouncementRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('announcement_id', models.IntegerField(verbose_name='公告ID')),
+                ('user_id', models.CharField(max_length=36, verbose_name='接收用户标识')),
+            ],
+            options={
+                'db_table': 'interview_announcement_recipient',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='announcementrecipient',
+            constraint=models.UniqueConstraint(fields=('user_id', 'announcement_id'), name='uniq_announcement_recipient'),
+        ),
+        migrations.AddConstraint(
+            model_name='announcementreceipt',
+            constraint=models.UniqueConstraint(fields=('user_id', 'announcement_id'), name='uniq_announcement_receipt'),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['is_broadcast', 'created_at'], name='announce_broadcast_idx'),
+        ),
+        migrations.RunPython(move_broadcast_notifications, migrations.RunPython.noop),
+    ]
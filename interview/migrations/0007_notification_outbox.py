@@ -0,0 +1,33 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:19
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview', '0006_announcements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('comment', '评论'), ('like_post', '帖子点赞'), ('like_comment', '评论点赞')], max_length=20, verbose_name='事件类型')),
+                ('payload', models.JSONField(verbose_name='事件数据')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='创建时间')),
+                ('claimed_by', models.CharField(blank=True, max_length=36, null=True, verbose_name='领取者标识')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='领取时间')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='处理完成时间')),
+                ('attempts', models.IntegerField(default=0, verbose_name='失败次数')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='最近一次错误')),
+            ],
+            options={
+                'db_table': 'interview_notification_outbox',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['processed_at', 'id'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:40
+
+import re
+
+from django.db import migrations
+
+# 迁移中冻结的 interview.service.search.tokenize：迁移只能依赖迁移时刻的代码，
+# 之后修改服务层的分词规则不会改变本迁移的结果（改分词后用 rebuild_search_index 重建索引）
+CJK_RUN = re.compile('[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+')
+
+
+def tokenize(text):
+    """中文连续串切成重叠二元组并补上末字，其他文本原样保留"""
+    def split_run(match):
+        run = match.group()
+        grams = [run[i:i + 2] for i in range(len(run) - 1)]
+        grams.append(run[-1])
+        return ' ' + ' '.join(grams) + ' '
+    return CJK_RUN.sub(split_run, text or '')
+
+
+def create_search_index(apps, schema_editor):
+    """
+    SQLite：创建 FTS5 虚拟表（rank 配置为 BM25，标题权重 10）并用现有帖子/评论填充
+    MySQL：为帖子/评论建立 ngram 分词的 FULLTEXT 索引
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE interview_search USING fts5("
+            "title, body, post_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute("INSERT INTO interview_search(interview_search, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+        Post = apps.get_model('interview', 'Post')
+        Comment = apps.get_model('interview', 'Comment')
+        rows = [(pk * 2, tokenize(title), tokenize(content), pk)
+                for pk, title, content in Post.objects.values_list('id', 'title', 'content').iterator()]
+        rows += [(pk * 2 + 1, '', tokenize(content), post_id)
+                 for pk, content, post_id in Comment.objects.values_list('id', 'content', 'post_id').iterator()]
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO interview_search (rowid, title, body, post_id) VALUES (%s, %s, %s, %s)', rows)
+    elif vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE interview_post ADD FULLTEXT INDEX post_fulltext_idx (title, content) WITH PARSER ngram')
+        schema_editor.execute('ALTER TABLE interview_comment ADD FULLTEXT INDEX comment_fulltext_idx (content) WITH PARSER ngram')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS interview_search')
+    elif vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE interview_post DROP INDEX post_fulltext_idx')
+        schema_editor.execute('ALTER TABLE interview_comment DROP INDEX comment_fulltext_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview', '0007_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
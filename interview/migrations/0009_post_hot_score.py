@@ -0,0 +1,53 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:50
+
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations, models
+
+# 迁移中冻结的 interview.service.forum.compute_hot_score 及其参数：迁移只能依赖迁移时刻的代码，
+# 之后调整热度公式不会改变本迁移的结果（调整后用 recompute_hot_scores 重算）
+HOT_COMMENT_WEIGHT = 2
+HOT_LIKE_WEIGHT = 1
+HOT_FEATURED_BONUS = 10
+HOT_HALF_LIFE_HOURS = 24
+HOT_EPOCH = datetime(2024, 1, 1)
+
+
+def compute_hot_score(comment_count, like_count, is_featured, created_at):
+    """log(1 + 互动量) + 发帖时间距纪元的半衰期数 × ln2"""
+    activity = comment_count * HOT_COMMENT_WEIGHT + like_count * HOT_LIKE_WEIGHT
+    if is_featured:
+        activity += HOT_FEATURED_BONUS
+    epoch = HOT_EPOCH if created_at.tzinfo is None else HOT_EPOCH.replace(tzinfo=dt_timezone.utc)
+    half_lives = (created_at - epoch).total_seconds() / (HOT_HALF_LIFE_HOURS * 3600)
+    return math.log(1 + max(activity, 0)) + half_lives * math.log(2)
+
+
+def backfill_hot_scores(apps, schema_editor):
+    """按现有计数计算热度分"""
+    Post = apps.get_model('interview', 'Post')
+    posts = list(Post.objects.only('id', 'comment_count', 'like_count', 'is_featured', 'created_at'))
+    for post in posts:
+        post.hot_score = compute_hot_score(post.comment_count, post.like_count, post.is_featured, post.created_at)
+    Post.objects.bulk_update(posts, ['hot_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview', '0008_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0, verbose_name='热度分'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_sticky', 'hot_score'], name='post_sticky_hot_idx'),
+        ),
+        migrations.RunPython(backfill_hot_scores, migrations.RunPython.noop),
+    ]
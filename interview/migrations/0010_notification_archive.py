@@ -0,0 +1,39 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:36
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview', '0009_post_hot_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='aggregate_count',
+            field=models.IntegerField(default=1, verbose_name='合并条数'),
+        ),
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='原通知ID')),
+                ('recipient_user_id', models.CharField(blank=True, max_length=36, null=True, verbose_name='接收通知用户标识')),
+                ('sender_user_id', models.CharField(blank=True, max_length=36, null=True, verbose_name='发送通知用户标识')),
+                ('notification_type', models.CharField(choices=[('reply', '回复'), ('system', '系统通知'), ('like', '点赞'), ('post', '发帖'), ('announcement', '公告')], max_length=20, verbose_name='通知类型')),
+                ('message', models.CharField(max_length=200, verbose_name='通知消息内容')),
+                ('post_id', models.IntegerField(blank=True, null=True, verbose_name='关联帖子ID')),
+                ('comment_id', models.IntegerField(blank=True, null=True, verbose_name='关联评论ID')),
+                ('aggregate_count', models.IntegerField(default=1, verbose_name='合并条数')),
+                ('created_at', models.DateTimeField(verbose_name='通知时间')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='归档时间')),
+            ],
+            options={
+                'db_table': 'interview_notification_archive',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['recipient_user_id', 'created_at'], name='notif_archive_recipient_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:39
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview', '0010_notification_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.IntegerField(unique=True, verbose_name='帖子ID')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='删除时间')),
+            ],
+            options={
+                'db_table': 'interview_post_tombstone',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['post_id'], name='like_post_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['comment_id'], name='like_comment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['post_id'], name='notif_post_idx'),
+        ),
+    ]
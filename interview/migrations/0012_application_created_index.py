@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview', '0011_post_tombstone'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentapplication',
+            index=models.Index(fields=['created_at', 'id'], name='application_created_idx'),
+        ),
+    ]
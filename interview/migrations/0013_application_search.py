@@ -0,0 +1,75 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # 未安装时只按汉字和学号建索引
+    lazy_pinyin = None
+
+# 迁移中冻结的 interview.service.application_search.application_terms 及其参数：迁移只能依赖迁移时刻的代码，
+# 之后修改切词规则不会改变本迁移的结果（修改后用 rebuild_application_search 重建）
+NAME_PREFIX = 'n:'
+PINYIN_PREFIX = 'p:'
+NUMBER_PREFIX = 'd:'
+NAME_INDEX_LENGTH = 32
+NUMBER_INDEX_LENGTH = 32
+PINYIN_INDEX_LENGTH = 32
+INDEX_BATCH_SIZE = 500
+
+
+def application_terms(name, number):
+    """姓名单字与二元组、拼音全拼与首字母的前缀、学号前缀"""
+    name = (name or '').strip().lower()
+    grams = set(name[:NAME_INDEX_LENGTH])
+    grams.update(name[i:i + 2] for i in range(min(len(name), NAME_INDEX_LENGTH) - 1))
+    grams.discard(' ')
+    terms = {NAME_PREFIX + gram for gram in grams}
+    if lazy_pinyin is not None and name:
+        full = ''.join(lazy_pinyin(name)).replace(' ', '')
+        initials = ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER)).replace(' ', '')
+        for key in (full[:PINYIN_INDEX_LENGTH], initials[:PINYIN_INDEX_LENGTH]):
+            terms.update(PINYIN_PREFIX + key[:i] for i in range(1, len(key) + 1))
+    number = (number or '').strip().lower()[:NUMBER_INDEX_LENGTH]
+    terms.update(NUMBER_PREFIX + number[:i] for i in range(1, len(number) + 1))
+    return terms
+
+
+def backfill_search_terms(apps, schema_editor):
+    """为现有报名写入检索词"""
+    StudentApplication = apps.get_model('interview', 'StudentApplication')
+    ApplicationSearchTerm = apps.get_model('interview', 'ApplicationSearchTerm')
+    batch = []
+    for app_id, name, number in StudentApplication.objects.values_list('id', 'name', 'number').iterator():
+        batch.extend(ApplicationSearchTerm(term=term, application_id=app_id) for term in application_terms(name, number))
+        if len(batch) >= INDEX_BATCH_SIZE:
+            ApplicationSearchTerm.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    ApplicationSearchTerm.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview', '0012_application_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='检索词')),
+                ('application_id', models.BigIntegerField(verbose_name='报名ID')),
+            ],
+            options={
+                'db_table': 'interview_application_search',
+                'indexes': [models.Index(fields=['application_id'], name='application_search_app_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='applicationsearchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'application_id'), name='uniq_application_search_term'),
+        ),
+        migrations.RunPython(backfill_search_terms, migrations.RunPython.noop),
+    ]
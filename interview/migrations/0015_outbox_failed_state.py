@@ -0,0 +1,48 @@
+# Generated by Django 4.2.11 on 2026-10-18 23:10
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# 迁移时的失败次数上限（冻结 interview.service.forum.OUTBOX_MAX_ATTEMPTS，避免迁移随业务代码变化）
+OUTBOX_MAX_ATTEMPTS = 5
+PRUNE_BATCH_SIZE = 1000
+
+
+def prune_outbox(apps, schema_editor):
+    """分批删除已处理的历史事件；失败次数已达上限的事件标记为失败"""
+    NotificationOutbox = apps.get_model('interview', 'NotificationOutbox')
+    processed = NotificationOutbox.objects.filter(processed_at__isnull=False)
+    while True:
+        ids = list(processed.order_by('id').values_list('id', flat=True)[:PRUNE_BATCH_SIZE])
+        if not ids:
+            break
+        NotificationOutbox.objects.filter(id__in=ids).delete()
+    NotificationOutbox.objects.filter(attempts__gte=OUTBOX_MAX_ATTEMPTS).update(failed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview', '0014_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='放弃重试时间'),
+        ),
+        migrations.RunPython(prune_outbox, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='notificationoutbox',
+            name='outbox_pending_idx',
+        ),
+        migrations.RemoveField(
+            model_name='notificationoutbox',
+            name='processed_at',
+        ),
+        migrations.AddIndex(
+            model_name='notificationoutbox',
+            index=models.Index(fields=['failed_at', 'id'], name='outbox_pending_idx'),
+        ),
+    ]
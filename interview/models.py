@@ -21,6 +21,8 @@ class Post(models.Model):
     is_sticky = models.BooleanField(default=False, verbose_name="是否置顶")  # 是否置顶，默认为False
     is_featured = models.BooleanField(default=False, verbose_name="是否加精")  # 是否加精，默认为False
     comment_count = models.IntegerField(default=0, verbose_name="评论次数")  # 评论次数，默认为0
+    like_count = models.IntegerField(default=0, verbose_name="点赞次数")  # 点赞次数，默认为0
+    hot_score = models.FloatField(default=0, verbose_name="热度分")  # 热度分，由 PostService 维护
 
     # 时间字段
     created_at = models.DateTimeField(default=timezone.now, verbose_name="创建时间")  # 创建时间，默认为当前时间
@@ -29,11 +31,34 @@ class Post(models.Model):
     class Meta:
         db_table = 'interview_post'  # 数据库表名
         ordering = ['-is_sticky', '-created_at']  # 默认排序：先按置顶倒序，再按创建时间倒序
+        indexes = [
+            # 帖子列表（页码/游标分页）按 置顶、创建时间 倒序
+            models.Index(fields=['is_sticky', 'created_at'], name='post_sticky_created_idx'),
+            # 热门列表（sort=hot）按 置顶、热度分 倒序
+            models.Index(fields=['is_sticky', 'hot_score'], name='post_sticky_hot_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} (by {self.user_id})"  # 对象字符串表示
 
 
+class PostTombstone(models.Model):
+    """
+    已删除帖子的墓碑
+    - 删除帖子时与删除帖子行在同一事务内写入，帖子立即不可见
+    - 评论、点赞、通知没有物理外键，由 purge_deleted_posts 按墓碑分批清理，清理完成后删除墓碑
+    """
+    post_id = models.IntegerField(unique=True, verbose_name="帖子ID")
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name="删除时间")
+
+    class Meta:
+        db_table = 'interview_post_tombstone'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"已删除帖子#{self.post_id}"
+
+
 class Comment(models.Model):
     """
     评论模型
@@ -50,6 +75,9 @@ class Comment(models.Model):
     # 父评论字段（用于实现回复功能）
     parent_comment_id = models.IntegerField(default=0, verbose_name="父评论ID")  # 父评论ID，0表示无父评论
 
+    # 计数字段
+    like_count = models.IntegerField(default=0, verbose_name="点赞次数")  # 点赞次数，默认为0
+
     # 时间字段
     created_at = models.DateTimeField(default=timezone.now, verbose_name="创建时间")  # 创建时间，默认为当前时间
     updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")  # 更新时间，自动更新
@@ -57,6 +85,10 @@ class Comment(models.Model):
     class Meta:
         db_table = 'interview_comment'  # 数据库表名
         ordering = ['created_at']  # 默认按创建时间正序排列
+        indexes = [
+            # 评论列表按帖子过滤、按创建时间排序
+            models.Index(fields=['post_id', 'created_at'], name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return f"评论ID#{self.id} - 帖子ID#{self.post_id}"  # 对象字符串表示
@@ -77,9 +109,12 @@ class Notification(models.Model):
     NOTIFICATION_TYPES = (
         ('reply', '回复'),  # 回复通知
         ('system', '系统通知'),  # 系统通知
+        ('like', '点赞'),  # 点赞通知
+        ('post', '发帖'),  # 发帖通知
+        ('announcement', '公告'),  # 公告
     )
     notification_type = models.CharField(
-        max_length=10,
+        max_length=20,
         choices=NOTIFICATION_TYPES,
         verbose_name="通知类型"
     )  # 通知类型，从预定义选项中选择
@@ -93,17 +128,156 @@ class Notification(models.Model):
     post_id = models.IntegerField(blank=True, null=True, verbose_name="关联帖子ID")  # 关联帖子ID，可为空
     comment_id = models.IntegerField(blank=True, null=True, verbose_name="关联评论ID")  # 关联评论ID，可为空
 
+    # 合并的通知条数（同一目标的多条点赞通知由 compact_notifications 合并为一条）
+    aggregate_count = models.IntegerField(default=1, verbose_name="合并条数")
+
     # 时间字段
     created_at = models.DateTimeField(default=timezone.now, verbose_name="通知时间")  # 通知时间，默认为当前时间
 
     class Meta:
         db_table = 'interview_notification'  # 数据库表名
         ordering = ['-created_at']  # 默认按通知时间倒序排列
+        indexes = [
+            # 收件箱、未读计数、全部已读均按 接收者 + 已读状态 过滤，按时间排序
+            models.Index(fields=['recipient_user_id', 'is_read', 'created_at'], name='notif_recipient_read_idx'),
+            # 清理已删除帖子的通知
+            models.Index(fields=['post_id'], name='notif_post_idx'),
+        ]
 
     def __str__(self):
         return f"{self.notification_type}通知 - 接收者ID#{self.recipient_user_id}"  # 对象字符串表示
 
 
+class NotificationArchive(models.Model):
+    """
+    通知归档
+    - 超过保留期的已读通知由 compact_notifications 分批移入，保留原通知ID
+    - 收件箱与未读计数只查询 Notification，归档表不参与
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name="原通知ID")
+    recipient_user_id = models.CharField(max_length=36, blank=True, null=True, verbose_name="接收通知用户标识")
+    sender_user_id = models.CharField(max_length=36, blank=True, null=True, verbose_name="发送通知用户标识")
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES, verbose_name="通知类型")
+    message = models.CharField(max_length=200, verbose_name="通知消息内容")
+    post_id = models.IntegerField(blank=True, null=True, verbose_name="关联帖子ID")
+    comment_id = models.IntegerField(blank=True, null=True, verbose_name="关联评论ID")
+    aggregate_count = models.IntegerField(default=1, verbose_name="合并条数")
+    created_at = models.DateTimeField(verbose_name="通知时间")
+    archived_at = models.DateTimeField(default=timezone.now, verbose_name="归档时间")
+
+    class Meta:
+        db_table = 'interview_notification_archive'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient_user_id', 'created_at'], name='notif_archive_recipient_idx'),
+        ]
+
+    def __str__(self):
+        return f"归档{self.notification_type}通知#{self.id}"
+
+
+class NotificationOutbox(models.Model):
+    """
+    通知发件箱
+    - 评论、点赞时与业务数据在同一事务内写入一行事件
+    - 由 run_notification_worker 批量消费并生成 Notification，处理成功的事件在同一事务内删除
+    - 失败次数达到上限的事件记录 failed_at，不再领取，留待人工排查
+    """
+    EVENT_TYPES = (
+        ('comment', '评论'),  # 评论帖子/回复评论
+        ('like_post', '帖子点赞'),  # 点赞帖子
+        ('like_comment', '评论点赞'),  # 点赞评论
+    )
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES, verbose_name="事件类型")
+    payload = models.JSONField(verbose_name="事件数据")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="创建时间")
+
+    # 消费状态字段
+    claimed_by = models.CharField(max_length=36, blank=True, null=True, verbose_name="领取者标识")
+    claimed_at = models.DateTimeField(blank=True, null=True, verbose_name="领取时间")
+    failed_at = models.DateTimeField(blank=True, null=True, verbose_name="放弃重试时间")
+    attempts = models.IntegerField(default=0, verbose_name="失败次数")
+    last_error = models.TextField(blank=True, default='', verbose_name="最近一次错误")
+
+    class Meta:
+        db_table = 'interview_notification_outbox'
+        ordering = ['id']
+        indexes = [
+            # 待处理事件（failed_at 为空）按 ID 顺序领取
+            models.Index(fields=['failed_at', 'id'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type}事件#{self.id}"
+
+
+class Announcement(models.Model):
+    """
+    公告模型
+    - 每条公告只存一行，广播公告不按用户展开
+    - 定向公告的接收者存于 AnnouncementRecipient
+    """
+    sender_user_id = models.CharField(max_length=36, blank=True, null=True, verbose_name="发布者标识")
+    message = models.CharField(max_length=200, verbose_name="公告内容")
+    is_broadcast = models.BooleanField(default=True, verbose_name="是否广播")  # False 表示定向公告
+    recipient_count = models.IntegerField(default=0, verbose_name="定向接收人数")  # 广播时为0
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="发布时间")
+
+    class Meta:
+        db_table = 'interview_announcement'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_broadcast', 'created_at'], name='announce_broadcast_idx'),
+        ]
+
+    def __str__(self):
+        return f"公告#{self.id} - {'广播' if self.is_broadcast else '定向'}"
+
+
+class AnnouncementRecipient(models.Model):
+    """
+    定向公告接收者
+    - 仅存 (用户, 公告) 对，按用户查询走唯一索引
+    """
+    announcement_id = models.IntegerField(verbose_name="公告ID")
+    user_id = models.CharField(max_length=36, verbose_name="接收用户标识")
+
+    class Meta:
+        db_table = 'interview_announcement_recipient'
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'announcement_id'], name='uniq_announcement_recipient'),
+        ]
+
+
+class AnnouncementReceipt(models.Model):
+    """
+    公告已读回执
+    - 只记录游标之后被单独标记已读的公告，全部已读时会被游标吸收并清理
+    """
+    announcement_id = models.IntegerField(verbose_name="公告ID")
+    user_id = models.CharField(max_length=36, verbose_name="用户标识")
+    read_at = models.DateTimeField(default=timezone.now, verbose_name="已读时间")
+
+    class Meta:
+        db_table = 'interview_announcement_receipt'
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'announcement_id'], name='uniq_announcement_receipt'),
+        ]
+
+
+class AnnouncementCursor(models.Model):
+    """
+    公告已读游标
+    - 每个用户一行：ID 不大于 last_read_id 的公告均视为已读
+    """
+    user_id = models.CharField(max_length=36, unique=True, verbose_name="用户标识")
+    last_read_id = models.BigIntegerField(default=0, verbose_name="已读到的公告ID")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        db_table = 'interview_announcement_cursor'
+
+
 class Like(models.Model):
     """
     点赞模型
@@ -117,11 +291,16 @@ class Like(models.Model):
 
     class Meta:
         db_table = 'interview_like'
-        # 同一用户对同一目标只能有一条点赞记录
+        # 同一用户对同一目标只能有一条点赞记录（唯一约束同时作为 用户 + 目标 查询的索引）
         constraints = [
             models.UniqueConstraint(fields=['user_id', 'post_id'], name='uniq_user_post_like'),
             models.UniqueConstraint(fields=['user_id', 'comment_id'], name='uniq_user_comment_like'),
         ]
+        indexes = [
+            # 按目标统计点赞数、清理已删除帖子/评论的点赞（唯一约束以 user_id 开头，无法用于按目标查询）
+            models.Index(fields=['post_id'], name='like_post_idx'),
+            models.Index(fields=['comment_id'], name='like_comment_idx'),
+        ]
 
     def __str__(self):
         target = f"post#{self.post_id}" if self.post_id else f"comment#{self.comment_id}"
@@ -155,6 +334,30 @@ class StudentApplication(models.Model):
         db_table = "book_user"  # 数据库中的表名
         verbose_name = "学生申请表"
         verbose_name_plural = "学生申请表"
+        indexes = [
+            # 管理后台报名列表按创建时间倒序分页
+            models.Index(fields=['created_at', 'id'], name='application_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name}({self.number})"  # 便于在管理后台识别
+
+
+class ApplicationSearchTerm(models.Model):
+    """
+    报名检索词
+    - 每个报名按姓名二元组、学号前缀（以及可选的拼音前缀）展开为多行，由 ApplicationSearchService 维护
+    - 模糊查询通过 (词, 报名ID) 唯一索引连接，避免在报名表上做前置通配符的 LIKE 扫描
+    """
+    term = models.CharField(max_length=64, verbose_name="检索词")  # 带类型前缀，如 n:张三、d:2024
+    application_id = models.BigIntegerField(verbose_name="报名ID")
+
+    class Meta:
+        db_table = 'interview_application_search'
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'application_id'], name='uniq_application_search_term'),
+        ]
+        indexes = [
+            # 报名修改、删除时按报名ID清除旧检索词
+            models.Index(fields=['application_id'], name='application_search_app_idx'),
+        ]
@@ -1,6 +1,21 @@
 
 from rest_framework import serializers
-from .models import Post, Comment, Notification
+from rest_framework.settings import api_settings
+from django.utils import timezone
+import datetime
+from .models import Post, Comment, Notification, Announcement, StudentApplication
+
+class SparseFieldsMixin:
+    """
+    稀疏字段集
+    - 实例化时传入 fields=字段名集合，只输出其中列出的字段；为 None 时输出全部字段
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 class PostSerializer(serializers.ModelSerializer):
     """
@@ -9,10 +24,21 @@ class PostSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Post  # 关联的模型
-        fields = '__all__'  # 包含所有字段
-        read_only_fields = ('id', 'created_at', 'updated_at', 'comment_count')  # 只读字段
+        exclude = ('hot_score',)  # 热度分由 PostService 维护，仅用于排序，不对外暴露也不接受写入
+        read_only_fields = ('id', 'created_at', 'updated_at', 'comment_count', 'like_count')  # 只读字段
 
-class CommentSerializer(serializers.ModelSerializer):
+class PostListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    帖子列表序列化器
+    - 列表不返回正文，只返回数据库截取的摘要 excerpt，正文通过帖子详情获取
+    """
+    excerpt = serializers.CharField(read_only=True)  # 由 PostService.list_queryset 注解
+
+    class Meta:
+        model = Post  # 关联的模型
+        exclude = ('content', 'hot_score')  # 不包含正文与热度分
+
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     评论序列化器
     - 用于序列化和反序列化评论数据
@@ -20,9 +46,9 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment  # 关联的模型
         fields = '__all__'  # 包含所有字段
-        read_only_fields = ('id', 'created_at', 'updated_at')  # 只读字段
+        read_only_fields = ('id', 'created_at', 'updated_at', 'like_count')  # 只读字段
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     通知序列化器
     - 用于序列化和反序列化通知数据
@@ -30,4 +56,120 @@ class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification  # 关联的模型
         fields = '__all__'  # 包含所有字段
-        read_only_fields = ('id', 'created_at')  # 只读字段
\ No newline at end of file
+        read_only_fields = ('id', 'created_at')  # 只读字段
+
+class AnnouncementSerializer(serializers.ModelSerializer):
+    """
+    公告序列化器
+    - 用于在通知列表中以通知的形式展示公告
+    """
+    class Meta:
+        model = Announcement  # 关联的模型
+        fields = ('id', 'sender_user_id', 'message', 'created_at')  # 收件箱需要的字段
+        read_only_fields = fields
+
+class ApplicationSummarySerializer(serializers.ModelSerializer):
+    """
+    报名列表项序列化器
+    - 管理后台列表、按姓名查询只返回表格展示的列，不加载擅长领域、申请理由等大文本字段
+    """
+    class Meta:
+        model = StudentApplication
+        fields = ('id', 'name', 'number', 'grade', 'major', 'follow_direction', 'value', 'created_at')
+        read_only_fields = fields
+
+class ApplicationDetailSerializer(serializers.ModelSerializer):
+    """
+    报名详情序列化器
+    - 全部字段，用于单条详情与导出
+    """
+    class Meta:
+        model = StudentApplication
+        fields = '__all__'
+        read_only_fields = ('id', 'created_at')
+
+class ValuesSerializer:
+    """
+    只读快速序列化器
+    - 由 ModelSerializer 预编译出 (字段名, 来源列, 转换函数) 列表，每种字段组合只编译一次
+    - 直接把 .values_list() 元组转换为字典，跳过逐行的字段绑定与 to_representation 调度
+    - 输出与对应 ModelSerializer 完全一致（字段顺序、None 处理、DATETIME_FORMAT）
+    """
+
+    # 数据库已返回与 to_representation 结果相同的 Python 类型，原样输出
+    PASSTHROUGH_FIELDS = (serializers.IntegerField, serializers.BooleanField, serializers.CharField)
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._compiled = {}
+
+    def compile(self, fields=None):
+        """
+        编译指定字段组合
+        :param fields: 稀疏字段集，None 表示全部字段
+        :return: (字段名元组, 来源列元组, [(字段名, 转换函数)])
+        """
+        key = None if fields is None else frozenset(fields)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            if issubclass(self.serializer_class, SparseFieldsMixin):
+                serializer = self.serializer_class(fields=fields)
+            else:
+                serializer = self.serializer_class()
+            readable = [(name, field) for name, field in serializer.fields.items() if not field.write_only]
+            names = tuple(name for name, _ in readable)
+            sources = tuple(field.source for _, field in readable)
+            conversions = [(name, self._converter(field)) for name, field in readable
+                           if not isinstance(field, self.PASSTHROUGH_FIELDS)]
+            compiled = self._compiled[key] = (names, sources, conversions)
+        return compiled
+
+    def columns(self, fields=None):
+        """按输出顺序返回需要查询的列名（模型字段或注解名），用于 .values_list()"""
+        return self.compile(fields)[1]
+
+    def serialize_rows(self, rows, fields=None):
+        """
+        将 .values_list(*columns(fields), ...) 的元组转换为字典
+        - 元组末尾可以附带额外的列（如游标所需的排序键），不会出现在输出中
+        :param rows: 元组序列
+        :param fields: 稀疏字段集
+        :return: 字典列表
+        """
+        names, _, conversions = self.compile(fields)
+        data = []
+        for row in rows:
+            item = dict(zip(names, row))
+            for name, convert in conversions:
+                value = item[name]
+                if value is not None:
+                    item[name] = convert(value)
+            data.append(item)
+        return data
+
+    def serialize_objects(self, objects, fields=None):
+        """将模型实例序列化为字典（实例已加载所需的列）"""
+        sources = self.columns(fields)
+        return self.serialize_rows(
+            (tuple(getattr(obj, source) for source in sources) for obj in objects), fields)
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+            if output_format and output_format.lower() != 'iso-8601':
+                if field_timezone is None:
+                    # USE_TZ = False 时数据库返回 naive datetime，与 DRF 一样直接格式化
+                    return lambda value: (timezone.make_naive(value, datetime.timezone.utc)
+                                          if timezone.is_aware(value) else value).strftime(output_format)
+                return lambda value: value.astimezone(field_timezone).strftime(output_format)
+        return field.to_representation
+
+
+post_list_values = ValuesSerializer(PostListSerializer)
+comment_values = ValuesSerializer(CommentSerializer)
+notification_values = ValuesSerializer(NotificationSerializer)
+announcement_values = ValuesSerializer(AnnouncementSerializer)
+application_summary_values = ValuesSerializer(ApplicationSummarySerializer)
+application_detail_values = ValuesSerializer(ApplicationDetailSerializer)
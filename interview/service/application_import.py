@@ -0,0 +1,193 @@
+"""
+报名批量导入（CSV / XLSX）
+- 按行流式解析上传文件（大文件由 Django 落盘为临时文件），内存占用与文件行数无关
+- 每行按在线提交的规则校验（interview_services.build_application），学号重复（库中已有或文件内重复）记为错误
+- 每满一块：一次查询排除库中已有学号，在一个事务中 bulk_create 并写入检索词，每块的查询数固定
+- 整块写入失败（如字段超长）时逐行重试，定位出错的行
+- 错误报告最多保留 IMPORT_ERROR_LIMIT 条，其余只计数
+"""
+import csv
+import io
+import os
+
+from django.db import connection, transaction, DatabaseError
+
+from ..models import StudentApplication
+from ..services.interview_services import build_application, REQUIRED_FIELDS
+from .application_search import ApplicationSearchService
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # 未安装时只支持 CSV
+    load_workbook = None
+
+IMPORT_FORMATS = ('csv', 'xlsx')
+IMPORT_CHUNK_SIZE = 500
+IMPORT_ERROR_LIMIT = 1000
+
+# 表头别名：字段名、模型的中文名、在线提交的提示名以及管理后台导出的列名都可作为列名
+IMPORT_FIELDS = ('name', 'number', 'grade', 'major', 'phone_number', 'email', 'gaokao_math', 'gaokao_english',
+                 'follow_direction', 'good_at', 'reason', 'experience', 'other_lab', 'future', 'book_time')
+HEADER_ALIASES = {'姓名': 'name', '手机号': 'phone_number', '高考数学': 'gaokao_math', '高考英语': 'gaokao_english',
+                  '意向方向': 'follow_direction', '报名原因': 'reason', '其他实验室': 'other_lab'}
+HEADER_ALIASES.update({label: key for key, label in REQUIRED_FIELDS.items()})
+for _field in IMPORT_FIELDS:
+    HEADER_ALIASES[_field] = _field
+    HEADER_ALIASES[str(StudentApplication._meta.get_field(_field).verbose_name)] = _field
+
+
+class ImportFormatError(ValueError):
+    """文件格式或表头不可用，整个文件无法导入"""
+
+
+def detect_format(filename):
+    """按扩展名判断文件格式，不支持时返回 None"""
+    ext = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    return ext if ext in IMPORT_FORMATS else None
+
+
+def _cell(value):
+    """单元格转为字符串：XLSX 中的整数可能读成 2024001.0，日期保留原值"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _csv_rows(file, encoding):
+    # newline='' 把换行交给 csv 模块处理，引号内含换行的单元格不会被拆成多行
+    reader = io.TextIOWrapper(file, encoding=encoding, newline='')
+    try:
+        yield from csv.reader(reader)
+    finally:
+        # 解除包装，调用方的文件不随包装器一起关闭
+        reader.detach()
+
+
+def _xlsx_rows(file):
+    if load_workbook is None:
+        raise ImportFormatError('服务器未安装 openpyxl，暂不支持 XLSX，请另存为 CSV 后导入')
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(file, file_format, encoding='utf-8-sig'):
+    """
+    逐行读取上传文件
+    :param file: 二进制文件对象
+    :param file_format: csv 或 xlsx
+    :param encoding: CSV 编码（Excel 导出的中文 CSV 常为 gbk）
+    :return: (行号, 数据字典) 生成器，行号从 2 开始（第 1 行为表头），跳过空行
+    """
+    rows = _csv_rows(file, encoding) if file_format == 'csv' else _xlsx_rows(file)
+    header = next(rows, None)
+    if not header:
+        raise ImportFormatError('文件为空')
+    columns = [HEADER_ALIASES.get(_cell(name)) for name in header]
+    missing = [label for key, label in REQUIRED_FIELDS.items() if key not in columns]
+    if missing:
+        raise ImportFormatError(f"缺少列：{'、'.join(missing)}")
+    for row_number, row in enumerate(rows, start=2):
+        values = [_cell(value) for value in row]
+        if not any(values):
+            continue
+        yield row_number, {key: value for key, value in zip(columns, values) if key}
+
+
+class ApplicationImportService:
+    """报名批量导入"""
+
+    @staticmethod
+    def import_file(file, file_format, encoding='utf-8-sig', chunk_size=IMPORT_CHUNK_SIZE, dry_run=False):
+        """
+        导入报名文件
+        :param file: 二进制文件对象
+        :param file_format: csv 或 xlsx
+        :param encoding: CSV 编码
+        :param chunk_size: 每块行数（每块一个事务）
+        :param dry_run: 只校验，不写入（created 为可写入的行数；不同块之间的文件内重复学号不会被发现）
+        :return: 导入报告；文件无法继续读取时 success 为 False，此前已写入的块保留
+        """
+        report = {'success': True, 'dry_run': dry_run, 'total': 0, 'created': 0, 'failed': 0,
+                  'errors': [], 'errors_truncated': False}
+        chunk = []
+        try:
+            for row_number, data in read_rows(file, file_format, encoding):
+                report['total'] += 1
+                application, error = build_application(data)
+                if error:
+                    ApplicationImportService._add_error(report, row_number, data.get('number'), error)
+                    continue
+                chunk.append((row_number, application))
+                if len(chunk) >= chunk_size:
+                    ApplicationImportService._flush(chunk, report, dry_run)
+                    chunk = []
+            ApplicationImportService._flush(chunk, report, dry_run)
+        except ImportFormatError as e:
+            report.update(success=False, message=str(e))
+        except UnicodeDecodeError:
+            report.update(success=False, message=f'文件编码不是 {encoding}，请指定正确的编码')
+        except LookupError:
+            report.update(success=False, message=f'不支持的编码：{encoding}')
+        return report
+
+    @staticmethod
+    def _add_error(report, row_number, number, message):
+        report['failed'] += 1
+        if len(report['errors']) >= IMPORT_ERROR_LIMIT:
+            report['errors_truncated'] = True
+            return
+        report['errors'].append({'row': row_number, 'number': number or '', 'message': message})
+
+    @staticmethod
+    def _flush(chunk, report, dry_run):
+        """写入一块：一次查询排除已有学号，块内重复的学号只保留第一行"""
+        if not chunk:
+            return
+        existing = set(StudentApplication.objects.filter(number__in={app.number for _, app in chunk})
+                       .values_list('number', flat=True))
+        pending = []
+        for row_number, application in chunk:
+            if application.number in existing:
+                ApplicationImportService._add_error(report, row_number, application.number, '该学号已提交过申请')
+                continue
+            existing.add(application.number)
+            pending.append((row_number, application))
+        if dry_run or not pending:
+            report['created'] += len(pending)
+            return
+        try:
+            with transaction.atomic():
+                ApplicationImportService._insert([app for _, app in pending])
+            report['created'] += len(pending)
+        except DatabaseError:
+            # 整块失败时逐行写入，找出出错的行（先清除回滚前批量插入回填的主键）
+            for row_number, application in pending:
+                application.pk = None
+                application._state.adding = True
+                try:
+                    with transaction.atomic():
+                        ApplicationImportService._insert([application])
+                    report['created'] += 1
+                except DatabaseError:
+                    ApplicationImportService._add_error(
+                        report, row_number, application.number, '数据库错误：数据不符合表结构约束（如字段长度超限）')
+
+    @staticmethod
+    def _insert(applications):
+        StudentApplication.objects.bulk_create(applications, batch_size=IMPORT_CHUNK_SIZE)
+        if connection.features.can_return_rows_from_bulk_insert:
+            rows = [(app.id, app.name, app.number) for app in applications]
+        else:
+            # MySQL 批量插入不返回主键，按学号查回（已排除库中已有的学号）
+            rows = StudentApplication.objects.filter(number__in=[app.number for app in applications]) \
+                .values_list('id', 'name', 'number')
+        ApplicationSearchService.index_rows(rows)
@@ -0,0 +1,186 @@
+"""
+报名姓名 / 学号检索
+- 旁路表 interview_application_search 保存 (检索词, 报名ID)，(检索词, 报名ID) 唯一索引即倒排索引
+- 姓名：按字符切成单字与重叠二元组（n:），安装 pypinyin 时另存全拼与首字母的前缀（p:），支持 zhangsan / zs 检索
+- 学号：保存全部前缀（d:），学号检索为前缀匹配
+- 查询按同样规则切词，通过索引连接取出同时包含全部检索词的报名，不再对报名表做前置通配符的 LIKE 扫描
+- 报名的新增、修改、删除由调用方在同一事务中调用 index / remove 维护；历史数据用 rebuild_application_search 重建
+"""
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+from django.db.models import Count, Case, When, Value, IntegerField, Exists, OuterRef, Q
+
+from ..models import StudentApplication, ApplicationSearchTerm
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # 未安装时只按汉字检索
+    lazy_pinyin = None
+
+NAME_PREFIX = 'n:'
+PINYIN_PREFIX = 'p:'
+NUMBER_PREFIX = 'd:'
+# 参与索引的最大长度，超出部分不建索引（姓名、学号远短于此）
+NAME_INDEX_LENGTH = 32
+NUMBER_INDEX_LENGTH = 32
+PINYIN_INDEX_LENGTH = 32
+INDEX_BATCH_SIZE = 500
+
+
+def _normalize(text):
+    return (text or '').strip().lower()
+
+
+def name_grams(name):
+    """
+    姓名切词：单字 + 重叠二元组
+    :param name: 姓名
+    :return: 切词集合
+    """
+    name = _normalize(name)[:NAME_INDEX_LENGTH]
+    grams = set(name)
+    grams.update(name[i:i + 2] for i in range(len(name) - 1))
+    grams.discard(' ')
+    return grams
+
+
+def query_grams(name):
+    """查询切词：两字以上只需二元组（包含关系由二元组全部命中 + 姓名子串校验保证），单字用单字"""
+    name = _normalize(name)[:NAME_INDEX_LENGTH]
+    if len(name) < 2:
+        return {name} if name else set()
+    return {name[i:i + 2] for i in range(len(name) - 1)} - {' '}
+
+
+def pinyin_keys(name):
+    """全拼与首字母（未安装 pypinyin 时为空）"""
+    name = _normalize(name)
+    if lazy_pinyin is None or not name:
+        return []
+    full = ''.join(lazy_pinyin(name)).replace(' ', '')
+    initials = ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER)).replace(' ', '')
+    return [full[:PINYIN_INDEX_LENGTH], initials[:PINYIN_INDEX_LENGTH]]
+
+
+def application_terms(name, number):
+    """
+    报名的全部检索词
+    :param name: 姓名
+    :param number: 学号
+    :return: 检索词集合（带类型前缀）
+    """
+    terms = {NAME_PREFIX + gram for gram in name_grams(name)}
+    for key in pinyin_keys(name):
+        terms.update(PINYIN_PREFIX + key[:i] for i in range(1, len(key) + 1))
+    number = _normalize(number)[:NUMBER_INDEX_LENGTH]
+    terms.update(NUMBER_PREFIX + number[:i] for i in range(1, len(number) + 1))
+    return terms
+
+
+class ApplicationSearchService:
+    """报名检索索引的维护与查询"""
+
+    @staticmethod
+    def index(application):
+        """
+        写入（或覆盖）单个报名的检索词
+        :param application: 已保存的报名
+        """
+        ApplicationSearchService.index_rows([(application.id, application.name, application.number)])
+
+    @staticmethod
+    def index_rows(rows):
+        """
+        批量写入检索词：先删除这些报名的旧检索词再插入，调用方负责事务
+        :param rows: (报名ID, 姓名, 学号) 列表
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        ApplicationSearchTerm.objects.filter(application_id__in=[row[0] for row in rows]).delete()
+        # 每个报名约二十个检索词，逐个构造模型实例的开销远大于插入本身，直接 executemany
+        ops = connection.ops
+        sql = (f'{ops.insert_statement(on_conflict=OnConflict.IGNORE)} '
+               f'{ops.quote_name(ApplicationSearchTerm._meta.db_table)} (term, application_id) VALUES (%s, %s) '
+               f'{ops.on_conflict_suffix_sql([], OnConflict.IGNORE, [], [])}')
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [(term, app_id) for app_id, name, number in rows
+                                     for term in application_terms(name, number)])
+
+    @staticmethod
+    def remove(application_ids):
+        """
+        删除报名的检索词
+        :param application_ids: 报名ID列表
+        """
+        ApplicationSearchTerm.objects.filter(application_id__in=list(application_ids)).delete()
+
+    @staticmethod
+    def rebuild(batch_size=INDEX_BATCH_SIZE):
+        """
+        按主键分批重建全部检索词（每批一个短事务），最后清除已不存在的报名的检索词
+        :param batch_size: 每批报名数量
+        :return: 重建的报名数量
+        """
+        last_id = 0
+        total = 0
+        while True:
+            rows = list(StudentApplication.objects.filter(id__gt=last_id).order_by('id')
+                        .values_list('id', 'name', 'number')[:batch_size])
+            if not rows:
+                break
+            with transaction.atomic():
+                ApplicationSearchService.index_rows(rows)
+            last_id = rows[-1][0]
+            total += len(rows)
+        ApplicationSearchTerm.objects.filter(
+            ~Exists(StudentApplication.objects.filter(id=OuterRef('application_id')))).delete()
+        return total
+
+    @staticmethod
+    def _matching_ids(terms):
+        """同时包含全部检索词的报名ID子查询"""
+        return (ApplicationSearchTerm.objects.filter(term__in=terms).order_by()
+                .values('application_id').annotate(hits=Count('term')).filter(hits=len(terms))
+                .values('application_id'))
+
+    @staticmethod
+    def filter_by_name(queryset, name):
+        """
+        按姓名模糊检索并排序：完全相同 > 姓名开头 > 包含 > 拼音命中，同级按报名时间倒序
+        :param queryset: 报名查询集
+        :param name: 姓名关键字
+        :return: 过滤并排序后的查询集
+        """
+        keyword = _normalize(name)
+        terms = [NAME_PREFIX + gram for gram in query_grams(keyword)]
+        if not terms:
+            return queryset.none()
+        # 二元组全部命中不保证连续（如 "张三丰" 与 "三丰张三"），再在候选行上校验子串
+        condition = Q(id__in=ApplicationSearchService._matching_ids(terms), name__icontains=keyword)
+        if lazy_pinyin is not None and keyword.isascii() and keyword.isalpha():
+            condition |= Q(id__in=ApplicationSearchService._matching_ids([PINYIN_PREFIX + keyword[:PINYIN_INDEX_LENGTH]]))
+        return queryset.filter(condition).alias(rank=Case(
+            When(name__iexact=keyword, then=Value(0)),
+            When(name__istartswith=keyword, then=Value(1)),
+            When(name__icontains=keyword, then=Value(2)),
+            default=Value(3), output_field=IntegerField(),
+        )).order_by('rank', '-created_at', '-id')
+
+    @staticmethod
+    def filter_by_number(queryset, number):
+        """
+        按学号前缀检索，学号完全相同的排在最前，其余按报名时间倒序
+        :param queryset: 报名查询集
+        :param number: 学号前缀
+        :return: 过滤并排序后的查询集
+        """
+        keyword = _normalize(number)
+        if not keyword:
+            return queryset
+        if len(keyword) > NUMBER_INDEX_LENGTH:
+            return queryset.filter(number__iexact=keyword)
+        ids = ApplicationSearchTerm.objects.filter(term=NUMBER_PREFIX + keyword).values('application_id')
+        return queryset.filter(id__in=ids).alias(rank=Case(
+            When(number__iexact=keyword, then=Value(0)), default=Value(1), output_field=IntegerField(),
+        )).order_by('rank', '-created_at', '-id')
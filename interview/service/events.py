@@ -0,0 +1,140 @@
+"""
+进程内通知事件中心
+- NotificationService 在发布公告、变更已读状态时发布事件
+- 通知由独立的发件箱 worker 进程生成，有订阅者时本进程每秒按主键增量轮询一次并转发
+- SSE 连接（interview.views.notification_stream）订阅事件并推送给客户端
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from collections import deque
+
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+# 保留最近的事件用于 Last-Event-ID 断线续传
+EVENT_BUFFER_SIZE = 1000
+# 每个连接的待发送队列上限，溢出时通知客户端重新同步
+SUBSCRIBER_QUEUE_SIZE = 100
+# 新通知轮询间隔（秒）
+RELAY_INTERVAL_SECONDS = 1
+
+
+class NotificationHub:
+    """
+    通知事件中心
+    - 订阅者为 (asyncio.Queue, 事件循环)，发布方可以在任意线程调用 publish
+    - user_id 为 None 的事件发给所有订阅者（广播公告），为集合时发给集合内的用户（定向公告）
+    """
+
+    def __init__(self, buffer_size=EVENT_BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._buffer = deque(maxlen=buffer_size)
+        self._subscribers = {}
+        self._relay = None
+
+    def subscribe(self, user_id):
+        """在事件循环内调用，返回该连接的事件队列"""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add((queue, loop))
+            if self._relay is None or self._relay.done() or self._relay.get_loop() is not loop:
+                self._relay = loop.create_task(self._relay_notifications())
+        return queue
+
+    async def _relay_notifications(self):
+        """有订阅者期间轮询新通知并发布，所有连接断开后退出"""
+        from .forum import NotificationService
+        relay = sync_to_async(NotificationService.relay_new_notifications, thread_sensitive=False)
+        last_id = None
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._relay = None
+                    return
+            try:
+                last_id = await relay(last_id)
+            except Exception:
+                logger.exception('转发新通知失败')
+            await asyncio.sleep(RELAY_INTERVAL_SECONDS)
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update({s for s in subscribers if s[0] is queue})
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def publish(self, user_id, event, data):
+        """
+        发布事件
+        :param user_id: 接收用户，None 表示所有用户，也可以是用户ID的 frozenset
+        :param event: 事件名
+        :param data: 可 JSON 序列化的数据
+        :return: 事件ID
+        """
+        with self._lock:
+            event_id = next(self._ids)
+            item = (event_id, user_id, event, data)
+            self._buffer.append(item)
+            if user_id is None:
+                targets = [s for subs in self._subscribers.values() for s in subs]
+            elif isinstance(user_id, frozenset):
+                targets = [s for uid in user_id.intersection(self._subscribers) for s in self._subscribers[uid]]
+            else:
+                targets = list(self._subscribers.get(user_id, ()))
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, item)
+            except RuntimeError:
+                # 事件循环已关闭，连接随之结束
+                pass
+        return event_id
+
+    @staticmethod
+    def _offer(queue, item):
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # 客户端消费过慢：清空队列并要求重新同步
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait((item[0], item[1], 'reset', {}))
+
+    def replay(self, user_id, last_event_id):
+        """
+        取出 last_event_id 之后该用户可见的事件
+        :return: (事件列表, 是否存在缓冲区无法覆盖的缺口)
+        """
+        with self._lock:
+            buffered = list(self._buffer)
+            latest_id = buffered[-1][0] if buffered else 0
+        oldest_id = buffered[0][0] if buffered else latest_id + 1
+        gap = last_event_id > latest_id or last_event_id < oldest_id - 1
+        events = [item for item in buffered
+                  if item[0] > last_event_id and self._visible_to(item[1], user_id)]
+        return events, gap
+
+    @staticmethod
+    def _visible_to(target, user_id):
+        if target is None or target == user_id:
+            return True
+        return isinstance(target, frozenset) and user_id in target
+
+
+def format_event(event, data, event_id=None):
+    """按 SSE 协议格式化一条事件"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+hub = NotificationHub()
@@ -1,23 +1,368 @@
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.utils import timezone
-from django.db.models import Q
-from ..models import Post, Comment, Notification, Like
-from ..serializers import PostSerializer, CommentSerializer, NotificationSerializer
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+from django.db.models import Q, F, Count, Sum, Case, When, Value, FloatField, Exists, OuterRef
+from django.db.models.functions import Greatest, Substr, Ln
+from ..models import (Post, Comment, Notification, Like, Announcement, AnnouncementRecipient,
+                      AnnouncementReceipt, AnnouncementCursor, NotificationOutbox, NotificationArchive, PostTombstone)
+from ..serializers import (PostSerializer, CommentSerializer, post_list_values, comment_values,
+                           notification_values, announcement_values)
+from .events import hub
+from .search import SearchService
+from datetime import datetime, timedelta, timezone as dt_timezone
+import base64
+import heapq
+import json
+import math
+import time
 import uuid
 
+# 帖子列表缓存：仅缓存默认每页数量下的前几页，键中带版本号，任何写操作递增版本号即整体失效
+FEED_VERSION_KEY = 'forum:feed:version'
+FEED_CACHE_PAGES = 3
+FEED_CACHE_PAGE_SIZE = 10
+FEED_CACHE_TIMEOUT = 300
+
+# 帖子评论列表版本号：用于评论列表的 ETag，按帖子维护，过期后以新的变更时间重建
+COMMENTS_VERSION_KEY = 'forum:comments:{post_id}:version'
+COMMENTS_VERSION_TIMEOUT = 86400
+
+# 热度分：log(1 + 互动量) + 发帖时间 / 时间常数
+# - 等价于 互动量 × 2^(-帖龄 / 半衰期) 的指数衰减排序，但以固定纪元为基准，分数不随时间变化，
+#   只需在互动发生时刷新，热门列表直接按索引列读取
+HOT_COMMENT_WEIGHT = 2
+HOT_LIKE_WEIGHT = 1
+HOT_FEATURED_BONUS = 10
+HOT_HALF_LIFE_HOURS = 24
+HOT_EPOCH = datetime(2024, 1, 1)
+
+# 帖子详情可附带的内容（include 参数）
+DETAIL_INCLUDES = frozenset({'comments', 'likes'})
+
+# 批量接口单次最多处理的ID数量
+BATCH_ID_LIMIT = 200
+
+# 管理后台批量操作：操作名 -> (字段, 目标值)，delete 单独处理；单次最多处理的帖子数量
+BULK_ACTIONS = {
+    'pin': ('is_sticky', True),
+    'unpin': ('is_sticky', False),
+    'feature': ('is_featured', True),
+    'unfeature': ('is_featured', False),
+    'delete': None,
+}
+BULK_MODERATION_LIMIT = 500
+
+# 帖子列表排序方式 -> 排序键字段
+FEED_SORTS = {'latest': 'created_at', 'hot': 'hot_score'}
+
+# 帖子列表摘要长度（字符数）
+POST_EXCERPT_LENGTH = 140
+
+# 未读通知计数缓存：按用户增量维护；公告版本号变化（发布公告）时各用户计数惰性重建
+UNREAD_COUNT_KEY = 'forum:unread:{user_id}'
+UNREAD_VERSION_KEY = 'forum:unread:{user_id}:version'
+ANNOUNCEMENT_VERSION_KEY = 'forum:announcement:version'
+UNREAD_CACHE_TIMEOUT = 3600
+
+# 通知发件箱：领取后超过租期未完成的事件可被其他 worker 重新领取；失败达到上限后不再重试
+OUTBOX_LEASE_SECONDS = 60
+OUTBOX_MAX_ATTEMPTS = 5
+
+# 通知保留期：超过天数的已读通知移入归档表（或删除）
+NOTIFICATION_RETENTION_DAYS = 90
+
+
+def cache_has_atomic_incr():
+    """
+    默认缓存的 incr/decr 是否为原子操作
+    - Redis、Memcached 在服务端原子自增，LocMemCache 在进程内加锁
+    - 数据库、文件缓存的 incr 是先读后写（BaseCache.incr），并发时会丢失更新：
+      这类后端上不在缓存中维护计数（未读数直接查询数据库，版本号改为写入新的唯一值）
+    """
+    return isinstance(caches['default'], (RedisCache, BaseMemcachedCache, LocMemCache))
+
+
+def get_version_stamp(key, timeout=None):
+    """
+    读取缓存中的版本号及其最后变更时间
+    - 版本号不存在（首次或被淘汰）时以当前时间重建，变更时间参与 ETag，避免重建后的版本号与旧值冲突
+    :param key: 版本号缓存键
+    :param timeout: 版本号过期时间（秒），None 表示不过期
+    :return: (版本号, 最后变更时间)
+    """
+    modified_key = f'{key}:modified'
+    stamp = cache.get_many([key, modified_key])
+    if key not in stamp or modified_key not in stamp:
+        cache.add(key, 1, timeout)
+        cache.set(modified_key, timezone.now(), timeout)
+        stamp = cache.get_many([key, modified_key])
+    return stamp.get(key, 1), stamp.get(modified_key)
+
+
+def bump_version_stamp(key, timeout=None):
+    """
+    递增版本号并记录变更时间
+    - 缓存不支持原子 incr 时写入以纳秒时间戳表示的新版本号：并发的两次变更各自写入不同的新值，
+      先读后写的 incr 则可能两次都写成同一个值
+    :return: 新版本号
+    """
+    if not cache_has_atomic_incr():
+        version = time.time_ns()
+        cache.set(key, version, timeout)
+    else:
+        try:
+            version = cache.incr(key)
+        except ValueError:
+            # 版本号尚不存在（首次或缓存被清空），从 2 开始避免命中旧的 v1 缓存
+            cache.add(key, 2, timeout)
+            version = cache.get(key, 2)
+    cache.set(f'{key}:modified', timezone.now(), timeout)
+    return version
+
+
+def hot_recency(created_at):
+    """热度分中的时间项：发帖时间距纪元的半衰期数 × ln2"""
+    epoch = HOT_EPOCH
+    if timezone.is_aware(created_at):
+        epoch = epoch.replace(tzinfo=dt_timezone.utc)
+    half_lives = (created_at - epoch).total_seconds() / (HOT_HALF_LIFE_HOURS * 3600)
+    return half_lives * math.log(2)
+
+
+def compute_hot_score(comment_count, like_count, is_featured, created_at):
+    """
+    计算帖子热度分（批量重算使用，与 PostService.refresh_hot_score 的 SQL 表达式一致）
+    :return: 热度分，越大越热
+    """
+    activity = comment_count * HOT_COMMENT_WEIGHT + like_count * HOT_LIKE_WEIGHT
+    if is_featured:
+        activity += HOT_FEATURED_BONUS
+    return math.log(1 + max(activity, 0)) + hot_recency(created_at)
+
+
+def hot_score_expression(created_at):
+    """
+    热度分的 SQL 表达式（与 compute_hot_score 一致），计数在 SQL 中读取
+    - 不要与计数列放在同一条 UPDATE 中：SET 右侧读到的是更新前还是更新后的计数因数据库而异
+      （MySQL 按从左到右的顺序使用已赋的新值，SQLite/PostgreSQL 使用旧值）
+    :param created_at: 发帖时间
+    """
+    activity = (F('comment_count') * HOT_COMMENT_WEIGHT + F('like_count') * HOT_LIKE_WEIGHT
+                + Case(When(is_featured=True, then=Value(HOT_FEATURED_BONUS)), default=Value(0)))
+    return Ln(Greatest(activity, 0) + 1) + Value(hot_recency(created_at), output_field=FloatField())
+
+
+def parse_fields(value):
+    """
+    解析稀疏字段集参数
+    :param value: 逗号分隔的字段名，如 "id,title,liked"
+    :return: 字段名集合，参数为空时返回 None（表示全部字段）
+    """
+    if not value:
+        return None
+    return frozenset(name.strip() for name in value.split(',') if name.strip()) or None
+
+
+def pick_fields(items, fields):
+    """
+    按稀疏字段集裁剪序列化结果
+    :param items: 序列化后的字典列表
+    :param fields: 字段名集合，为 None 时原样返回
+    :return: 裁剪后的字典列表
+    """
+    if fields is None:
+        return items
+    return [{key: value for key, value in item.items() if key in fields} for item in items]
+
+
+def with_id(fields):
+    """序列化时需要 id（liked 标记、按ID归并）而调用方未请求时补上，输出前再由 pick_fields 裁掉"""
+    return None if fields is None else fields | {'id'}
+
 
 class PostService:
     """帖子相关服务"""
 
     @staticmethod
-    def get_posts(page=1, page_size=10):
+    def get_feed_version():
+        """获取当前帖子列表缓存版本号"""
+        return get_version_stamp(FEED_VERSION_KEY)[0]
+
+    @staticmethod
+    def get_feed_stamp():
+        """
+        获取帖子列表的版本戳，用于条件请求（ETag / Last-Modified）
+        :return: (版本号, 最后变更时间)
+        """
+        return get_version_stamp(FEED_VERSION_KEY)
+
+    @staticmethod
+    def bump_feed_version():
+        """
+        递增帖子列表缓存版本号（O(1) 失效所有已缓存页）
+        - 发帖、评论、置顶/加精/删除后调用
+        """
+        return bump_version_stamp(FEED_VERSION_KEY)
+
+    @staticmethod
+    def get_posts(page=1, page_size=10, viewer_id=None, fields=None, sort='latest'):
         """
         获取帖子列表
+        - 默认每页数量下的前 FEED_CACHE_PAGES 页走版本化缓存（缓存完整列表项，按 fields 裁剪后返回）
+        - liked（当前用户是否已点赞）不进缓存，按页一次查询补充
         :param page: 页码
         :param page_size: 每页数量
+        :param viewer_id: 当前用户ID
+        :param fields: 稀疏字段集，None 表示全部列表字段
+        :param sort: 'latest' 按发帖时间，'hot' 按热度分（均置顶优先）
         :return: 分页后的帖子数据
         """
-        posts = Post.objects.all().order_by('-is_sticky', '-created_at')
+        try:
+            cacheable = int(page_size) == FEED_CACHE_PAGE_SIZE and 1 <= int(page) <= FEED_CACHE_PAGES
+        except (TypeError, ValueError):
+            cacheable = False
+        if not cacheable:
+            result = PostService._get_posts_page(page, page_size, with_id(fields), sort)
+        else:
+            cache_key = f'forum:feed:v{PostService.get_feed_version()}:{sort}:p{int(page)}'
+            result = cache.get(cache_key)
+            if result is None:
+                result = PostService._get_posts_page(page, page_size, sort=sort)
+                cache.set(cache_key, result, FEED_CACHE_TIMEOUT)
+
+        if fields is None or 'liked' in fields:
+            LikeService.attach_liked(result['data'], viewer_id, 'post')
+        result['data'] = pick_fields(result['data'], fields)
+        return result
+
+    @staticmethod
+    def list_queryset(fields=None, sort='latest'):
+        """
+        帖子列表查询集（已按排序方式排序）
+        - 不查询正文，由数据库截取前 POST_EXCERPT_LENGTH 个字符作为摘要 excerpt
+        - 只查询稀疏字段集需要的列，返回 post_list_values 可直接序列化的元组，
+          末尾附带游标所需的排序键 (is_sticky, created_at 或 hot_score, id)
+        :param fields: 稀疏字段集，None 表示全部列表字段
+        :param sort: 排序方式，见 FEED_SORTS
+        :return: values_list QuerySet
+        """
+        key = FEED_SORTS[sort]
+        columns = post_list_values.columns(fields)
+        posts = Post.objects.all()
+        if 'excerpt' in columns:
+            posts = posts.annotate(excerpt=Substr('content', 1, POST_EXCERPT_LENGTH))
+        return posts.values_list(*columns, 'is_sticky', key, 'id').order_by('-is_sticky', f'-{key}', '-id')
+
+    @staticmethod
+    def refresh_hot_score(post_id, created_at=None):
+        """
+        按当前计数刷新帖子热度分（单条 UPDATE，计数在 SQL 中读取，不会覆盖并发更新）
+        - 发帖、评论增删、帖子点赞、加精后调用；时间项只与发帖时间有关，无需定期衰减
+        :param post_id: 帖子ID
+        :param created_at: 发帖时间，未传入时查询
+        """
+        if created_at is None:
+            created_at = Post.objects.filter(pk=post_id).values_list('created_at', flat=True).first()
+            if created_at is None:
+                return
+        Post.objects.filter(pk=post_id).update(hot_score=hot_score_expression(created_at))
+
+    @staticmethod
+    def bulk_moderate(action, post_ids):
+        """
+        批量置顶/取消置顶/加精/取消加精/删除帖子
+        - 每个操作一条 UPDATE 或 DELETE，在同一事务内执行；只更新状态需要变化的帖子
+        - 加精/取消加精在同一条 UPDATE 中按加精加分的差值修正热度分（时间项不变）
+        - 帖子列表缓存版本号只递增一次
+        :param action: BULK_ACTIONS 中的操作名
+        :param post_ids: 帖子ID列表
+        :return: 操作结果，affected 为实际变化的帖子数量
+        """
+        post_ids = list(dict.fromkeys(post_ids))
+        if action == 'delete':
+            affected = PostService.delete_posts(post_ids)
+        else:
+            field, value = BULK_ACTIONS[action]
+            changes = {field: value, 'updated_at': timezone.now()}
+            if field == 'is_featured':
+                activity = Greatest(F('comment_count') * HOT_COMMENT_WEIGHT + F('like_count') * HOT_LIKE_WEIGHT, 0)
+                with_bonus = Ln(activity + HOT_FEATURED_BONUS + 1) - Ln(activity + 1)
+                changes['hot_score'] = F('hot_score') + with_bonus if value else F('hot_score') - with_bonus
+            with transaction.atomic():
+                affected = Post.objects.filter(id__in=post_ids, **{f'{field}__in': [not value]}).update(**changes)
+        if affected:
+            PostService.bump_feed_version()
+        return {'success': True, 'action': action, 'requested': len(post_ids), 'affected': affected}
+
+    @staticmethod
+    def delete_posts(post_ids):
+        """
+        删除帖子
+        - 同一事务内删除帖子的搜索索引行、写入墓碑并删除帖子行，帖子立即不可见
+        - 评论（连同评论的索引行）、点赞、通知由 purge_deleted_posts 在后台分批清理，大帖子的删除请求也只涉及少量行
+        - 帖子列表缓存版本号由调用方递增
+        :param post_ids: 帖子ID列表
+        :return: 删除的帖子数量
+        """
+        post_ids = list(Post.objects.filter(id__in=post_ids).values_list('id', flat=True))
+        if not post_ids:
+            return 0
+        with transaction.atomic():
+            SearchService.remove_posts(post_ids)
+            PostTombstone.objects.bulk_create([PostTombstone(post_id=i) for i in post_ids], ignore_conflicts=True)
+            deleted, _ = Post.objects.filter(id__in=post_ids).delete()
+        return deleted
+
+    @staticmethod
+    def purge_deleted_posts(batch_size=500):
+        """
+        分批清理已删除帖子的关联数据，每次调用处理最早一个墓碑的一批
+        - 依次清理：评论（连同评论的点赞和检索索引行）、帖子的点赞、关联通知；每批一个短事务，不会长时间占用写锁
+        - 关联数据清理完后删除墓碑
+        :param batch_size: 每批删除的评论/点赞/通知数量
+        :return: 本批删除的行数（含墓碑），没有待清理的墓碑时返回 0
+        """
+        tombstone = PostTombstone.objects.order_by('id').first()
+        if tombstone is None:
+            return 0
+        post_id = tombstone.post_id
+        # 主键被新帖子复用（如 MySQL 重启后自增值回退）时不能清理，直接丢弃墓碑
+        if Post.objects.filter(pk=post_id).exists():
+            tombstone.delete()
+            return 1
+
+        comment_ids = list(Comment.objects.filter(post_id=post_id).order_by().values_list('id', flat=True)[:batch_size])
+        if comment_ids:
+            with transaction.atomic():
+                likes, _ = Like.objects.filter(comment_id__in=comment_ids).delete()
+                comments, _ = Comment.objects.filter(id__in=comment_ids).delete()
+                SearchService.remove_comments(comment_ids)
+            return likes + comments
+
+        like_ids = list(Like.objects.filter(post_id=post_id).values_list('id', flat=True)[:batch_size])
+        if like_ids:
+            return Like.objects.filter(id__in=like_ids).delete()[0]
+
+        notifications = list(Notification.objects.filter(post_id=post_id).order_by()
+                             .values_list('id', 'recipient_user_id')[:batch_size])
+        if notifications:
+            deleted, _ = Notification.objects.filter(id__in=[n[0] for n in notifications]).delete()
+            # 删除的通知可能未读
+            NotificationService.invalidate_unread_count({n[1] for n in notifications})
+            return deleted
+
+        tombstone.delete()
+        return 1
+
+    @staticmethod
+    def _get_posts_page(page, page_size, fields=None, sort='latest'):
+        """按页码查询帖子列表（不经过缓存）"""
+        posts = PostService.list_queryset(fields, sort)
         paginator = Paginator(posts, page_size)
 
         try:
@@ -27,9 +372,8 @@ class PostService:
         except EmptyPage:
             posts_page = paginator.page(paginator.num_pages)
 
-        serializer = PostSerializer(posts_page, many=True)
         return {
-            'data': serializer.data,
+            'data': post_list_values.serialize_rows(posts_page, fields),
             'pagination': {
                 'current_page': posts_page.number,
                 'total_pages': paginator.num_pages,
@@ -38,6 +382,105 @@ class PostService:
             }
         }
 
+    @staticmethod
+    def encode_cursor(sort_key):
+        """
+        将帖子的排序键编码为不透明游标
+        :param sort_key: (is_sticky, created_at 或 hot_score, id)
+        :return: URL 安全的游标字符串
+        """
+        is_sticky, value, post_id = sort_key
+        raw = json.dumps([int(is_sticky), value.isoformat() if isinstance(value, datetime) else value, post_id])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor, sort='latest'):
+        """
+        解析游标
+        :param cursor: encode_cursor 生成的字符串
+        :param sort: 排序方式，需与生成游标时一致
+        :return: (is_sticky, created_at 或 hot_score, id)
+        :raises ValueError: 游标格式不正确
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            is_sticky, value, post_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if sort == 'hot':
+                if not isinstance(value, (int, float)):
+                    raise ValueError('invalid cursor')
+                value = float(value)
+            else:
+                value = datetime.fromisoformat(value)
+            return bool(is_sticky), value, int(post_id)
+        except (TypeError, ValueError, UnicodeError):
+            raise ValueError('invalid cursor')
+
+    @staticmethod
+    def get_posts_by_cursor(cursor=None, page_size=10, with_total=False, viewer_id=None, fields=None,
+                            sort='latest'):
+        """
+        游标（keyset）分页获取帖子列表
+        - 按 (is_sticky, created_at, id) 倒序，用上一页最后一条的排序键定位下一页，
+          每页只做索引范围查找，不做 OFFSET 扫描，第 N 页与第 1 页代价相同
+        - sort='hot' 时排序键为 (is_sticky, hot_score, id)；翻页期间热度变化的帖子可能重复或跳过
+        - 默认不统计总数，with_total=True 时才执行 COUNT
+        :param cursor: 上一页返回的 next_cursor，为空表示第一页
+        :param page_size: 每页数量
+        :param with_total: 是否返回总数
+        :param viewer_id: 当前用户ID
+        :param fields: 稀疏字段集，None 表示全部列表字段
+        :param sort: 排序方式，见 FEED_SORTS
+        :return: 帖子数据与下一页游标
+        """
+        try:
+            page_size = max(1, min(int(page_size), 100))
+        except (TypeError, ValueError):
+            page_size = 10
+
+        key = FEED_SORTS[sort]
+        posts = PostService.list_queryset(with_id(fields), sort)
+        limit = page_size + 1  # 多取一条用于判断是否还有下一页
+
+        if not cursor:
+            rows = list(posts[:limit])
+        else:
+            try:
+                is_sticky, value, last_id = PostService.decode_cursor(cursor, sort)
+            except ValueError:
+                return {
+                    'success': False,
+                    'message': 'cursor 参数无效'
+                }
+            # 同一置顶分组内：key <= v 且排除 (key = v 且 id >= last_id)，可走 (is_sticky, key) 索引
+            # is_sticky__in 生成 "is_sticky IN (x)"，SQLite 才会用作索引等值前缀（is_sticky=x 只生成裸列）
+            rows = list(
+                posts.filter(is_sticky__in=[is_sticky], **{f'{key}__lte': value})
+                .exclude(**{key: value, 'id__gte': last_id})[:limit]
+            )
+            # 置顶分组已取完，从非置顶分组开头继续
+            if is_sticky and len(rows) < limit:
+                rows += list(posts.filter(is_sticky__in=[False])[:limit - len(rows)])
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        pagination = {
+            'next_cursor': PostService.encode_cursor(rows[-1][-3:]) if has_more else None,
+            'has_more': has_more,
+            'page_size': page_size
+        }
+        if with_total:
+            pagination['total_items'] = Post.objects.count()
+
+        data = post_list_values.serialize_rows(rows, with_id(fields))
+        if fields is None or 'liked' in fields:
+            LikeService.attach_liked(data, viewer_id, 'post')
+        return {
+            'success': True,
+            'data': pick_fields(data, fields),
+            'pagination': pagination
+        }
+
     @staticmethod
     def create_post(data, user_id):
         """
@@ -51,7 +494,11 @@ class PostService:
 
         serializer = PostSerializer(data=post_data)
         if serializer.is_valid():
-            post = serializer.save()
+            with transaction.atomic():
+                post = serializer.save()
+                SearchService.index_post(post)
+                PostService.refresh_hot_score(post.id, post.created_at)
+            PostService.bump_feed_version()
             return {
                 'success': True,
                 'message': '帖子创建成功',
@@ -65,39 +512,88 @@ class PostService:
         }
 
     @staticmethod
-    def get_post_detail(post_id):
+    def get_post_stamp(post_id):
+        """
+        获取帖子详情的版本戳（主键查询，不加载正文）
+        - 计数更新同时刷新 updated_at，(updated_at, 计数) 变化即表示详情变化
+        :param post_id: 帖子ID
+        :return: (updated_at, like_count, comment_count)，帖子不存在时返回 None
+        """
+        return Post.objects.filter(pk=post_id).values_list('updated_at', 'like_count', 'comment_count').first()
+
+    @staticmethod
+    def get_post_detail(post_id, include=(), viewer_id=None, comments_page_size=20):
         """
         获取帖子详情
+        - include 含 comments 时附带第一页评论（总数取自 comment_count，不执行 COUNT）
+        - include 含 likes 时为帖子及附带的评论补充 liked（当前用户是否已点赞），一次查询
+        - 全部附带时固定 3 条查询：帖子、评论页、点赞状态（无当前用户时 2 条）
         :param post_id: 帖子ID
+        :param include: 附带内容集合，见 DETAIL_INCLUDES
+        :param viewer_id: 当前用户ID
+        :param comments_page_size: 附带评论的数量
         :return: 帖子详情或错误信息
         """
         try:
             post = Post.objects.get(pk=post_id)
-            serializer = PostSerializer(post)
-            return {
-                'success': True,
-                'data': serializer.data
-            }
         except Post.DoesNotExist:
             return {
                 'success': False,
                 'message': '帖子不存在'
             }
+        result = {
+            'success': True,
+            'data': PostSerializer(post).data
+        }
+
+        comments = []
+        if 'comments' in include:
+            rows = (Comment.objects.filter(post_id=post.id).order_by('created_at')
+                    .values_list(*comment_values.columns())[:comments_page_size])
+            comments = comment_values.serialize_rows(rows)
+            result['comments'] = {
+                'data': comments,
+                'pagination': {
+                    'current_page': 1,
+                    'total_pages': max(1, math.ceil(post.comment_count / comments_page_size)),
+                    'total_items': post.comment_count,
+                    'page_size': comments_page_size
+                }
+            }
+
+        if 'likes' in include:
+            liked_post, liked_comments = False, set()
+            if viewer_id:
+                for liked_post_id, liked_comment_id in Like.objects.filter(
+                    Q(post_id=post.id) | Q(comment_id__in=[c['id'] for c in comments]), user_id=viewer_id
+                ).values_list('post_id', 'comment_id'):
+                    if liked_post_id == post.id:
+                        liked_post = True
+                    if liked_comment_id is not None:
+                        liked_comments.add(liked_comment_id)
+            result['data']['liked'] = liked_post
+            for comment in comments:
+                comment['liked'] = comment['id'] in liked_comments
+        return result
 
 
 class CommentService:
     """评论相关服务"""
 
     @staticmethod
-    def get_comments(post_id, page=1, page_size=20):
+    def get_comments(post_id, page=1, page_size=20, viewer_id=None, fields=None):
         """
         获取评论列表
         :param post_id: 帖子ID
         :param page: 页码
         :param page_size: 每页数量
+        :param viewer_id: 当前用户ID
+        :param fields: 稀疏字段集，None 表示全部字段
         :return: 分页后的评论数据
         """
-        comments = Comment.objects.filter(post_id=post_id).order_by('created_at')
+        serialize_fields = with_id(fields)
+        comments = (Comment.objects.filter(post_id=post_id).order_by('created_at')
+                    .values_list(*comment_values.columns(serialize_fields)))
         paginator = Paginator(comments, page_size)
 
         try:
@@ -107,9 +603,11 @@ class CommentService:
         except EmptyPage:
             comments_page = paginator.page(paginator.num_pages)
 
-        serializer = CommentSerializer(comments_page, many=True)
+        data = comment_values.serialize_rows(comments_page, serialize_fields)
+        if fields is None or 'liked' in fields:
+            LikeService.attach_liked(data, viewer_id, 'comment')
         return {
-            'data': serializer.data,
+            'data': pick_fields(data, fields),
             'pagination': {
                 'current_page': comments_page.number,
                 'total_pages': paginator.num_pages,
@@ -118,6 +616,98 @@ class CommentService:
             }
         }
 
+    @staticmethod
+    def get_comments_stamp(post_id):
+        """
+        获取帖子评论列表的版本戳，用于条件请求
+        :param post_id: 帖子ID
+        :return: (版本号, 最后变更时间)
+        """
+        return get_version_stamp(COMMENTS_VERSION_KEY.format(post_id=post_id), COMMENTS_VERSION_TIMEOUT)
+
+    @staticmethod
+    def bump_comments_version(post_id):
+        """评论增删或点赞后递增该帖子的评论列表版本号"""
+        bump_version_stamp(COMMENTS_VERSION_KEY.format(post_id=post_id), COMMENTS_VERSION_TIMEOUT)
+
+    @staticmethod
+    def build_comment_tree(comments):
+        """
+        单次遍历构建回复树
+        - comments 需按创建时间正序，父评论不在本帖内的回复视为顶层评论
+        :param comments: 评论对象列表
+        :return: (顶层评论列表, {评论ID: 直接回复列表})
+        """
+        by_id = {c.id: c for c in comments}
+        roots = []
+        children = {}
+        for c in comments:
+            parent_id = c.parent_comment_id
+            if parent_id and parent_id in by_id and parent_id != c.id:
+                children.setdefault(parent_id, []).append(c)
+            else:
+                roots.append(c)
+        return roots, children
+
+    @staticmethod
+    def get_comment_tree(post_id, page=1, page_size=20, max_depth=3, max_replies=50, viewer_id=None):
+        """
+        获取楼中楼形式的评论树
+        - 一次索引查询取出帖子的全部评论，O(n) 构建回复树
+        - 按顶层评论分页，回复内联返回，受最大深度与每层回复数限制
+        :param post_id: 帖子ID
+        :param page: 页码（按顶层评论计）
+        :param page_size: 每页顶层评论数量
+        :param max_depth: 内联回复的最大层数
+        :param max_replies: 每条评论最多内联的直接回复数
+        :param viewer_id: 当前用户ID
+        :return: 分页后的评论树
+        """
+        max_depth = max(0, min(int(max_depth), 10))
+        max_replies = max(0, min(int(max_replies), 200))
+
+        comments = list(Comment.objects.filter(post_id=post_id).order_by('created_at', 'id'))
+        roots, children = CommentService.build_comment_tree(comments)
+
+        paginator = Paginator(roots, page_size)
+        try:
+            roots_page = paginator.page(page)
+        except PageNotAnInteger:
+            roots_page = paginator.page(1)
+        except EmptyPage:
+            roots_page = paginator.page(paginator.num_pages)
+
+        # 先收集本页需要返回的评论，一次性序列化
+        included = []
+        stack = [(c, 0) for c in reversed(roots_page.object_list)]
+        while stack:
+            c, depth = stack.pop()
+            included.append(c)
+            if depth < max_depth:
+                stack.extend((r, depth + 1) for r in reversed(children.get(c.id, [])[:max_replies]))
+        serialized = {item['id']: item for item in comment_values.serialize_objects(included)}
+        LikeService.attach_liked(serialized.values(), viewer_id, 'comment')
+
+        def to_node(c, depth):
+            node = serialized[c.id]
+            replies = children.get(c.id, [])
+            shown = replies[:max_replies] if depth < max_depth else []
+            node['reply_count'] = len(replies)
+            node['has_more_replies'] = len(shown) < len(replies)
+            node['replies'] = [to_node(r, depth + 1) for r in shown]
+            return node
+
+        return {
+            'data': [to_node(c, 0) for c in roots_page.object_list],
+            'pagination': {
+                'current_page': roots_page.number,
+                'total_pages': paginator.num_pages,
+                'total_items': paginator.count,
+                'page_size': int(page_size)
+            },
+            'total_comments': len(comments)
+        }
+
     @staticmethod
     def create_comment(post_id, data, user_id):
         """
@@ -127,28 +717,32 @@ class CommentService:
         :param user_id: 用户ID
         :return: 创建结果
         """
-        from ..models import Post  # 避免循环导入
-
         comment_data = data.copy()
         comment_data['post_id'] = post_id
         comment_data['user_id'] = user_id
 
         serializer = CommentSerializer(data=comment_data)
         if serializer.is_valid():
-            comment = serializer.save()
-
-            # 更新帖子评论计数
-            try:
-                post = Post.objects.get(pk=post_id)
-                post.comment_count = Comment.objects.filter(post_id=post_id).count()
-                post.save()
-
-                # 处理通知
-                NotificationService.create_comment_notification(comment, post, user_id)
-
-            except Post.DoesNotExist:
-                # 帖子不存在，但仍保存评论（这种情况不应该发生）
-                pass
+            with transaction.atomic():
+                # 先在同一事务内原子递增评论计数，并发评论不会丢失更新；
+                # 更新 0 行说明帖子不存在或已删除，不再写入评论（否则会产生清理任务刚清掉的孤儿评论）
+                if not Post.objects.filter(pk=post_id).update(
+                    comment_count=F('comment_count') + 1,
+                    updated_at=timezone.now()
+                ):
+                    return {'success': False, 'message': '帖子不存在'}
+                comment = serializer.save()
+                SearchService.index_comment(comment)
+                # 通知由后台 worker 从发件箱生成，不占用请求耗时
+                NotificationService.enqueue('comment', {
+                    'comment_id': comment.id,
+                    'post_id': comment.post_id,
+                    'parent_comment_id': comment.parent_comment_id,
+                    'sender_user_id': user_id,
+                })
+            PostService.refresh_hot_score(comment.post_id)
+            PostService.bump_feed_version()
+            CommentService.bump_comments_version(comment.post_id)
 
             return {
                 'success': True,
@@ -162,121 +756,436 @@ class CommentService:
             'errors': serializer.errors
         }
 
+    @staticmethod
+    def delete_comments(comment_ids):
+        """
+        删除评论，并在同一事务内按帖子原子递减评论计数
+        :param comment_ids: 评论ID列表
+        :return: 删除的评论数量
+        """
+        with transaction.atomic():
+            comments = Comment.objects.filter(pk__in=comment_ids)
+            per_post = dict(comments.order_by().values_list('post_id').annotate(n=Count('id')))
+            deleted, _ = comments.delete()
+            SearchService.remove_comments(comment_ids)
+            for post_id, n in per_post.items():
+                Post.objects.filter(pk=post_id).update(
+                    comment_count=Greatest(F('comment_count') - n, 0),
+                    updated_at=timezone.now()
+                )
+        if deleted:
+            for post_id in per_post:
+                PostService.refresh_hot_score(post_id)
+                CommentService.bump_comments_version(post_id)
+            PostService.bump_feed_version()
+        return deleted
+
 
 class NotificationService:
     """通知相关服务"""
 
     @staticmethod
-    def get_notifications(user_id, page=1, page_size=10, unread_only=False):
+    def get_notifications(user_id, page=1, page_size=10, unread_only=False, fields=None):
         """
         获取通知列表
+        - 合并用户的定向通知与对其可见的公告，按时间倒序分页
+        - 公告项带 announcement_id，需通过公告已读接口标记
         :param user_id: 用户ID
         :param page: 页码
         :param page_size: 每页数量
         :param unread_only: 是否只获取未读通知
+        :param fields: 稀疏字段集，None 表示全部字段
         :return: 分页后的通知数据
         """
-        # 合并定向通知与广播通知（recipient_user_id 为空代表广播）
-        notifications = Notification.objects.filter(
-            Q(recipient_user_id=user_id) | Q(recipient_user_id__isnull=True)
-        )
-
+        page_size = int(page_size)
+        notifications = Notification.objects.filter(recipient_user_id=user_id)
         if unread_only:
             notifications = notifications.filter(is_read=False)
+        notifications = notifications.order_by('-created_at', '-id')
 
-        notifications = notifications.order_by('-created_at')
-        paginator = Paginator(notifications, page_size)
+        last_read_id = NotificationService._get_announcement_cursor(user_id)
+        announcements = NotificationService._visible_announcements(user_id)
+        read_ids = NotificationService._read_announcement_ids(user_id, last_read_id)
+        if unread_only:
+            announcements = announcements.filter(id__gt=last_read_id).exclude(id__in=read_ids)
+        announcements = announcements.order_by('-created_at', '-id')
 
+        total = notifications.count() + announcements.count()
+        num_pages = max(1, math.ceil(total / page_size))
         try:
-            notifications_page = paginator.page(page)
-        except PageNotAnInteger:
-            notifications_page = paginator.page(1)
-        except EmptyPage:
-            notifications_page = paginator.page(paginator.num_pages)
+            page = int(page)
+        except (TypeError, ValueError):
+            page = 1
+        page = min(max(page, 1), num_pages)
+
+        # 两路各取前 page * page_size 条归并，再切出当前页；元组末尾附带 (created_at, id) 用于归并
+        end = page * page_size
+        notification_rows = notifications.values_list(
+            *notification_values.columns(fields), 'created_at', 'id')[:end]
+        announcement_rows = announcements.values_list(*announcement_values.columns(), 'created_at', 'id')[:end]
+        merged = heapq.merge(
+            ((row[-2], 'notification', row) for row in notification_rows),
+            ((row[-2], 'announcement', row) for row in announcement_rows),
+            key=lambda item: item[0],
+            reverse=True,
+        )
+        page_items = list(merged)[end - page_size:end]
+
+        page_announcement_ids = [row[-1] for _, kind, row in page_items if kind == 'announcement']
+        read_set = set(AnnouncementReceipt.objects.filter(
+            user_id=user_id, announcement_id__in=[i for i in page_announcement_ids if i > last_read_id]
+        ).values_list('announcement_id', flat=True)) if page_announcement_ids else set()
 
-        serializer = NotificationSerializer(notifications_page, many=True)
+        data = []
+        for _, kind, row in page_items:
+            if kind == 'notification':
+                data.extend(notification_values.serialize_rows([row], fields))
+                continue
+            item = announcement_values.serialize_rows([row])[0]
+            item.update({
+                'announcement_id': item['id'],
+                'recipient_user_id': user_id,
+                'notification_type': 'announcement',
+                'is_read': item['id'] <= last_read_id or item['id'] in read_set,
+                'post_id': None,
+                'comment_id': None,
+                'aggregate_count': 1,
+            })
+            data.append(item)
         return {
-            'data': serializer.data,
+            'data': pick_fields(data, fields),
             'pagination': {
-                'current_page': notifications_page.number,
-                'total_pages': paginator.num_pages,
-                'total_items': paginator.count,
-                'page_size': int(page_size)
+                'current_page': page,
+                'total_pages': num_pages,
+                'total_items': total,
+                'page_size': page_size
             }
         }
 
     @staticmethod
-    def create_comment_notification(comment, post, commenter_id):
+    def _visible_announcements(user_id):
+        """对用户可见的公告：广播公告 + 定向给该用户的公告"""
+        targeted = AnnouncementRecipient.objects.filter(user_id=user_id).values('announcement_id')
+        # is_broadcast__in 生成 "is_broadcast IN (1)"，SQLite 可走索引（is_broadcast=True 只生成裸列，无法走索引）
+        return Announcement.objects.filter(Q(is_broadcast__in=[True]) | Q(id__in=targeted))
+
+    @staticmethod
+    def _read_announcement_ids(user_id, last_read_id):
+        """游标之后被单独标记已读的公告ID（子查询）"""
+        return AnnouncementReceipt.objects.filter(
+            user_id=user_id, announcement_id__gt=last_read_id
+        ).values('announcement_id')
+
+    @staticmethod
+    def _get_announcement_cursor(user_id):
+        """获取用户的公告已读游标，没有记录时为0"""
+        cursor = AnnouncementCursor.objects.filter(user_id=user_id).values_list('last_read_id', flat=True).first()
+        return cursor or 0
+
+    @staticmethod
+    def count_unread_announcements(user_id):
+        """统计用户未读公告数量"""
+        last_read_id = NotificationService._get_announcement_cursor(user_id)
+        return NotificationService._visible_announcements(user_id).filter(
+            id__gt=last_read_id
+        ).exclude(
+            id__in=NotificationService._read_announcement_ids(user_id, last_read_id)
+        ).count()
+
+    @staticmethod
+    def mark_announcement_read(announcement_id, user_id):
         """
-        创建评论相关通知
-        :param comment: 评论对象
-        :param post: 帖子对象
-        :param commenter_id: 评论者ID
+        标记单条公告为已读
+        :param announcement_id: 公告ID
+        :param user_id: 用户ID
+        :return: 操作结果
         """
-        # 通知帖子作者（如果不是自己评论自己的帖子）
-        if post.user_id != commenter_id:
-            notification = Notification(
-                recipient_user_id=post.user_id,
-                sender_user_id=commenter_id,
-                notification_type='reply',
-                message=f"用户{commenter_id}评论了您的帖子《{post.title}》",
-                post_id=post.id,
-                comment_id=comment.id
+        if not NotificationService._visible_announcements(user_id).filter(pk=announcement_id).exists():
+            return {
+                'success': False,
+                'message': '公告不存在'
+            }
+        if announcement_id > NotificationService._get_announcement_cursor(user_id):
+            _, created = AnnouncementReceipt.objects.get_or_create(user_id=user_id, announcement_id=announcement_id)
+            if created:
+                NotificationService.adjust_unread_count(user_id, -1)
+                hub.publish(user_id, 'read', {'announcement_ids': [announcement_id]})
+        return {
+            'success': True,
+            'message': '公告已标记为已读'
+        }
+
+    @staticmethod
+    def enqueue(event_type, payload):
+        """
+        写入通知发件箱（需在业务写入的同一事务内调用）
+        :param event_type: 事件类型，见 NotificationOutbox.EVENT_TYPES
+        :param payload: 事件数据
+        """
+        NotificationOutbox.objects.create(event_type=event_type, payload=payload)
+
+    @staticmethod
+    def process_outbox(batch_size=100, worker_id=None):
+        """
+        领取并处理一批发件箱事件
+        - 条件 UPDATE 领取，多个 worker 并发时同一事件只会被一个 worker 处理
+        - 帖子、评论按批一次查询，通知 bulk_create 批量写入
+        - 处理成功的事件与通知写入在同一事务内删除，发件箱只保留待处理和失败事件
+        - 失败次数达到 OUTBOX_MAX_ATTEMPTS 的事件记录 failed_at，不再领取
+        :param batch_size: 每批事件数量
+        :param worker_id: 领取者标识
+        :return: 本批处理的事件数量
+        """
+        worker_id = worker_id or str(uuid.uuid4())
+        now = timezone.now()
+        pending = NotificationOutbox.objects.filter(
+            Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - timedelta(seconds=OUTBOX_LEASE_SECONDS)),
+            failed_at__isnull=True,
+        )
+        ids = list(pending.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return 0
+        pending.filter(id__in=ids).update(claimed_by=worker_id, claimed_at=now)
+        events = list(NotificationOutbox.objects.filter(id__in=ids, claimed_by=worker_id, failed_at__isnull=True))
+        if not events:
+            return 0
+        event_ids = [e.id for e in events]
+
+        try:
+            with transaction.atomic():
+                notifications = NotificationService._build_notifications(events)
+                Notification.objects.bulk_create(notifications, batch_size=500)
+                NotificationOutbox.objects.filter(id__in=event_ids, claimed_by=worker_id).delete()
+        except Exception as e:
+            # 本次失败后达到上限的事件标记为失败（死信），其余释放领取等待重试
+            NotificationOutbox.objects.filter(id__in=event_ids).update(
+                claimed_by=None, claimed_at=None, attempts=F('attempts') + 1, last_error=str(e)[:1000],
+                failed_at=Case(When(attempts__gte=OUTBOX_MAX_ATTEMPTS - 1, then=Value(timezone.now())), default=None),
             )
-            notification.save()
+            raise
 
-        # 通知被回复的用户（如果有父评论且不是回复自己）
-        parent_comment_id = comment.parent_comment_id
-        if parent_comment_id and parent_comment_id > 0:
-            try:
-                parent_comment = Comment.objects.get(pk=parent_comment_id)
-                if (parent_comment.user_id != commenter_id and
-                        parent_comment.user_id != post.user_id):  # 避免重复通知帖子作者
-                    notification = Notification(
-                        recipient_user_id=parent_comment.user_id,
-                        sender_user_id=commenter_id,
+        # 未读计数由接收者下次读取时重建
+        NotificationService.invalidate_unread_count({n.recipient_user_id for n in notifications})
+        return len(events)
+
+    @staticmethod
+    def _build_notifications(events):
+        """
+        根据发件箱事件生成通知对象（未保存）
+        - 评论：通知帖子作者；回复评论时再通知被回复者（避免重复通知帖子作者）
+        - 点赞：通知被点赞内容的作者
+        - 不给自己发通知
+        """
+        post_ids = {e.payload['post_id'] for e in events if e.event_type in ('comment', 'like_post')}
+        comment_ids = {e.payload['comment_id'] for e in events if e.event_type == 'like_comment'}
+        comment_ids |= {e.payload['parent_comment_id'] for e in events
+                        if e.event_type == 'comment' and e.payload.get('parent_comment_id')}
+        posts = Post.objects.only('id', 'title', 'user_id').in_bulk(post_ids)
+        comments = Comment.objects.only('id', 'user_id', 'post_id').in_bulk(comment_ids)
+
+        notifications = []
+        for e in events:
+            p = e.payload
+            sender = p['sender_user_id']
+            if e.event_type == 'comment':
+                post = posts.get(p['post_id'])
+                if post is None:
+                    continue
+                if post.user_id and post.user_id != sender:
+                    notifications.append(Notification(
+                        recipient_user_id=post.user_id,
+                        sender_user_id=sender,
+                        notification_type='reply',
+                        message=f"用户{sender}评论了您的帖子《{post.title}》",
+                        post_id=post.id,
+                        comment_id=p['comment_id'],
+                        created_at=e.created_at
+                    ))
+                parent = comments.get(p.get('parent_comment_id'))
+                if (parent is not None and parent.user_id and parent.user_id != sender and
+                        parent.user_id != post.user_id):  # 避免重复通知帖子作者
+                    notifications.append(Notification(
+                        recipient_user_id=parent.user_id,
+                        sender_user_id=sender,
                         notification_type='reply',
-                        message=f"用户{commenter_id}回复了您的评论",
+                        message=f"用户{sender}回复了您的评论",
+                        post_id=post.id,
+                        comment_id=p['comment_id'],
+                        created_at=e.created_at
+                    ))
+            elif e.event_type == 'like_post':
+                post = posts.get(p['post_id'])
+                if post is not None and post.user_id and post.user_id != sender:
+                    notifications.append(Notification(
+                        recipient_user_id=post.user_id,
+                        sender_user_id=sender,
+                        notification_type='like',
+                        message=f"用户{sender}赞了您的帖子《{post.title}》",
                         post_id=post.id,
-                        comment_id=comment.id
-                    )
-                    notification.save()
-            except Comment.DoesNotExist:
-                # 父评论不存在，忽略
-                pass
+                        created_at=e.created_at
+                    ))
+            elif e.event_type == 'like_comment':
+                comment = comments.get(p['comment_id'])
+                if comment is not None and comment.user_id and comment.user_id != sender:
+                    notifications.append(Notification(
+                        recipient_user_id=comment.user_id,
+                        sender_user_id=sender,
+                        notification_type='like',
+                        message=f"用户{sender}赞了您的评论",
+                        post_id=comment.post_id,
+                        comment_id=comment.id,
+                        created_at=e.created_at
+                    ))
+        return notifications
+
+    @staticmethod
+    def archive_read_notifications(before, after_id=0, batch_size=1000, delete=False):
+        """
+        把一批早于 before 的已读通知移入归档表（或直接删除）
+        - 按主键顺序扫描，调用方用返回的 last_id 继续下一批，每批一个短事务
+        - 只处理已读通知，未读计数不受影响
+        :param before: 截止时间
+        :param after_id: 从该ID之后开始扫描
+        :param batch_size: 每批数量
+        :param delete: 为 True 时直接删除，不写归档表
+        :return: (本批处理数量, 本批最大ID；没有更多时为 None)
+        """
+        ids = list(Notification.objects.filter(
+            id__gt=after_id, is_read=True, created_at__lt=before
+        ).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return 0, None
+
+        with transaction.atomic():
+            if not delete:
+                now = timezone.now()
+                rows = Notification.objects.filter(id__in=ids).values(
+                    'id', 'recipient_user_id', 'sender_user_id', 'notification_type', 'message',
+                    'post_id', 'comment_id', 'aggregate_count', 'created_at')
+                # 与上次中断的批次重叠时忽略已归档的行
+                NotificationArchive.objects.bulk_create(
+                    [NotificationArchive(archived_at=now, **row) for row in rows], ignore_conflicts=True)
+            count, _ = Notification.objects.filter(id__in=ids, is_read=True).delete()
+        return count, ids[-1]
+
+    @staticmethod
+    def collapse_like_notifications(batch_size=500):
+        """
+        合并一批重复的点赞通知
+        - 同一接收者、同一目标（帖子或评论）、同一已读状态的多条点赞通知只保留最新一条，
+          改写为"用户X等N人赞了…"，其余删除
+        - N 为不同点赞者的人数（同一用户取消后再点赞产生的重复通知只算一人），
+          已合并过的通知另计其代表的其余人数
+        - 每批一个事务，被合并的分组不会再次出现，调用方循环到返回 0 为止
+        :param batch_size: 每批合并的分组数量
+        :return: 本批删除的通知数量
+        """
+        groups = list(
+            Notification.objects.filter(notification_type='like', recipient_user_id__isnull=False,
+                                        post_id__isnull=False)
+            .order_by().values_list('recipient_user_id', 'post_id', 'comment_id', 'is_read')
+            .annotate(n=Count('id'), senders=Count('sender_user_id', distinct=True),
+                      merged=Sum('aggregate_count') - Count('id'))
+            .filter(n__gt=1)[:batch_size]
+        )
+        if not groups:
+            return 0
+        people = {group[:4]: group[5] + group[6] for group in groups}
+        keys = set(people)
+
+        # 一次查询取出本批分组的所有通知，按时间倒序分组，每组第一条保留
+        buckets = {}
+        rows = Notification.objects.filter(
+            notification_type='like',
+            recipient_user_id__in={key[0] for key in keys},
+            post_id__in={key[1] for key in keys},
+        ).order_by('-created_at', '-id').only(
+            'id', 'recipient_user_id', 'sender_user_id', 'message', 'post_id', 'comment_id', 'is_read',
+            'aggregate_count')
+        for row in rows:
+            key = (row.recipient_user_id, row.post_id, row.comment_id, row.is_read)
+            if key in keys:
+                buckets.setdefault(key, []).append(row)
+
+        keepers, removed_ids, unread_recipients = [], [], set()
+        for key, bucket in buckets.items():
+            keeper = bucket[0]
+            keeper.aggregate_count = max(people[key], 1)
+            # 保留原消息中"赞了"之后的部分（帖子标题等），合并过的通知同样适用
+            target = keeper.message.partition('赞了')[2]
+            if keeper.aggregate_count > 1:
+                keeper.message = f"用户{keeper.sender_user_id}等{keeper.aggregate_count}人赞了{target}"[:200]
+            else:
+                keeper.message = f"用户{keeper.sender_user_id}赞了{target}"[:200]
+            keepers.append(keeper)
+            removed_ids.extend(row.id for row in bucket[1:])
+            if not keeper.is_read:
+                unread_recipients.add(keeper.recipient_user_id)
+
+        with transaction.atomic():
+            Notification.objects.bulk_update(keepers, ['aggregate_count', 'message'], batch_size=500)
+            deleted, _ = Notification.objects.filter(id__in=removed_ids).delete()
+
+        # 合并未读通知会减少未读数
+        NotificationService.invalidate_unread_count(unread_recipients)
+        return deleted
 
     @staticmethod
     def mark_notification_read(notification_id, user_id):
         """
         标记通知为已读
+        - 按 (id, 接收者, 未读) 条件 UPDATE，正常情况只执行一条语句；未更新时再区分不存在/无权限/已读
         :param notification_id: 通知ID
         :param user_id: 用户ID
         :return: 操作结果
         """
-        try:
-            notification = Notification.objects.get(pk=notification_id)
-
+        updated = Notification.objects.filter(
+            pk=notification_id, recipient_user_id=user_id, is_read=False
+        ).update(is_read=True)
+        if updated:
+            NotificationService.adjust_unread_count(user_id, -1)
+            hub.publish(user_id, 'read', {'notification_ids': [int(notification_id)]})
+        else:
+            recipient = Notification.objects.filter(pk=notification_id).values_list(
+                'recipient_user_id', flat=True).first()
+            if recipient is None:
+                return {
+                    'success': False,
+                    'message': '通知不存在'
+                }
             # 检查用户是否有权限操作此通知
-            if notification.recipient_user_id != user_id:
+            if recipient != user_id:
                 return {
                     'success': False,
                     'message': '无权操作此通知'
                 }
 
-            # 标记通知为已读
-            notification.is_read = True
-            notification.save()
-
-            return {
-                'success': True,
-                'message': '通知已标记为已读'
-            }
+        return {
+            'success': True,
+            'message': '通知已标记为已读'
+        }
 
-        except Notification.DoesNotExist:
-            return {
-                'success': False,
-                'message': '通知不存在'
-            }
+    @staticmethod
+    def mark_notifications_read(notification_ids, user_id):
+        """
+        批量标记通知为已读
+        - 一条按接收者过滤的 UPDATE ... WHERE id IN (...)，不属于该用户或已读的ID被忽略
+        :param notification_ids: 通知ID列表
+        :param user_id: 用户ID
+        :return: 操作结果（updated 为实际由未读变为已读的数量）
+        """
+        ids = sorted(set(notification_ids))
+        updated = Notification.objects.filter(
+            id__in=ids, recipient_user_id=user_id, is_read=False
+        ).update(is_read=True) if ids else 0
+        if updated:
+            NotificationService.adjust_unread_count(user_id, -updated)
+            hub.publish(user_id, 'read', {'notification_ids': ids})
+        return {
+            'success': True,
+            'message': f'已标记 {updated} 条通知为已读',
+            'updated': updated
+        }
 
     @staticmethod
     def mark_all_notifications_read(user_id):
@@ -294,103 +1203,305 @@ class NotificationService:
         # 标记所有通知为已读
         updated_count = notifications.update(is_read=True)
 
+        # 公告：游标推进到可见的最新公告，并清理被游标吸收的单条回执
+        unread_announcements = NotificationService.count_unread_announcements(user_id)
+        latest_id = NotificationService._visible_announcements(user_id).order_by('-id').values_list(
+            'id', flat=True).first()
+        if latest_id:
+            with transaction.atomic():
+                AnnouncementCursor.objects.update_or_create(user_id=user_id, defaults={'last_read_id': latest_id})
+                AnnouncementReceipt.objects.filter(user_id=user_id, announcement_id__lte=latest_id).delete()
+        NotificationService.reset_unread_count(user_id)
+        hub.publish(user_id, 'read', {'all': True})
+
         return {
             'success': True,
-            'message': f'已标记{updated_count}条通知为已读'
+            'message': f'已标记{updated_count + unread_announcements}条通知为已读'
         }
 
     @staticmethod
     def create_announcement(message, recipient_user_ids=None, sender_user_id=None):
         """
         创建公告/系统通知
-        - recipient_user_ids=None 表示广播
-        - 否则为定向通知
+        - recipient_user_ids=None 表示广播，只写一行公告
+        - 否则为定向公告，接收者批量写入 AnnouncementRecipient
         """
-        created = 0
-        if not recipient_user_ids:
-            notif = Notification(
-                recipient_user_id=None,
+        recipient_user_ids = list(dict.fromkeys(recipient_user_ids or []))
+        with transaction.atomic():
+            announcement = Announcement.objects.create(
                 sender_user_id=sender_user_id,
-                notification_type='announcement',
                 message=message,
+                is_broadcast=not recipient_user_ids,
+                recipient_count=len(recipient_user_ids),
             )
-            notif.save()
-            created = 1
-        else:
-            for rid in recipient_user_ids:
-                notif = Notification(
-                    recipient_user_id=rid,
-                    sender_user_id=sender_user_id,
-                    notification_type='announcement',
-                    message=message,
-                )
-                notif.save()
-                created += 1
+            AnnouncementRecipient.objects.bulk_create([
+                AnnouncementRecipient(announcement_id=announcement.id, user_id=rid)
+                for rid in recipient_user_ids
+            ], batch_size=1000)
+        # 不逐个用户递增计数，递增公告版本号让各用户的未读计数在下次读取时重建
+        NotificationService.bump_announcement_version()
+        NotificationService.publish_announcement(announcement, recipient_user_ids)
+
+        target = '全体用户' if announcement.is_broadcast else f'{len(recipient_user_ids)}位用户'
         return {
             'success': True,
-            'message': f'创建公告成功，共创建{created}条',
-            'created': created
+            'message': f'创建公告成功，发送给{target}',
+            'created': 1,
+            'announcement_id': announcement.id
         }
 
     @staticmethod
     def get_unread_count(user_id):
-        """获取未读通知数量（仅统计定向给用户的通知，广播不计入未读）"""
+        """
+        获取未读通知数量（定向通知 + 未读公告）
+        - 命中缓存时只有一次缓存读取；未命中或公告版本变化时从数据库重建
+        - 缓存不支持原子 incr 时不缓存计数，每次从数据库统计（增量维护会丢失并发的增减）
+        """
+        if not cache_has_atomic_incr():
+            return NotificationService.count_unread(user_id)
+        count_key = UNREAD_COUNT_KEY.format(user_id=user_id)
+        version_key = UNREAD_VERSION_KEY.format(user_id=user_id)
+        cached = cache.get_many([count_key, version_key, ANNOUNCEMENT_VERSION_KEY])
+        announcement_version = cached.get(ANNOUNCEMENT_VERSION_KEY, 0)
+        if count_key in cached and cached.get(version_key) == announcement_version:
+            return cached[count_key]
+
+        count = NotificationService.count_unread(user_id)
+        cache.set_many({count_key: count, version_key: announcement_version}, UNREAD_CACHE_TIMEOUT)
+        return count
+
+    @staticmethod
+    def count_unread(user_id):
+        """从数据库统计未读通知数量（定向通知 + 未读公告）"""
         return Notification.objects.filter(
             Q(recipient_user_id=user_id) & Q(is_read=False)
-        ).count()
+        ).count() + NotificationService.count_unread_announcements(user_id)
+
+    @staticmethod
+    def adjust_unread_count(user_id, delta):
+        """
+        增减缓存中的未读计数
+        - 计数不在缓存中时不处理，下次读取时重建
+        """
+        if not user_id or not cache_has_atomic_incr():
+            return
+        count_key = UNREAD_COUNT_KEY.format(user_id=user_id)
+        try:
+            if cache.incr(count_key, delta) < 0:
+                cache.delete(count_key)
+        except ValueError:
+            pass
+
+    @staticmethod
+    def invalidate_unread_count(user_ids):
+        """删除未读计数缓存，下次读取时从数据库重建"""
+        if not cache_has_atomic_incr():
+            return
+        cache.delete_many([UNREAD_COUNT_KEY.format(user_id=uid) for uid in user_ids if uid])
+
+    @staticmethod
+    def reset_unread_count(user_id):
+        """全部已读后将未读计数置0"""
+        if not cache_has_atomic_incr():
+            return
+        cache.set_many({
+            UNREAD_COUNT_KEY.format(user_id=user_id): 0,
+            UNREAD_VERSION_KEY.format(user_id=user_id): cache.get(ANNOUNCEMENT_VERSION_KEY, 0),
+        }, UNREAD_CACHE_TIMEOUT)
+
+    @staticmethod
+    def publish_notification(notification):
+        """推送新通知（同时进入事件缓冲区，供断线重连补发）"""
+        hub.publish(notification.recipient_user_id, 'notification',
+                    notification_values.serialize_objects([notification])[0])
+
+    @staticmethod
+    def relay_new_notifications(after_id=None, limit=500):
+        """
+        把 after_id 之后新写入的通知推送给在线用户
+        - 通知由独立的 worker 进程生成，SSE 所在进程通过此方法按主键增量轮询
+        - after_id 为 None 时只返回当前最大ID，不推送历史通知
+        :return: 已推送到的最大通知ID
+        """
+        if after_id is None:
+            return Notification.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        notifications = list(Notification.objects.filter(id__gt=after_id).order_by('id')[:limit])
+        if not notifications:
+            return after_id
+        # 本进程缓存中的未读计数可能未感知 worker 的写入
+        NotificationService.invalidate_unread_count({n.recipient_user_id for n in notifications})
+        for notification in notifications:
+            NotificationService.publish_notification(notification)
+        return notifications[-1].id
+
+    @staticmethod
+    def publish_announcement(announcement, recipient_user_ids):
+        """推送新公告：广播发给所有连接，定向公告作为一条事件发给接收者集合"""
+        data = announcement_values.serialize_objects([announcement])[0]
+        data.update({'announcement_id': announcement.id, 'notification_type': 'announcement', 'is_read': False})
+        target = None if announcement.is_broadcast else frozenset(recipient_user_ids)
+        hub.publish(target, 'announcement', data)
+
+    @staticmethod
+    def bump_announcement_version():
+        """递增公告版本号，使所有用户的未读计数缓存失效"""
+        if not cache_has_atomic_incr():
+            return
+        try:
+            cache.incr(ANNOUNCEMENT_VERSION_KEY)
+        except ValueError:
+            cache.add(ANNOUNCEMENT_VERSION_KEY, 1, None)
 
 
 class LikeService:
     """点赞相关服务"""
 
     @staticmethod
-    def toggle_like_post(post_id, user_id):
-        try:
-            post = Post.objects.get(pk=post_id)
-        except Post.DoesNotExist:
+    def attach_liked(items, user_id, target):
+        """
+        为一页序列化结果补充 liked 字段（当前用户是否已点赞）
+        - 整页只执行一次 IN 查询，命中 (user_id, post_id/comment_id) 唯一索引
+        :param items: 序列化后的字典列表（原地修改）
+        :param user_id: 当前用户ID，为空时全部为 False
+        :param target: 'post' 或 'comment'
+        """
+        items = list(items)
+        liked_ids = set()
+        if user_id and items:
+            field = f'{target}_id'
+            liked_ids = set(Like.objects.filter(
+                user_id=user_id, **{f'{field}__in': [item['id'] for item in items]}
+            ).values_list(field, flat=True))
+        for item in items:
+            item['liked'] = item['id'] in liked_ids
+
+    @staticmethod
+    def get_like_states(user_id, post_ids=(), comment_ids=()):
+        """
+        批量获取点赞数与当前用户的点赞状态
+        - 帖子、评论各一条查询：读取计数列，liked 由 EXISTS 子查询命中 (user_id, 对象ID) 唯一索引
+        :param user_id: 当前用户ID，为空时 liked 均为 False
+        :param post_ids: 帖子ID列表
+        :param comment_ids: 评论ID列表
+        :return: {'posts': {id: {...}}, 'comments': {id: {...}}}，不存在的ID不返回
+        """
+        result = {}
+        for key, model, field, ids in (('posts', Post, 'post_id', post_ids),
+                                       ('comments', Comment, 'comment_id', comment_ids)):
+            states = {}
+            if ids:
+                liked = Exists(Like.objects.filter(user_id=user_id, **{field: OuterRef('pk')}))
+                rows = (model.objects.filter(id__in=set(ids)).order_by()
+                        .annotate(liked=liked if user_id else Value(False))
+                        .values_list('id', 'like_count', 'liked'))
+                states = {pk: {'like_count': count, 'liked': bool(flag)} for pk, count, flag in rows}
+            result[key] = states
+        return result
+
+    @staticmethod
+    def _insert_like(user_id, post_id=None, comment_id=None):
+        """
+        插入点赞记录，已存在时忽略（依赖 uniq_user_post_like / uniq_user_comment_like 唯一约束）
+        - 单条 INSERT ... 忽略冲突语句，并发点赞不会触发唯一约束错误
+        :return: 实际插入的行数（0 或 1）
+        """
+        ops = connection.ops
+        sql = (f'{ops.insert_statement(on_conflict=OnConflict.IGNORE)} {ops.quote_name(Like._meta.db_table)} '
+               f'(user_id, post_id, comment_id, created_at) VALUES (%s, %s, %s, %s) '
+               f'{ops.on_conflict_suffix_sql([], OnConflict.IGNORE, [], [])}')
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user_id, post_id, comment_id, ops.adapt_datetimefield_value(timezone.now())])
+            return cursor.rowcount
+
+    @staticmethod
+    def _apply_like(user_id, liked, **target):
+        """
+        按目标状态增删点赞记录
+        :param liked: True 点赞、False 取消、None 切换（先尝试取消，没有可取消的点赞再点赞）
+        :param target: post_id=... 或 comment_id=...
+        :return: (最终是否点赞, 点赞数变化量)
+        """
+        if liked is not True:
+            deleted, _ = Like.objects.filter(user_id=user_id, **target).delete()
+            if deleted or liked is False:
+                return False, -deleted
+        return True, LikeService._insert_like(user_id, **target)
+
+    @staticmethod
+    def set_like_post(post_id, user_id, liked=None):
+        """
+        设置帖子点赞状态
+        - 点赞为忽略冲突的 INSERT、取消为条件 DELETE，只有记录真正变化时才更新计数和发送通知，
+          并发请求不会报错或重复计数
+        - liked 为 True/False 时是幂等的设置操作（PUT/DELETE），客户端可以安全重试
+        - 点赞数与 updated_at 在同一条 UPDATE 中刷新，热度分随后在同一事务内按更新后的点赞数重算
+        :param post_id: 帖子ID
+        :param user_id: 用户ID
+        :param liked: 目标状态，None 表示切换
+        :return: 操作结果，changed 表示状态是否发生变化
+        """
+        post = Post.objects.filter(pk=post_id).values_list('user_id', 'created_at').first()
+        if post is None:
             return {'success': False, 'message': '帖子不存在'}
+        author_id, created_at = post
 
-        like = Like.objects.filter(user_id=user_id, post_id=post_id).first()
-        if like:
-            like.delete()
-            return {'success': True, 'liked': False, 'message': '已取消点赞'}
-        else:
-            Like.objects.create(user_id=user_id, post_id=post_id)
-            # 不是自己给自己点赞时发送通知
-            if post.user_id and post.user_id != user_id:
-                Notification.objects.create(
-                    recipient_user_id=post.user_id,
-                    sender_user_id=user_id,
-                    notification_type='like',
-                    message=f"用户{user_id}赞了您的帖子《{post.title}》",
-                    post_id=post.id,
-                )
-            return {'success': True, 'liked': True, 'message': '点赞成功'}
+        with transaction.atomic():
+            liked, delta = LikeService._apply_like(user_id, liked, post_id=post_id)
+            if delta:
+                # 同时刷新 updated_at，帖子详情的 Last-Modified 随点赞数变化
+                Post.objects.filter(pk=post_id).update(
+                    like_count=Greatest(F('like_count') + delta, 0), updated_at=timezone.now())
+                PostService.refresh_hot_score(post_id, created_at)
+                # 不是自己给自己点赞时由后台 worker 发送通知
+                if delta > 0 and author_id and author_id != user_id:
+                    NotificationService.enqueue('like_post', {'post_id': post_id, 'sender_user_id': user_id})
+        if delta:
+            PostService.bump_feed_version()
+        return LikeService._like_result(liked, delta)
 
     @staticmethod
-    def toggle_like_comment(comment_id, user_id):
-        try:
-            comment = Comment.objects.get(pk=comment_id)
-        except Comment.DoesNotExist:
+    def set_like_comment(comment_id, user_id, liked=None):
+        """
+        设置评论点赞状态，语义同 set_like_post
+        :param comment_id: 评论ID
+        :param user_id: 用户ID
+        :param liked: 目标状态，None 表示切换
+        :return: 操作结果，changed 表示状态是否发生变化
+        """
+        comment = Comment.objects.filter(pk=comment_id).values_list('post_id', 'user_id').first()
+        if comment is None:
             return {'success': False, 'message': '评论不存在'}
+        post_id, author_id = comment
 
-        like = Like.objects.filter(user_id=user_id, comment_id=comment_id).first()
-        if like:
-            like.delete()
-            return {'success': True, 'liked': False, 'message': '已取消点赞'}
-        else:
-            Like.objects.create(user_id=user_id, comment_id=comment_id)
-            # 不是自己给自己点赞时发送通知
-            if comment.user_id and comment.user_id != user_id:
-                Notification.objects.create(
-                    recipient_user_id=comment.user_id,
-                    sender_user_id=user_id,
-                    notification_type='like',
-                    message=f"用户{user_id}赞了您的评论",
-                    post_id=comment.post_id,
-                    comment_id=comment.id,
-                )
-            return {'success': True, 'liked': True, 'message': '点赞成功'}
+        with transaction.atomic():
+            liked, delta = LikeService._apply_like(user_id, liked, comment_id=comment_id)
+            if delta:
+                Comment.objects.filter(pk=comment_id).update(like_count=Greatest(F('like_count') + delta, 0))
+                # 不是自己给自己点赞时由后台 worker 发送通知
+                if delta > 0 and author_id and author_id != user_id:
+                    NotificationService.enqueue('like_comment', {'comment_id': comment_id, 'sender_user_id': user_id})
+        if delta:
+            CommentService.bump_comments_version(post_id)
+        return LikeService._like_result(liked, delta)
+
+    @staticmethod
+    def _like_result(liked, delta):
+        return {
+            'success': True,
+            'liked': liked,
+            'changed': bool(delta),
+            'message': '点赞成功' if liked else '已取消点赞'
+        }
+
+    @staticmethod
+    def toggle_like_post(post_id, user_id):
+        """切换帖子点赞状态"""
+        return LikeService.set_like_post(post_id, user_id)
+
+    @staticmethod
+    def toggle_like_comment(comment_id, user_id):
+        """切换评论点赞状态"""
+        return LikeService.set_like_comment(comment_id, user_id)
 
     @staticmethod
     def mark_notification_read(notification_id, user_id):
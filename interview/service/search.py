@@ -0,0 +1,336 @@
+"""
+论坛全文搜索
+- SQLite：FTS5 虚拟表 interview_search，BM25 排序（标题权重高于正文）
+- MySQL：帖子/评论表上的 FULLTEXT 索引（ngram 分词），MATCH ... AGAINST 相关度排序
+- 中文没有空格分词，写入 FTS5 前先切成重叠二元组（bigram），查询时按同样规则切分后做短语匹配
+- 索引行的 rowid 由对象编码：帖子 = id * 2，评论 = id * 2 + 1，增删改都按 rowid 定位
+"""
+import base64
+import html
+import json
+import re
+
+from django.db import connection, transaction
+from django.db.models import Value
+from rest_framework import serializers
+
+from ..models import Post, Comment
+
+SEARCH_TABLE = 'interview_search'
+# 摘要长度（字符数）及命中词之前保留的上下文长度
+SNIPPET_LENGTH = 80
+SNIPPET_CONTEXT = 20
+
+# 中日韩字符（含假名、谚文），连续出现时按二元组切分
+CJK_RUN = re.compile('[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+')
+
+
+def tokenize(text):
+    """
+    将文本转换为 FTS5 unicode61 分词器可用的形式
+    - 中文连续串切成重叠二元组，并在末尾补上最后一个字（单字查询用前缀匹配即可覆盖每个字）
+    - 其他文本原样保留，由 unicode61 按空白和标点切分
+    :param text: 原始文本
+    :return: 空格分隔的文本
+    """
+    def split_run(match):
+        run = match.group()
+        grams = [run[i:i + 2] for i in range(len(run) - 1)]
+        grams.append(run[-1])
+        return ' ' + ' '.join(grams) + ' '
+    return CJK_RUN.sub(split_run, text or '')
+
+
+def search_terms(q):
+    """拆分搜索词，丢弃不含任何文字的片段"""
+    return [term for term in (q or '').split() if re.search(r'\w', term)]
+
+
+def build_match_query(q):
+    """
+    构造 FTS5 MATCH 表达式：每个搜索词一个短语，多个词之间为 AND
+    - 以中文结尾的词：末尾单字只可能接在更长的中文串中间，去掉该补位字；单字词改用前缀匹配
+    :param q: 用户输入
+    :return: MATCH 表达式，没有有效搜索词时返回 None
+    """
+    phrases = []
+    for term in search_terms(q):
+        tokens = tokenize(term).split()
+        prefix = False
+        if CJK_RUN.match(term[-1]):
+            if len(CJK_RUN.findall(term)[-1]) > 1:
+                tokens.pop()
+            else:
+                prefix = True
+        phrase = '"' + ' '.join(tokens).replace('"', '""') + '"'
+        phrases.append(phrase + '*' if prefix else phrase)
+    return ' '.join(phrases) or None
+
+
+def build_boolean_query(q):
+    """构造 MySQL BOOLEAN MODE 查询：每个搜索词都必须出现"""
+    terms = [term.replace('"', '') for term in search_terms(q)]
+    return ' '.join(f'+"{term}"' for term in terms if term) or None
+
+
+def make_snippet(text, terms):
+    """
+    截取包含首个命中词的摘要，命中词用 <mark> 标出（其余内容已转义）
+    - 在原文上切分命中词后逐段转义，搜索 amp、lt 等词不会命中转义产生的实体
+    :param text: 原文
+    :param terms: 搜索词列表
+    :return: 摘要 HTML
+    """
+    text = text or ''
+    lowered = text.lower()
+    positions = [p for p in (lowered.find(t.lower()) for t in terms) if p >= 0]
+    start = max(0, min(positions) - SNIPPET_CONTEXT) if positions else 0
+    window = text[start:start + SNIPPET_LENGTH]
+    escaped = html.escape(window)
+    patterns = [re.escape(t) for t in sorted({t for t in terms if t}, key=len, reverse=True)]
+    if patterns:
+        # 切分结果中奇数位置为命中词（捕获组）
+        parts = re.split(f'({"|".join(patterns)})', window, flags=re.IGNORECASE)
+        escaped = ''.join(f'<mark>{html.escape(part)}</mark>' if i % 2 else html.escape(part)
+                          for i, part in enumerate(parts))
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + SNIPPET_LENGTH < len(text) else ''
+    return prefix + escaped + suffix
+
+
+class SearchService:
+    """全文搜索相关服务"""
+
+    @staticmethod
+    def is_fts5():
+        """当前数据库是否使用 SQLite FTS5 索引（MySQL 由 FULLTEXT 索引自动维护）"""
+        return connection.vendor == 'sqlite'
+
+    @staticmethod
+    def post_rowid(post_id):
+        return int(post_id) * 2
+
+    @staticmethod
+    def comment_rowid(comment_id):
+        return int(comment_id) * 2 + 1
+
+    @staticmethod
+    def index_post(post):
+        """新增或更新帖子的索引行（与帖子写入在同一事务内调用）"""
+        if SearchService.is_fts5():
+            SearchService._upsert([(SearchService.post_rowid(post.id), post.title, post.content, post.id)])
+
+    @staticmethod
+    def index_comment(comment):
+        """新增或更新评论的索引行"""
+        if SearchService.is_fts5():
+            SearchService._upsert(
+                [(SearchService.comment_rowid(comment.id), '', comment.content, comment.post_id)])
+
+    @staticmethod
+    def remove_post(post_id):
+        """删除帖子的索引行"""
+        SearchService.remove_posts([post_id])
+
+    @staticmethod
+    def remove_posts(post_ids):
+        """
+        批量删除帖子的索引行
+        - 只删除帖子本身的行，不查询评论：评论的索引行由 purge_deleted_posts 随评论分批删除，
+          在此之前残留的评论命中因帖子不存在在 _render 中被跳过
+        :param post_ids: 帖子ID列表
+        """
+        if SearchService.is_fts5() and post_ids:
+            SearchService._delete([SearchService.post_rowid(i) for i in post_ids])
+
+    @staticmethod
+    def remove_comments(comment_ids):
+        """删除评论的索引行"""
+        if SearchService.is_fts5():
+            SearchService._delete([SearchService.comment_rowid(i) for i in comment_ids])
+
+    @staticmethod
+    def _upsert(rows):
+        """rows: [(rowid, 标题, 正文, 帖子ID)]"""
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, title, body, post_id) VALUES (%s, %s, %s, %s)',
+                [(rowid, tokenize(title), tokenize(body), post_id) for rowid, title, body, post_id in rows],
+            )
+
+    @staticmethod
+    def _delete(rowids):
+        if rowids:
+            with connection.cursor() as cursor:
+                cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(r,) for r in rowids])
+
+    @staticmethod
+    def rebuild(batch_size=500, stdout=None):
+        """
+        清空并批量重建 FTS5 索引
+        :param batch_size: 每批写入的行数
+        :param stdout: 进度输出（管理命令传入）
+        :return: 写入的索引行数
+        """
+        if not SearchService.is_fts5():
+            return 0
+        total = 0
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            # 按主键分批读取，每批转换为 (rowid, 标题, 正文, 帖子ID)
+            sources = (
+                (Post.objects.values_list('id', 'title', 'content', 'id'), SearchService.post_rowid),
+                (Comment.objects.annotate(title=Value('')).values_list('id', 'title', 'content', 'post_id'),
+                 SearchService.comment_rowid),
+            )
+            for queryset, rowid in sources:
+                last_id = 0
+                while True:
+                    batch = list(queryset.filter(id__gt=last_id).order_by('id')[:batch_size])
+                    if not batch:
+                        break
+                    SearchService._upsert([(rowid(row[0]),) + row[1:] for row in batch])
+                    last_id = batch[-1][0]
+                    total += len(batch)
+                    if stdout:
+                        stdout.write(f'{queryset.model.__name__}: 已索引至 id={last_id}')
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        return total
+
+    @staticmethod
+    def encode_cursor(rank, rowid):
+        raw = json.dumps([rank, rowid])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        :return: (rank, rowid)
+        :raises ValueError: 游标格式不正确
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            rank, rowid = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            return float(rank), int(rowid)
+        except (TypeError, ValueError, UnicodeError):
+            raise ValueError('invalid cursor')
+
+    @staticmethod
+    def search(q, cursor=None, page_size=20, kind=None):
+        """
+        搜索帖子与评论
+        - 按相关度排序（rank 越小越相关），(rank, rowid) 作为游标键
+        :param q: 搜索词，空格分隔的多个词须同时出现
+        :param cursor: 上一页返回的 next_cursor
+        :param page_size: 每页数量
+        :param kind: 'post' / 'comment' / None（全部）
+        :return: 搜索结果与下一页游标
+        """
+        try:
+            page_size = max(1, min(int(page_size), 50))
+        except (TypeError, ValueError):
+            page_size = 20
+        after = None
+        if cursor:
+            try:
+                after = SearchService.decode_cursor(cursor)
+            except ValueError:
+                return {'success': False, 'message': 'cursor 参数无效'}
+
+        if SearchService.is_fts5():
+            query = build_match_query(q)
+            fetch = SearchService._search_fts5
+        elif connection.vendor == 'mysql':
+            query = build_boolean_query(q)
+            fetch = SearchService._search_mysql
+        else:
+            return {'success': False, 'message': '当前数据库不支持全文搜索'}
+        if not query:
+            return {'success': False, 'message': '请输入搜索关键词'}
+
+        hits = fetch(query, after, kind, page_size + 1)  # 多取一条判断是否还有下一页
+        has_more = len(hits) > page_size
+        hits = hits[:page_size]
+        return {
+            'success': True,
+            'data': SearchService._render(hits, search_terms(q)),
+            'pagination': {
+                'next_cursor': SearchService.encode_cursor(*hits[-1][:2]) if has_more else None,
+                'has_more': has_more,
+                'page_size': page_size
+            }
+        }
+
+    @staticmethod
+    def _search_fts5(query, after, kind, limit):
+        """:return: [(rank, rowid, post_id)]"""
+        sql = f'SELECT rank, rowid, post_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+        params = [query]
+        if kind in ('post', 'comment'):
+            sql += ' AND rowid %% 2 = %s'
+            params.append(0 if kind == 'post' else 1)
+        if after:
+            sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY rank, rowid LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    @staticmethod
+    def _search_mysql(query, after, kind, limit):
+        """:return: [(rank, rowid, post_id)]，rank 取相关度的相反数，与 FTS5 一样越小越相关"""
+        parts, params = [], []
+        if kind in (None, 'post'):
+            parts.append('SELECT -MATCH(title, content) AGAINST (%s IN BOOLEAN MODE) AS `rank`, id * 2 AS rid, id AS post_id '
+                         'FROM interview_post WHERE MATCH(title, content) AGAINST (%s IN BOOLEAN MODE)')
+            params += [query, query]
+        if kind in (None, 'comment'):
+            parts.append('SELECT -MATCH(content) AGAINST (%s IN BOOLEAN MODE) AS `rank`, id * 2 + 1 AS rid, post_id '
+                         'FROM interview_comment WHERE MATCH(content) AGAINST (%s IN BOOLEAN MODE)')
+            params += [query, query]
+        sql = f"SELECT `rank`, rid, post_id FROM ({' UNION ALL '.join(parts)}) hits"
+        if after:
+            sql += ' WHERE `rank` > %s OR (`rank` = %s AND rid > %s)'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY `rank`, rid LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [(float(rank), int(rid), post_id) for rank, rid, post_id in cursor.fetchall()]
+
+    @staticmethod
+    def _render(hits, terms):
+        """按命中结果批量读取帖子/评论原文，生成摘要；已删除对象的残留索引行跳过"""
+        post_ids = {post_id for _, _, post_id in hits}
+        comment_ids = [rowid // 2 for _, rowid, _ in hits if rowid % 2]
+        posts = Post.objects.only('id', 'title', 'content', 'created_at').in_bulk(post_ids)
+        comments = Comment.objects.only('id', 'post_id', 'content', 'created_at').in_bulk(comment_ids)
+        created_at = serializers.DateTimeField()
+
+        data = []
+        for rank, rowid, post_id in hits:
+            post = posts.get(post_id)
+            if post is None:
+                continue
+            if rowid % 2:
+                obj = comments.get(rowid // 2)
+                if obj is None:
+                    continue
+                kind = 'comment'
+            else:
+                obj, kind = post, 'post'
+            data.append({
+                'type': kind,
+                'id': obj.id,
+                'post_id': post.id,
+                'title': post.title,
+                'snippet': make_snippet(obj.content, terms),
+                'created_at': created_at.to_representation(obj.created_at),
+                'score': -rank,
+            })
+        return data
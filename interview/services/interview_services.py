@@ -1,39 +1,40 @@
+from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from interview.models import StudentApplication  # 导入模型
+from interview.service.application_search import ApplicationSearchService
 from django.core.cache import cache
 
 
 """学生申请业务逻辑类"""
 
-def submit_application(data):
+# 必填字段（键名与 Postman 数据一致）及其提示名称
+REQUIRED_FIELDS = {
+    "number": "学号",
+    "grade": "年级",
+    "phone_number": "电话",
+    "gaokao_math": "高考数学成绩",  # 匹配 Postman 中的 "math"
+    "gaokao_english": "高考英语成绩",  # 匹配 Postman 中的 "english"
+    "follow_direction": "发展方向",  # 匹配 Postman 中的 "direction"
+    "email": "邮件"
+}
+
+
+def build_application(data):
         """
-        学生提交申请
+        校验申请数据并构造报名对象（不保存，不检查学号是否已提交），在线提交与批量导入共用
         :param data: 包含申请信息的字典（如 name, number 等）
-        :return: (是否成功, 消息)
+        :return: (报名对象, None) 或 (None, 错误消息)
         """
-        try:
-            # 1. 关键参数校验（非空校验，与 Postman 数据的键名匹配）
-            required_fields = {
-                "number": "学号",
-                "grade": "年级",
-                "phone_number":"电话",
-                "gaokao_math": "高考数学成绩",  # 匹配 Postman 中的 "math"
-                "gaokao_english": "高考英语成绩",  # 匹配 Postman 中的 "english"
-                "follow_direction": "发展方向" , # 匹配 Postman 中的 "direction"
-                "email":"邮件"
-            }
-            # 检查必填字段是否缺失
-            for key, field_name in required_fields.items():
-                if not data.get(key):
-                    return False, f"{field_name}不能为空"
+        # 1. 关键参数校验（非空校验）
+        for key, field_name in REQUIRED_FIELDS.items():
+            if not data.get(key):
+                return None, f"{field_name}不能为空"
 
-            # 2. 业务规则：检查学号是否已提交
-            if StudentApplication.objects.filter(number=data["number"]).exists():
-                return False, "该学号已提交过申请"
-
-            # 3. 处理数据（映射到模型字段）
-            application = StudentApplication(
+        # 2. 处理数据（映射到模型字段）
+        try:
+            book_time = data.get("book_time")
+            return StudentApplication(
                 name=data.get("name", ""),  # 可选字段，默认空字符串
                 number=data["number"],
                 grade=data["grade"],
@@ -48,15 +49,35 @@ def submit_application(data):
                 email=data.get("email",""),
                 other_lab=data.get("other_lab",""),
                 future=data.get("future",""),
-                book_time=data.get("book_time") or timezone.now()
-            )
+                book_time=StudentApplication._meta.get_field("book_time").to_python(book_time) if book_time
+                else timezone.now()
+            ), None
+        except (ValueError, ValidationError):
+            return None, "数据格式错误"
+
+
+def submit_application(data):
+        """
+        学生提交申请
+        :param data: 包含申请信息的字典（如 name, number 等）
+        :return: (是否成功, 消息)
+        """
+        try:
+            # 1. 校验并构造报名
+            application, error = build_application(data)
+            if error:
+                return False, error
+
+            # 2. 业务规则：检查学号是否已提交
+            if StudentApplication.objects.filter(number=application.number).exists():
+                return False, "该学号已提交过申请"
 
-            # 4. 保存到数据库
-            application.save()
+            # 3. 保存到数据库，同时写入姓名/学号检索词
+            with transaction.atomic():
+                application.save()
+                ApplicationSearchService.index(application)
             return True, f"申请成功！申请ID：{application.id}"
 
-        except ValueError:
-            return False, "数据格式错误"
         except IntegrityError:
             return False, "数据库错误：数据不符合表结构约束（如字段长度超限）"
         except Exception as e:
@@ -0,0 +1,1640 @@
+import asyncio
+import base64
+import json
+import re
+import tempfile
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, close_old_connections
+from django.db.models.functions import Substr
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import (Post, Comment, Notification, Like, Announcement, NotificationOutbox, NotificationArchive,
+                     PostTombstone, StudentApplication, ApplicationSearchTerm)
+from .serializers import (PostListSerializer, CommentSerializer, NotificationSerializer, AnnouncementSerializer,
+                          post_list_values, comment_values, notification_values, announcement_values,
+                          ApplicationDetailSerializer, application_summary_values)
+from .service.forum import (PostService, CommentService, NotificationService, LikeService, POST_EXCERPT_LENGTH,
+                            OUTBOX_MAX_ATTEMPTS, compute_hot_score, cache_has_atomic_incr)
+from .service.application_import import ApplicationImportService, load_workbook
+from .service.events import NotificationHub, SUBSCRIBER_QUEUE_SIZE
+from .service.application_search import ApplicationSearchService, application_terms
+from .service.search import SearchService, build_match_query, make_snippet, SEARCH_TABLE
+from .services.interview_services import submit_application
+from .throttling import UserRateThrottle
+from .views import notification_stream
+
+# 统计数据库查询次数的测试使用进程内缓存，不把数据库缓存表的读写计入查询次数
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', '仅在 SQLite 上检查执行计划')
+class QueryPlanTests(TestCase):
+    """
+    服务层查询的执行计划回归测试
+    - 捕获每个服务方法实际执行的 SQL，逐条运行 EXPLAIN QUERY PLAN
+    - 出现不走索引的全表扫描（SCAN <表名>）即失败
+    """
+
+    FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = 'author-1'
+        cls.reader = 'reader-1'
+        cls.post = Post.objects.create(title='标题', content='内容', user_id=cls.author)
+        Post.objects.create(title='置顶', content='内容', user_id=cls.author, is_sticky=True)
+        cls.comment = Comment.objects.create(post_id=cls.post.id, user_id=cls.reader, content='评论')
+        cls.notification = Notification.objects.create(
+            recipient_user_id=cls.author, sender_user_id=cls.reader,
+            notification_type='reply', message='回复', post_id=cls.post.id,
+        )
+        Like.objects.create(user_id=cls.reader, post_id=cls.post.id)
+        cls.announcement = Announcement.objects.create(message='广播')
+        NotificationService.create_announcement('定向', [cls.author])
+
+    def setUp(self):
+        # 帖子列表有缓存，清空以保证每次调用都真正执行查询
+        cache.clear()
+
+    def assertNoFullScan(self, func, *args):
+        with CaptureQueriesContext(connection) as ctx:
+            func(*args)
+        statements = [q['sql'] for q in ctx.captured_queries
+                      if q['sql'].lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE'))]
+        self.assertTrue(statements, f'{func.__qualname__} 未执行任何查询')
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                details = [row[-1] for row in cursor.fetchall()]
+                scans = [d for d in details if self.FULL_SCAN.match(d)]
+                self.assertFalse(scans, f'{func.__qualname__} 出现全表扫描:\n{sql}\n{details}')
+
+    def test_post_queries(self):
+        self.assertNoFullScan(PostService.get_posts, 1, 10, self.reader)
+        self.assertNoFullScan(PostService.get_posts, 2, 1)
+        self.assertNoFullScan(PostService.get_post_detail, self.post.id)
+        self.assertNoFullScan(PostService.get_post_detail, self.post.id, {'comments', 'likes'}, self.reader)
+        self.assertNoFullScan(PostService.get_posts_by_cursor, '', 1, True)
+        cursor = PostService.get_posts_by_cursor('', 1)['pagination']['next_cursor']
+        self.assertNoFullScan(PostService.get_posts_by_cursor, cursor, 10)
+        # 游标翻页必须是索引范围查找，而不是从头顺序扫描索引
+        with CaptureQueriesContext(connection) as ctx:
+            PostService.get_posts_by_cursor(cursor, 10)
+        with connection.cursor() as db_cursor:
+            for query in ctx.captured_queries:
+                db_cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                details = [row[-1] for row in db_cursor.fetchall()]
+                self.assertTrue(any(d.startswith('SEARCH interview_post') for d in details), details)
+
+    def test_hot_feed_queries(self):
+        self.assertNoFullScan(PostService.get_posts, 1, 10, None, None, 'hot')
+        cursor = PostService.get_posts_by_cursor('', 1, sort='hot')['pagination']['next_cursor']
+        self.assertNoFullScan(PostService.get_posts_by_cursor, cursor, 10, False, None, None, 'hot')
+        with CaptureQueriesContext(connection) as ctx:
+            PostService.get_posts(1, 10, sort='hot')
+        with connection.cursor() as db_cursor:
+            for query in ctx.captured_queries:
+                if 'ORDER BY' in query['sql']:
+                    db_cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                    details = [row[-1] for row in db_cursor.fetchall()]
+                    self.assertTrue(any('post_sticky_hot_idx' in d for d in details), details)
+                    self.assertFalse(any('TEMP B-TREE' in d for d in details), details)
+
+    def test_comment_queries(self):
+        self.assertNoFullScan(CommentService.get_comments, self.post.id, 1, 20, self.reader)
+        self.assertNoFullScan(CommentService.get_comment_tree, self.post.id)
+        self.assertNoFullScan(
+            CommentService.create_comment, self.post.id,
+            {'content': '回复', 'parent_comment_id': self.comment.id}, 'reader-2',
+        )
+        self.assertNoFullScan(NotificationService.process_outbox)
+
+    def test_notification_queries(self):
+        self.assertNoFullScan(NotificationService.get_notifications, self.author)
+        self.assertNoFullScan(NotificationService.get_notifications, self.author, 1, 10, True)
+        self.assertNoFullScan(NotificationService.get_unread_count, self.author)
+        self.assertNoFullScan(NotificationService.mark_notification_read, self.notification.id, self.author)
+        self.assertNoFullScan(NotificationService.mark_notifications_read, [self.notification.id, 0], self.author)
+        self.assertNoFullScan(NotificationService.mark_announcement_read, self.announcement.id, self.author)
+        self.assertNoFullScan(NotificationService.mark_all_notifications_read, self.author)
+
+    def test_like_queries(self):
+        self.assertNoFullScan(LikeService.toggle_like_post, self.post.id, self.reader)
+        self.assertNoFullScan(LikeService.toggle_like_post, self.post.id, self.reader)
+        self.assertNoFullScan(LikeService.toggle_like_comment, self.comment.id, self.author)
+        self.assertNoFullScan(LikeService.toggle_like_comment, self.comment.id, self.author)
+        self.assertNoFullScan(LikeService.get_like_states, self.reader, [self.post.id], [self.comment.id])
+
+
+class LikeCountTests(TestCase):
+    """点赞计数与 liked 标记"""
+
+    def setUp(self):
+        cache.clear()
+        self.viewer = 'viewer-1'
+        self.posts = [Post.objects.create(title=f'帖子{i}', content='内容', user_id='author') for i in range(20)]
+        self.comments = [Comment.objects.create(post_id=self.posts[0].id, content=f'评论{i}') for i in range(20)]
+
+    def test_toggle_maintains_counts(self):
+        post, comment = self.posts[0], self.comments[0]
+        self.assertTrue(LikeService.toggle_like_post(post.id, self.viewer)['liked'])
+        LikeService.toggle_like_post(post.id, 'viewer-2')
+        self.assertTrue(LikeService.toggle_like_comment(comment.id, self.viewer)['liked'])
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual((post.like_count, comment.like_count), (2, 1))
+
+        self.assertFalse(LikeService.toggle_like_post(post.id, self.viewer)['liked'])
+        self.assertFalse(LikeService.toggle_like_comment(comment.id, self.viewer)['liked'])
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual((post.like_count, comment.like_count), (1, 0))
+
+    def test_list_pages_use_constant_queries(self):
+        for post in self.posts[::2]:
+            LikeService.toggle_like_post(post.id, self.viewer)
+        for comment in self.comments[::3]:
+            LikeService.toggle_like_comment(comment.id, self.viewer)
+
+        # COUNT + 当前页 + 一次 liked IN 查询
+        with self.assertNumQueries(3):
+            posts = PostService.get_posts(1, 20, self.viewer)['data']
+        with self.assertNumQueries(3):
+            comments = CommentService.get_comments(self.posts[0].id, 1, 20, self.viewer)['data']
+
+        liked_posts = {p.id for p in self.posts[::2]}
+        self.assertEqual({p['id'] for p in posts if p['liked']}, liked_posts)
+        self.assertEqual(sum(c['liked'] for c in comments), len(self.comments[::3]))
+
+
+class CommentCountTests(TestCase):
+    """评论计数的原子增减与重新统计"""
+
+    def setUp(self):
+        cache.clear()
+        self.posts = [PostService.create_post({'title': f'帖子{i}', 'content': '内容'}, 'author')['data']['id']
+                      for i in range(2)]
+
+    def comment(self, post_id):
+        return CommentService.create_comment(post_id, {'content': '评论'}, 'reader')['data']['id']
+
+    def counts(self):
+        return list(Post.objects.filter(pk__in=self.posts).order_by('id').values_list('comment_count', flat=True))
+
+    def test_create_increments_relative_to_stored_count(self):
+        # 递增基于数据库中的当前值，而不是读取后写回的绝对值
+        Post.objects.filter(pk=self.posts[0]).update(comment_count=5)
+        self.comment(self.posts[0])
+        self.comment(self.posts[1])
+        self.assertEqual(self.counts(), [6, 1])
+
+    def test_delete_comments_decrements_per_post(self):
+        ids = [self.comment(self.posts[0]), self.comment(self.posts[0]), self.comment(self.posts[1])]
+        version = PostService.get_feed_version()
+        self.assertEqual(CommentService.delete_comments([ids[0], ids[2], 0]), 2)
+        self.assertEqual(self.counts(), [1, 0])
+        self.assertNotEqual(PostService.get_feed_version(), version)
+        self.assertEqual(CommentService.delete_comments([ids[0]]), 0)
+
+        # 计数已漂移为 0 时不会减成负数
+        Post.objects.filter(pk=self.posts[0]).update(comment_count=0)
+        CommentService.delete_comments([ids[1]])
+        self.assertEqual(self.counts(), [0, 0])
+
+    def test_admin_delete_endpoint(self):
+        comment_id = self.comment(self.posts[0])
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+        self.assertEqual(self.client.post(f'/admin/forum/comments/{comment_id}/delete/').json(), {'success': True})
+        self.assertEqual(self.counts(), [0, 0])
+        self.assertEqual(self.client.post(f'/admin/forum/comments/{comment_id}/delete/').status_code, 404)
+
+    def test_recount_command(self):
+        self.comment(self.posts[0])
+        Post.objects.update(comment_count=7)
+        out = StringIO()
+        call_command('recount_comment_counts', '--dry-run', stdout=out)
+        self.assertIn('需要修正 2', out.getvalue())
+        self.assertEqual(self.counts(), [7, 7])
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('recount_comment_counts', batch_size=1, stdout=out)
+        self.assertEqual(self.counts(), [1, 0])
+        # 统计与写入在同一条 UPDATE 中完成
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "interview_post"')]
+        self.assertEqual(len(updates), 2)
+        self.assertTrue(all('COUNT(' in sql for sql in updates))
+
+
+class CommentTreeTests(TestCase):
+    """楼中楼评论树：深度与回复数限制、顶层分页"""
+
+    def setUp(self):
+        self.post = Post.objects.create(title='帖子', content='内容', user_id='author')
+        self.start = timezone.now() - timedelta(hours=1)
+        self.seq = 0
+        self.r1 = self.comment()
+        self.a = self.comment(self.r1)
+        self.a1 = self.comment(self.a)
+        self.a2 = self.comment(self.a1)
+        self.b = self.comment(self.r1)
+        self.c = self.comment(self.r1)
+        self.r2 = self.comment()
+        # 父评论不存在或属于其他帖子的回复提升为顶层评论
+        self.orphan = self.comment(parent_id=999999)
+        other = Comment.objects.create(post_id=self.post.id + 1, content='其他帖子')
+        self.foreign = self.comment(parent_id=other.id)
+
+    def comment(self, parent=None, parent_id=0):
+        self.seq += 1
+        return Comment.objects.create(post_id=self.post.id, content=f'评论{self.seq}',
+                                      parent_comment_id=parent.id if parent else parent_id,
+                                      created_at=self.start + timedelta(seconds=self.seq))
+
+    def tree(self, **kwargs):
+        return CommentService.get_comment_tree(self.post.id, **kwargs)
+
+    @staticmethod
+    def ids(nodes):
+        return [node['id'] for node in nodes]
+
+    def test_full_tree(self):
+        result = self.tree()
+        self.assertEqual(self.ids(result['data']), [self.r1.id, self.r2.id, self.orphan.id, self.foreign.id])
+        self.assertEqual(result['total_comments'], 9)
+        root = result['data'][0]
+        self.assertEqual(self.ids(root['replies']), [self.a.id, self.b.id, self.c.id])
+        self.assertEqual((root['reply_count'], root['has_more_replies']), (3, False))
+        a2 = root['replies'][0]['replies'][0]['replies'][0]
+        self.assertEqual((a2['id'], a2['reply_count'], a2['replies']), (self.a2.id, 0, []))
+        self.assertEqual(result['data'][2]['reply_count'], 0)
+
+    def test_max_depth(self):
+        root = self.tree(max_depth=1)['data'][0]
+        self.assertEqual(self.ids(root['replies']), [self.a.id, self.b.id, self.c.id])
+        a = root['replies'][0]
+        self.assertEqual((a['replies'], a['reply_count'], a['has_more_replies']), ([], 1, True))
+
+        root = self.tree(max_depth=0)['data'][0]
+        self.assertEqual((root['replies'], root['reply_count'], root['has_more_replies']), ([], 3, True))
+
+    def test_max_replies(self):
+        root = self.tree(max_replies=2)['data'][0]
+        self.assertEqual(self.ids(root['replies']), [self.a.id, self.b.id])
+        self.assertEqual((root['reply_count'], root['has_more_replies']), (3, True))
+        # 限制作用于每一层，未展开的回复不会被序列化
+        self.assertEqual(self.ids(root['replies'][0]['replies']), [self.a1.id])
+
+    def test_pages_over_top_level_comments(self):
+        first = self.tree(page=1, page_size=2)
+        self.assertEqual(self.ids(first['data']), [self.r1.id, self.r2.id])
+        self.assertEqual(len(first['data'][0]['replies']), 3)
+        self.assertEqual(first['pagination'], {'current_page': 1, 'total_pages': 2, 'total_items': 4, 'page_size': 2})
+        self.assertEqual(self.ids(self.tree(page=2, page_size=2)['data']), [self.orphan.id, self.foreign.id])
+        # 超出范围的页码返回最后一页，非数字页码返回第一页
+        self.assertEqual(self.tree(page=99, page_size=2)['pagination']['current_page'], 2)
+        self.assertEqual(self.tree(page='x', page_size=2)['pagination']['current_page'], 1)
+
+    def test_view(self):
+        url = f'/interview/posts/{self.post.id}/comments/tree/'
+        data = self.client.get(url, {'page_size': 1, 'max_replies': 1}).json()
+        self.assertEqual(self.ids(data['data']), [self.r1.id])
+        self.assertEqual(self.ids(data['data'][0]['replies']), [self.a.id])
+        self.assertEqual(self.client.get(url, {'max_depth': 'x'}).status_code, 400)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class IdempotentLikeTests(TestCase):
+    """点赞的幂等设置接口"""
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(title='标题', content='内容', user_id='author')
+        self.url = f'/interview/posts/{self.post.id}/like/'
+
+    def test_put_and_delete_are_idempotent(self):
+        for _ in range(2):
+            response = self.client.put(self.url, HTTP_X_USER_ID='viewer')
+            self.assertTrue(response.json()['liked'])
+        self.assertFalse(response.json()['changed'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertAlmostEqual(self.post.hot_score, compute_hot_score(0, 1, False, self.post.created_at))
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+        for _ in range(2):
+            response = self.client.delete(self.url, HTTP_X_USER_ID='viewer')
+            self.assertFalse(response.json()['liked'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertEqual(self.client.put('/interview/posts/0/like/', HTTP_X_USER_ID='viewer').status_code, 404)
+
+    def test_like_statements(self):
+        # 帖子 + 插入 + 计数 + 热度分 + 发件箱（含事务保存点）
+        with self.assertNumQueries(7):
+            LikeService.set_like_post(self.post.id, 'viewer', True)
+        # 重复点赞只有帖子查询与被忽略的插入
+        with self.assertNumQueries(4):
+            LikeService.set_like_post(self.post.id, 'viewer', True)
+
+
+class ConcurrentLikeTests(TransactionTestCase):
+    """并发点赞：无错误、无重复记录、计数一致"""
+
+    def test_parallel_toggles(self):
+        post = Post.objects.create(title='标题', content='内容', user_id='author')
+        comment = Comment.objects.create(post_id=post.id, content='评论', user_id='author')
+        users = [f'user-{i}' for i in range(10)]
+
+        def toggle(i):
+            try:
+                if i % 2:
+                    return LikeService.toggle_like_comment(comment.id, users[i % len(users)])['success']
+                return LikeService.toggle_like_post(post.id, users[i % len(users)])['success']
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            self.assertTrue(all(pool.map(toggle, range(300))))
+
+        for model, field, target in ((Post, 'post_id', post), (Comment, 'comment_id', comment)):
+            likes = Like.objects.filter(**{field: target.id})
+            self.assertEqual(likes.count(), likes.values('user_id').distinct().count())
+            target.refresh_from_db()
+            self.assertEqual(target.like_count, likes.count())
+
+
+class ConcurrentUnreadCountTests(TransactionTestCase):
+    """并发标记已读后未读计数与数据库一致（默认的共享缓存与原子的进程内缓存各测一次）"""
+
+    def mark_in_parallel(self):
+        ids = [Notification.objects.create(recipient_user_id='u', notification_type='reply', message=str(i)).id
+               for i in range(60)]
+        self.assertEqual(NotificationService.get_unread_count('u'), 60)
+
+        def mark(notification_id):
+            try:
+                return NotificationService.mark_notification_read(notification_id, 'u')['success']
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            self.assertTrue(all(pool.map(mark, ids[:50])))
+        unread = Notification.objects.filter(recipient_user_id='u', is_read=False).count()
+        self.assertEqual(unread, 10)
+        self.assertEqual(NotificationService.get_unread_count('u'), unread)
+
+    def test_default_cache(self):
+        # 数据库缓存的 incr 先读后写，计数不经缓存维护
+        self.assertFalse(cache_has_atomic_incr())
+        cache.clear()
+        self.mark_in_parallel()
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_atomic_cache(self):
+        self.assertTrue(cache_has_atomic_incr())
+        cache.clear()
+        self.mark_in_parallel()
+
+
+class ListProjectionTests(TestCase):
+    """列表只返回摘要，支持稀疏字段集"""
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(title='长帖', content='正文' * 1000, user_id='author')
+        Comment.objects.create(post_id=self.post.id, user_id='reader', content='评论')
+        Notification.objects.create(recipient_user_id='author', notification_type='reply', message='回复')
+        NotificationService.create_announcement('广播')
+
+    def test_post_list_returns_excerpt_without_body(self):
+        item = PostService.get_posts(1, 10)['data'][0]
+        self.assertNotIn('content', item)
+        self.assertEqual(item['excerpt'], self.post.content[:POST_EXCERPT_LENGTH])
+        item = PostService.get_posts_by_cursor('', 10)['data'][0]
+        self.assertEqual(item['excerpt'], self.post.content[:POST_EXCERPT_LENGTH])
+        self.assertEqual(PostService.get_post_detail(self.post.id)['data']['content'], self.post.content)
+
+    def test_sparse_fields_select_only_requested_columns(self):
+        fields = frozenset({'id', 'title'})
+        with CaptureQueriesContext(connection) as ctx:
+            data = PostService.get_posts(1, 20, 'viewer', fields=fields)['data']
+        self.assertEqual(data, [{'id': self.post.id, 'title': '长帖'}])
+        self.assertFalse([q for q in ctx.captured_queries if 'content' in q['sql']])
+        self.assertFalse([q for q in ctx.captured_queries if 'interview_like' in q['sql']])
+
+        # 默认页走缓存，同样按字段裁剪
+        self.assertEqual(PostService.get_posts(1, 10, fields=fields)['data'], data)
+        self.assertEqual(PostService.get_posts_by_cursor('', 10, fields=fields)['data'], data)
+
+        comments = CommentService.get_comments(self.post.id, fields=frozenset({'id', 'liked'}))['data']
+        self.assertEqual(list(comments[0]), ['id', 'liked'])
+
+        notifications = NotificationService.get_notifications(
+            'author', fields=frozenset({'notification_type', 'message'}))['data']
+        self.assertEqual(notifications, [
+            {'notification_type': 'announcement', 'message': '广播'},
+            {'notification_type': 'reply', 'message': '回复'},
+        ])
+
+
+class ValuesSerializerTests(TestCase):
+    """快速序列化器的输出与 ModelSerializer 逐字节一致"""
+
+    def setUp(self):
+        post = Post.objects.create(title='标题', content='正文' * 100, user_id=None, is_sticky=True)
+        Post.objects.create(title='第二篇', content='短', user_id='author')
+        Comment.objects.create(post_id=post.id, user_id=None, content='评论', parent_comment_id=0)
+        Notification.objects.create(recipient_user_id='author', notification_type='like', message='赞', post_id=post.id)
+        Announcement.objects.create(message='广播', sender_user_id=None)
+
+    def assertSameBytes(self, serializer_class, values, queryset, fields=None):
+        expected = serializer_class(queryset, many=True, **({} if fields is None else {'fields': fields})).data
+        actual = values.serialize_rows(queryset.values_list(*values.columns(fields)), fields)
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_output_matches_model_serializers(self):
+        posts = Post.objects.annotate(excerpt=Substr('content', 1, POST_EXCERPT_LENGTH))
+        self.assertSameBytes(PostListSerializer, post_list_values, posts)
+        self.assertSameBytes(PostListSerializer, post_list_values, posts, frozenset({'created_at', 'title'}))
+        self.assertSameBytes(CommentSerializer, comment_values, Comment.objects.all())
+        self.assertSameBytes(NotificationSerializer, notification_values, Notification.objects.all())
+        self.assertSameBytes(AnnouncementSerializer, announcement_values, Announcement.objects.all())
+
+    def test_serialize_objects(self):
+        comment = Comment.objects.get()
+        self.assertEqual(comment_values.serialize_objects([comment]), [dict(CommentSerializer(comment).data)])
+
+
+class CursorPaginationTests(TestCase):
+    """帖子列表游标分页"""
+
+    def setUp(self):
+        cache.clear()
+        now = timezone.now().replace(microsecond=0)
+        same = now - timedelta(hours=2)
+        # 置顶帖时间早于普通帖；三条普通帖发帖时间完全相同，只能靠 id 区分先后
+        rows = [(True, now - timedelta(days=3)), (True, now - timedelta(days=2)),
+                (False, now), (False, same), (False, same), (False, same), (False, now - timedelta(days=1))]
+        for i, (is_sticky, created_at) in enumerate(rows):
+            Post.objects.create(title=f'帖子{i}', content='内容', user_id='a', is_sticky=is_sticky, created_at=created_at)
+        self.expected = list(Post.objects.order_by('-is_sticky', '-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, page_size):
+        ids, cursor, pages = [], '', 0
+        while True:
+            response = self.client.get('/interview/posts/', {'cursor': cursor, 'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            ids += [item['id'] for item in body['data']]
+            pages += 1
+            self.assertEqual(body['pagination']['has_more'], body['pagination']['next_cursor'] is not None)
+            cursor = body['pagination']['next_cursor']
+            if not cursor:
+                return ids, pages
+
+    def test_walk_crosses_sticky_boundary_and_ties(self):
+        # 页大小 1~3 使每一页的边界分别落在置顶/普通分组之间和同一时间的帖子之间
+        for page_size in (1, 2, 3):
+            ids, pages = self.walk(page_size)
+            self.assertEqual(ids, self.expected, page_size)
+            self.assertEqual(pages, -(-len(self.expected) // page_size))
+
+    def test_with_total(self):
+        first = PostService.get_posts_by_cursor('', 2)
+        self.assertNotIn('total_items', first['pagination'])
+        result = PostService.get_posts_by_cursor(first['pagination']['next_cursor'], 2, with_total=True)
+        self.assertEqual(result['pagination']['total_items'], 7)
+        response = self.client.get('/interview/posts/', {'cursor': '', 'with_total': 'true'})
+        self.assertEqual(response.json()['pagination']['total_items'], 7)
+
+    def test_malformed_cursor(self):
+        encode = PostService.encode_cursor
+        bad = ['not-base64!', 'e30', encode((False, 'yesterday', 1)), encode((False, 1.5, 1)),
+               base64.urlsafe_b64encode(b'\xff\xfe').decode(), base64.urlsafe_b64encode(b'[1, 2]').decode()]
+        for cursor in bad:
+            response = self.client.get('/interview/posts/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertEqual(response.json(), {'success': False, 'message': 'cursor 参数无效'})
+        # latest 的游标不能用于 hot 排序
+        latest_cursor = PostService.get_posts_by_cursor('', 1)['pagination']['next_cursor']
+        response = self.client.get('/interview/posts/', {'cursor': latest_cursor, 'sort': 'hot'})
+        self.assertEqual(response.status_code, 400)
+
+
+class FeedCacheTests(TestCase):
+    """帖子列表版本化缓存：命中与各写操作后的失效（使用默认的共享缓存）"""
+
+    def setUp(self):
+        cache.clear()
+        self.posts = [PostService.create_post({'title': f'帖子{i}', 'content': '内容'}, 'author')['data']['id']
+                      for i in range(2)]
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+
+    def feed(self):
+        return {item['id']: item for item in PostService.get_posts(1, 10)['data']}
+
+    def test_cache_hit(self):
+        self.feed()
+        # 绕过服务层直接改库：版本号不变，仍返回缓存中的列表，且不查询帖子表
+        Post.objects.filter(pk=self.posts[0]).update(title='已修改')
+        with CaptureQueriesContext(connection) as queries:
+            feed = self.feed()
+        self.assertEqual(feed[self.posts[0]]['title'], '帖子0')
+        self.assertFalse([q for q in queries.captured_queries if 'FROM "interview_post"' in q['sql']])
+        # 不走缓存的页大小直接查询
+        self.assertEqual(PostService.get_posts(1, 5)['data'][1]['title'], '已修改')
+        PostService.bump_feed_version()
+        self.assertEqual(self.feed()[self.posts[0]]['title'], '已修改')
+
+    def test_create_post_and_comment_invalidate(self):
+        self.feed()
+        new_id = PostService.create_post({'title': '新帖', 'content': '内容'}, 'author')['data']['id']
+        self.assertIn(new_id, self.feed())
+        CommentService.create_comment(self.posts[0], {'content': '评论'}, 'reader')
+        self.assertEqual(self.feed()[self.posts[0]]['comment_count'], 1)
+
+    def test_admin_actions_invalidate(self):
+        self.feed()
+        self.assertTrue(self.client.post(f'/admin/forum/posts/{self.posts[0]}/pin/').json()['is_sticky'])
+        feed = self.feed()
+        self.assertTrue(feed[self.posts[0]]['is_sticky'])
+        self.assertEqual(next(iter(feed)), self.posts[0])
+
+        self.assertTrue(self.client.post(f'/admin/forum/posts/{self.posts[1]}/feature/').json()['is_featured'])
+        self.assertTrue(self.feed()[self.posts[1]]['is_featured'])
+
+        self.assertEqual(self.client.post(f'/admin/forum/posts/{self.posts[1]}/delete/').status_code, 200)
+        self.assertNotIn(self.posts[1], self.feed())
+
+
+class HotFeedTests(TestCase):
+    """热度分增量维护与热门列表"""
+
+    def setUp(self):
+        cache.clear()
+        self.old = PostService.create_post({'title': '旧帖', 'content': '内容'}, 'a')['data']
+        self.new = PostService.create_post({'title': '新帖', 'content': '内容'}, 'b')['data']
+
+    def hot_ids(self):
+        return [item['id'] for item in PostService.get_posts(1, 10, sort='hot')['data']]
+
+    def assertScoreMatchesBatch(self, post_id):
+        post = Post.objects.get(pk=post_id)
+        expected = compute_hot_score(post.comment_count, post.like_count, post.is_featured, post.created_at)
+        self.assertAlmostEqual(post.hot_score, expected, places=9)
+
+    def test_activity_refreshes_score(self):
+        Post.objects.filter(pk=self.old['id']).update(created_at=timezone.now() - timedelta(hours=24))
+        PostService.refresh_hot_score(self.old['id'])
+        self.assertEqual(self.hot_ids(), [self.new['id'], self.old['id']])
+
+        # 一天前的帖子需要约两倍互动才能追上新帖
+        CommentService.create_comment(self.old['id'], {'content': '评论'}, 'c')
+        LikeService.toggle_like_post(self.old['id'], 'd')
+        self.assertScoreMatchesBatch(self.old['id'])
+        self.assertEqual(self.hot_ids(), [self.old['id'], self.new['id']])
+
+        comment_id = Comment.objects.get(post_id=self.old['id']).id
+        CommentService.delete_comments([comment_id])
+        LikeService.toggle_like_post(self.old['id'], 'd')
+        self.assertScoreMatchesBatch(self.old['id'])
+        self.assertEqual(self.hot_ids(), [self.new['id'], self.old['id']])
+
+    def test_batch_recompute_and_cursor(self):
+        Post.objects.update(hot_score=0)
+        call_command('recompute_hot_scores', batch_size=1, stdout=StringIO())
+        self.assertScoreMatchesBatch(self.old['id'])
+        self.assertScoreMatchesBatch(self.new['id'])
+
+        first = PostService.get_posts_by_cursor('', 1, sort='hot')
+        second = PostService.get_posts_by_cursor(first['pagination']['next_cursor'], 1, sort='hot')
+        self.assertEqual([first['data'][0]['id'], second['data'][0]['id']], [self.new['id'], self.old['id']])
+        self.assertFalse(PostService.get_posts_by_cursor(first['pagination']['next_cursor'], 1)['success'])
+        self.assertEqual(self.client.get('/interview/posts/', {'sort': 'oldest'}).status_code, 400)
+
+    def test_score_is_internal(self):
+        # 热度分只用于排序：不出现在列表与详情中，创建时传入的值被忽略
+        created = PostService.create_post({'title': '刷分', 'content': '内容', 'hot_score': 1e9}, 'c')['data']
+        self.assertNotIn('hot_score', created)
+        self.assertScoreMatchesBatch(created['id'])
+        self.assertNotIn('hot_score', PostService.get_post_detail(created['id'])['data'])
+        for sort in ('latest', 'hot'):
+            item = PostService.get_posts_by_cursor('', 10, sort=sort)['data'][0]
+            self.assertNotIn('hot_score', item)
+
+    def test_batch_recompute_fixes_like_count(self):
+        LikeService.toggle_like_post(self.old['id'], 'd')
+        Post.objects.filter(pk=self.old['id']).update(like_count=5, hot_score=0)
+        out = StringIO()
+        call_command('recompute_hot_scores', stdout=out)
+        post = Post.objects.get(pk=self.old['id'])
+        self.assertEqual(post.like_count, 1)
+        self.assertScoreMatchesBatch(self.old['id'])
+        self.assertIn('修正 1 个点赞数，更新 1 个热度分', out.getvalue())
+
+        out = StringIO()
+        call_command('recompute_hot_scores', stdout=out)
+        self.assertIn('修正 0 个点赞数，更新 0 个热度分', out.getvalue())
+
+
+class PostDetailIncludeTests(TestCase):
+    """帖子详情附带评论与点赞状态"""
+
+    def setUp(self):
+        cache.clear()
+        self.viewer = 'viewer-1'
+        self.post = PostService.create_post({'title': '标题', 'content': '正文'}, 'author')['data']
+        for i in range(25):
+            CommentService.create_comment(self.post['id'], {'content': f'评论{i}'}, f'user-{i}')
+        self.comments = list(Comment.objects.filter(post_id=self.post['id']).order_by('created_at'))
+        LikeService.toggle_like_post(self.post['id'], self.viewer)
+        for comment in self.comments[:3]:
+            LikeService.toggle_like_comment(comment.id, self.viewer)
+        LikeService.toggle_like_comment(self.comments[0].id, 'someone-else')
+
+    def test_one_round_trip_with_fixed_queries(self):
+        # 帖子 + 第一页评论 + 一次点赞状态查询
+        with self.assertNumQueries(3):
+            result = PostService.get_post_detail(self.post['id'], {'comments', 'likes'}, self.viewer)
+        self.assertEqual(result['data']['content'], '正文')
+        self.assertTrue(result['data']['liked'])
+        self.assertEqual(result['data']['like_count'], 1)
+        comments = result['comments']['data']
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(result['comments']['pagination']['total_items'], 25)
+        self.assertEqual([c['liked'] for c in comments[:4]], [True, True, True, False])
+        self.assertEqual(comments[0]['like_count'], 2)
+        self.assertEqual(comments, CommentService.get_comments(self.post['id'], 1, 20, self.viewer)['data'])
+
+        with self.assertNumQueries(2):
+            anonymous = PostService.get_post_detail(self.post['id'], {'comments', 'likes'})
+        self.assertFalse(anonymous['data']['liked'])
+        self.assertNotIn('comments', PostService.get_post_detail(self.post['id'])['data'])
+
+    def test_endpoint_revalidates_on_comment_likes(self):
+        url = f"/interview/posts/{self.post['id']}/"
+        first = self.client.get(url, {'include': 'comments,likes'}, HTTP_X_USER_ID=self.viewer)
+        self.assertEqual(len(first.json()['comments']['data']), 20)
+        LikeService.toggle_like_comment(self.comments[5].id, self.viewer)
+        again = self.client.get(url, {'include': 'comments,likes'}, HTTP_X_USER_ID=self.viewer,
+                                HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertTrue(again.json()['comments']['data'][5]['liked'])
+        self.assertEqual(self.client.get(url, {'include': 'everything'}).status_code, 400)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ConditionalGetTests(TestCase):
+    """帖子列表、详情与评论列表的 ETag / Last-Modified 条件请求"""
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(title='标题', content='内容', user_id='author')
+
+    def assertRevalidates(self, url, change, **headers):
+        first = self.client.get(url, **headers)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('max-age', first['Cache-Control'])
+        self.assertIn('X-User-ID', first['Vary'])
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'], **headers)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], first['ETag'])
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'], **headers).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'], HTTP_X_USER_ID='other').status_code, 200)
+
+        change()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'], **headers)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_post_list(self):
+        url = '/interview/posts/'
+        self.assertRevalidates(url, lambda: PostService.create_post({'title': '新帖', 'content': '内容'}, 'author'))
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url + '?page=2', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_post_detail_changes_with_likes(self):
+        self.assertRevalidates(
+            f'/interview/posts/{self.post.id}/', lambda: LikeService.toggle_like_post(self.post.id, 'reader'))
+        self.assertEqual(self.client.get('/interview/posts/0/').status_code, 404)
+
+    def test_comment_list(self):
+        comment = Comment.objects.create(post_id=self.post.id, content='评论')
+        self.assertRevalidates(
+            f'/interview/posts/{self.post.id}/comments/',
+            lambda: LikeService.toggle_like_comment(comment.id, 'reader'),
+            HTTP_X_USER_ID='reader',
+        )
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 索引仅用于 SQLite')
+class SearchTests(TestCase):
+    """FTS5 全文搜索"""
+
+    def setUp(self):
+        self.post = PostService.create_post({'title': '招新面试安排', 'content': '本周六下午进行面试，请准时到场。'}, 'a')['data']
+        self.other = PostService.create_post({'title': 'Python 学习', 'content': 'Django 的 ORM 很好用'}, 'b')['data']
+        self.comment = CommentService.create_comment(self.other['id'], {'content': '面试需要带简历吗'}, 'c')['data']
+
+    def ids(self, q, **kwargs):
+        return [(item['type'], item['id']) for item in SearchService.search(q, **kwargs)['data']]
+
+    def test_chinese_terms_of_any_length(self):
+        self.assertEqual(self.ids('面试安排'), [('post', self.post['id'])])
+        self.assertEqual(set(self.ids('面试')), {('post', self.post['id']), ('comment', self.comment['id'])})
+        self.assertEqual(self.ids('简'), [('comment', self.comment['id'])])
+        self.assertEqual(self.ids('历'), [('comment', self.comment['id'])])
+        self.assertEqual(self.ids('面试 简历'), [('comment', self.comment['id'])])
+        self.assertEqual(self.ids('orm django'), [('post', self.other['id'])])
+        self.assertEqual(self.ids('试安排面'), [])
+
+    def test_title_hits_rank_first_and_snippet_marks_terms(self):
+        data = SearchService.search('面试')['data']
+        self.assertEqual(data[0]['id'], self.post['id'])
+        self.assertIn('<mark>面试</mark>', data[0]['snippet'])
+        self.assertEqual(self.ids('面试', kind='comment'), [('comment', self.comment['id'])])
+
+    def test_snippet_escapes_after_marking(self):
+        # 搜索词不会命中转义产生的实体，含特殊字符的搜索词按原文匹配
+        self.assertEqual(make_snippet('Tom & Jerry <b>"', ['amp', 'lt', 'quot']), 'Tom &amp; Jerry &lt;b&gt;&quot;')
+        self.assertEqual(make_snippet('a<b & AMP', ['amp', '<b']), 'a<mark>&lt;b</mark> &amp; <mark>AMP</mark>')
+
+    def test_cursor_pagination(self):
+        for i in range(5):
+            PostService.create_post({'title': f'面试经验{i}', 'content': '分享'}, 'a')
+        seen, cursor = [], None
+        while True:
+            result = SearchService.search('面试', cursor=cursor, page_size=2)
+            seen += [(item['type'], item['id']) for item in result['data']]
+            cursor = result['pagination']['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+        self.assertFalse(SearchService.search('面试', cursor='bad')['success'])
+
+    def test_index_follows_deletes_and_rebuild(self):
+        CommentService.delete_comments([self.comment['id']])
+        self.assertEqual(self.ids('简历'), [])
+        SearchService.remove_post(self.post['id'])
+        self.assertEqual(self.ids('面试'), [])
+        self.assertEqual(SearchService.rebuild(batch_size=1), 2)
+        self.assertEqual(self.ids('面试'), [('post', self.post['id'])])
+
+    def indexed_rowids(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {SEARCH_TABLE}')
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_sweep_orphans_removes_comment_rows(self):
+        comment_rowid = SearchService.comment_rowid(self.comment['id'])
+        # 旧版删除只删帖子行，评论及其索引行残留
+        Post.objects.filter(pk=self.other['id']).delete()
+        self.assertIn(comment_rowid, self.indexed_rowids())
+        call_command('sweep_orphans', stdout=StringIO())
+        self.assertFalse(Comment.objects.filter(pk=self.comment['id']).exists())
+        self.assertNotIn(comment_rowid, self.indexed_rowids())
+        self.assertEqual(self.ids('简历'), [])
+        self.assertEqual(self.ids('面试'), [('post', self.post['id'])])
+
+    def test_delete_post_removes_comment_rows_in_purge(self):
+        comment_rowid = SearchService.comment_rowid(self.comment['id'])
+        PostService.delete_posts([self.other['id']])
+        # 删除请求只删除帖子的索引行，评论的残留行在结果中被跳过
+        self.assertNotIn(SearchService.post_rowid(self.other['id']), self.indexed_rowids())
+        self.assertIn(comment_rowid, self.indexed_rowids())
+        self.assertEqual(self.ids('简历'), [])
+        while PostService.purge_deleted_posts(batch_size=1):
+            pass
+        self.assertNotIn(comment_rowid, self.indexed_rowids())
+
+    def test_comment_on_deleted_post_is_rejected(self):
+        PostService.delete_posts([self.other['id']])
+        result = CommentService.create_comment(self.other['id'], {'content': '面试'}, 'c')
+        self.assertEqual(result, {'success': False, 'message': '帖子不存在'})
+        response = self.client.post(f"/interview/posts/{self.other['id']}/comments/", {'content': '面试'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Comment.objects.filter(post_id=self.other['id']).count(), 1)
+        self.assertEqual(self.ids('面试', kind='comment'), [])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(build_match_query('a"b 面'), '"a""b" "面"*')
+        self.assertTrue(SearchService.search('"OR" NEAR( *')['success'])
+        self.assertEqual(self.client.get('/interview/search/', {'q': ' '}).status_code, 400)
+        self.assertEqual(self.client.get('/interview/search/', {'q': '面试'}).json()['data'][0]['id'], self.post['id'])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class BatchEndpointTests(TestCase):
+    """批量已读与批量点赞状态"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = 'user-1'
+        self.mine = [Notification.objects.create(recipient_user_id=self.user, notification_type='reply', message=str(i))
+                     for i in range(10)]
+        self.others = Notification.objects.create(recipient_user_id='user-2', notification_type='reply', message='x')
+
+    def test_mark_notifications_read_in_one_update(self):
+        self.assertEqual(NotificationService.get_unread_count(self.user), 10)
+        ids = [n.id for n in self.mine[:5]] + [self.others.id]
+        with self.assertNumQueries(1):
+            self.assertEqual(NotificationService.mark_notifications_read(ids, self.user)['updated'], 5)
+        self.assertFalse(Notification.objects.get(pk=self.others.id).is_read)
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationService.get_unread_count(self.user), 5)
+
+        response = self.client.post('/interview/notifications/read/', {'ids': [n.id for n in self.mine]},
+                                    content_type='application/json', HTTP_X_USER_ID=self.user)
+        self.assertEqual(response.json()['updated'], 5)
+        self.assertEqual(NotificationService.get_unread_count(self.user), 0)
+        self.assertEqual(self.client.post('/interview/notifications/read/', {'ids': 'x'}, content_type='application/json',
+                                          HTTP_X_USER_ID=self.user).status_code, 400)
+
+    def test_single_mark_read_is_one_update(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(NotificationService.mark_notification_read(self.mine[0].id, self.user)['success'])
+        self.assertTrue(NotificationService.mark_notification_read(self.mine[0].id, self.user)['success'])
+        self.assertEqual(NotificationService.mark_notification_read(self.others.id, self.user)['message'], '无权操作此通知')
+        self.assertEqual(NotificationService.mark_notification_read(0, self.user)['message'], '通知不存在')
+
+    def test_like_states_use_two_queries(self):
+        posts = [Post.objects.create(title=str(i), content='c') for i in range(5)]
+        comments = [Comment.objects.create(post_id=posts[0].id, content=str(i)) for i in range(5)]
+        LikeService.toggle_like_post(posts[1].id, self.user)
+        LikeService.toggle_like_post(posts[1].id, 'user-2')
+        LikeService.toggle_like_comment(comments[2].id, self.user)
+
+        with self.assertNumQueries(2):
+            states = LikeService.get_like_states(self.user, [p.id for p in posts] + [0], [c.id for c in comments])
+        self.assertEqual(states['posts'][posts[1].id], {'like_count': 2, 'liked': True})
+        self.assertEqual(states['posts'][posts[0].id], {'like_count': 0, 'liked': False})
+        self.assertNotIn(0, states['posts'])
+        self.assertEqual(sum(s['liked'] for s in states['comments'].values()), 1)
+
+        response = self.client.get('/interview/likes/state/', {'post_ids': f'{posts[1].id}'}, HTTP_X_USER_ID='user-2')
+        self.assertEqual(response.json()['posts'], {str(posts[1].id): {'like_count': 2, 'liked': True}})
+        self.assertEqual(self.client.get('/interview/likes/state/', {'post_ids': 'a'}).status_code, 400)
+
+
+THROTTLE_TEST_RATES = {'post_create': '2/min', 'post_create_ip': '4/min', 'like': '5/min'}
+
+
+@override_settings(REST_FRAMEWORK={'DATETIME_FORMAT': '%Y-%m-%d %H:%M:%S', 'DEFAULT_THROTTLE_RATES': THROTTLE_TEST_RATES})
+class ThrottleTests(TestCase):
+    """写接口限流"""
+
+    def setUp(self):
+        cache.clear()
+        caches['throttle'].clear()
+
+    def create_post(self, user_id):
+        return self.client.post('/interview/posts/', {'title': 't', 'content': 'c'},
+                                content_type='application/json', HTTP_X_USER_ID=user_id)
+
+    def test_post_create_limited_per_user_and_ip(self):
+        self.assertEqual(self.create_post('user-1').status_code, 201)
+        self.assertEqual(self.create_post('user-1').status_code, 201)
+        throttled = self.create_post('user-1')
+        self.assertEqual(throttled.status_code, 429)
+        self.assertGreaterEqual(int(throttled['Retry-After']), 1)
+        # 读请求不受限
+        self.assertEqual(self.client.get('/interview/posts/', HTTP_X_USER_ID='user-1').status_code, 200)
+        # 换一个用户标识仍受同一 IP 的限制
+        self.assertEqual(self.create_post('user-2').status_code, 201)
+        self.assertEqual(self.create_post('user-3').status_code, 429)
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_counters_use_atomic_cache_within_budget(self):
+        # 默认配置下限流计数不写数据库缓存表
+        self.assertIsInstance(UserRateThrottle().cache, LocMemCache)
+        out = StringIO()
+        call_command('bench_throttle', '--requests', '200', '--repeat', '2', stdout=out)
+        self.assertIn('增加耗时', out.getvalue())
+
+    def test_spoofed_headers_do_not_bypass_limits(self):
+        # 每个请求换一个 X-Forwarded-For 和 X-User-ID：按 IP 的限制仍按 REMOTE_ADDR 生效
+        codes = [self.client.post('/interview/posts/', {'title': 't', 'content': 'c'},
+                                  content_type='application/json', HTTP_X_USER_ID=f'user-{i}',
+                                  HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code for i in range(8)]
+        self.assertEqual(codes, [201] * 4 + [429] * 4)
+
+    def test_trusted_proxy_count(self):
+        throttle = type('T', (UserRateThrottle,), {'scope': 'like'})()
+        request = type('Request', (), {'META': {'REMOTE_ADDR': '10.0.0.1',
+                                                'HTTP_X_FORWARDED_FOR': '1.1.1.1, 203.0.113.7'}})()
+        self.assertEqual(throttle.get_ident(request), '10.0.0.1')
+        # 一层可信代理：取代理追加的最右侧地址，客户端自己填写的左侧地址被忽略
+        with override_settings(REST_FRAMEWORK={'NUM_PROXIES': 1}):
+            self.assertEqual(throttle.get_ident(request), '203.0.113.7')
+            request.META['HTTP_X_FORWARDED_FOR'] = '1.1.1.{}, 203.0.113.7'
+            self.assertEqual(throttle.get_ident(request), '203.0.113.7')
+
+    def test_sliding_window_weights_previous_window(self):
+        request = type('Request', (), {'method': 'POST', 'headers': {'X-User-ID': 'u'}, 'META': {}})()
+        throttle = type('T', (UserRateThrottle,), {'scope': 'like'})()
+        throttle.timer = lambda: 1000 * 60 + 30
+        for _ in range(5):
+            self.assertTrue(throttle.allow_request(request, None))
+        self.assertFalse(throttle.allow_request(request, None))
+        self.assertEqual(throttle.wait(), 30)
+
+        # 下一窗口过去一半：上一窗口的 6 次按 3 次计，还剩 2 个名额
+        throttle.timer = lambda: 1001 * 60 + 30
+        self.assertTrue(throttle.allow_request(request, None))
+        self.assertTrue(throttle.allow_request(request, None))
+        self.assertFalse(throttle.allow_request(request, None))
+        self.assertLessEqual(throttle.wait(), 30)
+
+
+class AnnouncementTests(TestCase):
+    """公告只存一行，按用户的已读游标/回执计算未读"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = 'user-1'
+        Notification.objects.create(recipient_user_id=self.user, notification_type='reply', message='回复')
+
+    def test_broadcast_writes_one_row_and_counts_as_unread(self):
+        NotificationService.create_announcement('广播')
+        self.assertEqual(Announcement.objects.count(), 1)
+        self.assertEqual(NotificationService.get_unread_count(self.user), 2)
+        self.assertEqual(NotificationService.get_unread_count('someone-else'), 1)
+
+    def test_targeted_announcement_only_visible_to_recipients(self):
+        NotificationService.create_announcement('定向', [self.user, self.user])
+        self.assertEqual(NotificationService.get_unread_count(self.user), 2)
+        self.assertEqual(NotificationService.get_unread_count('someone-else'), 0)
+
+    def test_read_receipts_and_cursor(self):
+        first = NotificationService.create_announcement('一')['announcement_id']
+        NotificationService.create_announcement('二')
+        NotificationService.mark_announcement_read(first, self.user)
+        self.assertEqual(NotificationService.get_unread_count(self.user), 2)
+
+        NotificationService.mark_all_notifications_read(self.user)
+        self.assertEqual(NotificationService.get_unread_count(self.user), 0)
+
+        NotificationService.create_announcement('三')
+        self.assertEqual(NotificationService.get_unread_count(self.user), 1)
+
+    def test_inbox_merges_notifications_and_announcements(self):
+        NotificationService.create_announcement('广播')
+        result = NotificationService.get_notifications(self.user, 1, 10)
+        self.assertEqual(result['pagination']['total_items'], 2)
+        self.assertEqual([item['notification_type'] for item in result['data']], ['announcement', 'reply'])
+
+        NotificationService.mark_announcement_read(result['data'][0]['announcement_id'], self.user)
+        unread = NotificationService.get_notifications(self.user, 1, 10, unread_only=True)
+        self.assertEqual([item['notification_type'] for item in unread['data']], ['reply'])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class UnreadCountCacheTests(TestCase):
+    """未读计数缓存的增量维护"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = 'author-1'
+        self.post = Post.objects.create(title='标题', content='内容', user_id=self.author)
+
+    def test_counter_follows_writes_without_queries(self):
+        self.assertEqual(NotificationService.get_unread_count(self.author), 0)
+
+        CommentService.create_comment(self.post.id, {'content': '评论'}, 'reader-1')
+        LikeService.toggle_like_post(self.post.id, 'reader-2')
+        NotificationService.process_outbox()
+        self.assertEqual(NotificationService.get_unread_count(self.author), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationService.get_unread_count(self.author), 2)
+
+        notification = Notification.objects.filter(recipient_user_id=self.author).first()
+        NotificationService.mark_notification_read(notification.id, self.author)
+        NotificationService.mark_notification_read(notification.id, self.author)
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationService.get_unread_count(self.author), 1)
+
+        NotificationService.mark_all_notifications_read(self.author)
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationService.get_unread_count(self.author), 0)
+
+    def test_announcement_rebuilds_counter(self):
+        self.assertEqual(NotificationService.get_unread_count(self.author), 0)
+        NotificationService.create_announcement('广播')
+        self.assertEqual(NotificationService.get_unread_count(self.author), 1)
+        self.assertEqual(NotificationService.get_unread_count(self.author), NotificationService.count_unread(self.author))
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class NotificationOutboxTests(TestCase):
+    """通知经发件箱由 worker 批量生成"""
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(title='标题', content='内容', user_id='author')
+        self.parent = Comment.objects.create(post_id=self.post.id, user_id='replied', content='楼主')
+
+    def test_write_path_only_enqueues(self):
+        CommentService.create_comment(self.post.id, {'content': '回复', 'parent_comment_id': self.parent.id}, 'reader')
+        LikeService.toggle_like_comment(self.parent.id, 'reader')
+        LikeService.toggle_like_post(self.post.id, 'author')  # 自己点赞不通知
+        self.assertEqual(Notification.objects.count(), 0)
+        self.assertEqual(NotificationOutbox.objects.count(), 2)
+
+        # 2 个事件生成 3 条通知：帖子作者、被回复者、被点赞评论作者
+        self.assertEqual(NotificationService.process_outbox(), 2)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('recipient_user_id', 'notification_type')),
+            [('author', 'reply'), ('replied', 'like'), ('replied', 'reply')],
+        )
+        self.assertEqual(NotificationService.process_outbox(), 0)
+        self.assertEqual(Notification.objects.count(), 3)
+        # 处理成功的事件已删除，发件箱不会无限增长
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_exhausted_event_marked_failed(self):
+        CommentService.create_comment(self.post.id, {'content': '评论'}, 'reader')
+        with mock.patch.object(NotificationService, '_build_notifications', side_effect=ValueError('坏数据')):
+            for attempt in range(1, OUTBOX_MAX_ATTEMPTS + 1):
+                with self.assertRaises(ValueError):
+                    NotificationService.process_outbox()
+                event = NotificationOutbox.objects.get()
+                self.assertEqual(event.attempts, attempt)
+                self.assertIsNone(event.claimed_by)
+                self.assertEqual(event.failed_at is not None, attempt == OUTBOX_MAX_ATTEMPTS)
+            # 失败事件保留原因，不再被领取
+            self.assertEqual(event.last_error, '坏数据')
+            self.assertEqual(NotificationService.process_outbox(), 0)
+        self.assertEqual(NotificationService.process_outbox(), 0)
+        self.assertEqual(Notification.objects.count(), 0)
+
+    def test_batch_uses_constant_queries(self):
+        for i in range(30):
+            CommentService.create_comment(self.post.id, {'content': f'评论{i}'}, f'reader-{i}')
+        # 选取 + 领取 + 读取事件 + 帖子 + 写入通知 + 删除事件（含事务保存点）
+        with self.assertNumQueries(8):
+            self.assertEqual(NotificationService.process_outbox(batch_size=100), 30)
+        self.assertEqual(Notification.objects.count(), 30)
+
+
+class SharedCacheTests(TestCase):
+    """缓存跨进程共享：通知 worker 的失效对 Web 进程可见"""
+
+    def test_outbox_worker_invalidates_reader_count(self):
+        self.assertNotIsInstance(caches['default'], LocMemCache)
+        post = Post.objects.create(title='标题', content='内容', user_id='author')
+        self.assertEqual(NotificationService.get_unread_count('author'), 0)
+        CommentService.create_comment(post.id, {'content': '评论'}, 'reader')
+
+        # worker 进程使用自己的缓存连接，不接触 Web 进程的缓存对象
+        with mock.patch('interview.service.forum.cache', caches.create_connection('default')):
+            self.assertEqual(NotificationService.process_outbox(), 1)
+        self.assertEqual(NotificationService.get_unread_count('author'), 1)
+
+
+class NotificationStreamTests(SimpleTestCase):
+    """SSE 通知推送：断线续传、缺口重置、定向投递、队列溢出与轮询任务的退出"""
+
+    def setUp(self):
+        self.hub = NotificationHub(buffer_size=3)
+        self.unread = mock.Mock(return_value=2)
+        self.relay = mock.Mock(side_effect=lambda after_id: after_id)
+        for patcher in (
+            mock.patch('interview.views.hub', self.hub),
+            # 连接立即到期：补发和初始计数发送完后流自然结束
+            mock.patch('interview.views.SSE_MAX_LIFETIME_SECONDS', 0),
+            mock.patch('interview.service.events.RELAY_INTERVAL_SECONDS', 0),
+            mock.patch.object(NotificationService, 'get_unread_count', self.unread),
+            mock.patch.object(NotificationService, 'relay_new_notifications', self.relay),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def open_stream(self, headers=None, **params):
+        request = AsyncRequestFactory().get('/interview/notifications/stream/', params, headers=headers)
+        response = await notification_stream(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response.__aiter__()
+
+    async def read_all(self, stream):
+        return self.parse([chunk async for chunk in stream])
+
+    async def stream(self, headers=None, **params):
+        events = await self.read_all(await self.open_stream(headers, **params))
+        await self.relay_stopped()
+        return events
+
+    async def relay_stopped(self):
+        """所有连接结束后，轮询任务随之退出"""
+        if self.hub._relay is not None:
+            await asyncio.wait_for(self.hub._relay, 1)
+        self.assertIsNone(self.hub._relay)
+
+    @staticmethod
+    def parse(chunks):
+        """解析为 (事件名, 事件ID, 数据)，忽略重连间隔与心跳"""
+        events = []
+        for chunk in chunks:
+            text = chunk.decode()
+            if text.startswith(('retry:', ':')):
+                continue
+            fields = dict(line.split(': ', 1) for line in text.strip().split('\n'))
+            events.append((fields['event'], int(fields['id']) if 'id' in fields else None, json.loads(fields['data'])))
+        return events
+
+    async def test_replay_after_last_event_id(self):
+        first = self.hub.publish('u1', 'notification', {'id': 1})
+        self.hub.publish('u2', 'notification', {'id': 2})
+        self.hub.publish(None, 'announcement', {'id': 3})
+        self.hub.publish(frozenset({'u1', 'u3'}), 'announcement', {'id': 4})
+        expected = [('announcement', first + 2, {'id': 3}), ('announcement', first + 3, {'id': 4}),
+                    ('unread_count', None, {'count': 2})]
+        self.assertEqual(await self.stream({'X-User-ID': 'u1', 'Last-Event-ID': str(first)}), expected)
+        # EventSource 无法设置请求头时使用查询参数
+        self.assertEqual(await self.stream(user_id='u1', last_event_id=first), expected)
+        # 首次连接不补发
+        self.assertEqual(await self.stream({'X-User-ID': 'u1'}), [('unread_count', None, {'count': 2})])
+
+    async def test_reset_on_gap(self):
+        ids = [self.hub.publish('u1', 'notification', {'id': i}) for i in range(5)]
+        # 缓冲区只保留最后 3 条，ids[0] 之后的 ids[1] 已被挤出
+        events = await self.stream({'X-User-ID': 'u1', 'Last-Event-ID': str(ids[0])})
+        self.assertEqual(events[0], ('reset', None, {}))
+        self.assertEqual([e[1] for e in events[1:-1]], ids[2:])
+        # 事件ID超出缓冲区（服务重启后计数从头开始）同样要求重新同步
+        events = await self.stream({'X-User-ID': 'u1', 'Last-Event-ID': str(ids[-1] + 100)})
+        self.assertEqual(events, [('reset', None, {}), ('unread_count', None, {'count': 2})])
+        self.assertEqual(await self.stream({'X-User-ID': 'u1', 'Last-Event-ID': 'x'}), [('unread_count', None, {'count': 2})])
+
+    async def test_live_delivery_to_recipients(self):
+        with mock.patch('interview.views.SSE_MAX_LIFETIME_SECONDS', 0.3), \
+                mock.patch('interview.views.SSE_HEARTBEAT_SECONDS', 0.05):
+            stream = await self.open_stream({'X-User-ID': 'u1'})
+            self.assertTrue((await stream.__anext__()).startswith(b'retry:'))
+            self.assertEqual(self.parse([await stream.__anext__()]), [('unread_count', None, {'count': 2})])
+
+            self.hub.publish('u2', 'notification', {'id': 'other'})
+            self.hub.publish(frozenset({'u2', 'u3'}), 'announcement', {'id': 'other-group'})
+            targeted = self.hub.publish(frozenset({'u1', 'u3'}), 'announcement', {'id': 'group'})
+            direct = self.hub.publish('u1', 'notification', {'id': 'mine'})
+            broadcast = self.hub.publish(None, 'announcement', {'id': 'all'})
+            self.unread.return_value = 3
+            events = await self.read_all(stream)
+        self.assertEqual(events, [
+            ('announcement', targeted, {'id': 'group'}),
+            ('unread_count', None, {'count': 3}),
+            ('notification', direct, {'id': 'mine'}),
+            ('announcement', broadcast, {'id': 'all'}),
+        ])
+        await self.relay_stopped()
+        self.assertTrue(self.relay.called)
+
+    async def test_queue_overflow_sends_reset(self):
+        queue = self.hub.subscribe('u1')
+        ids = [self.hub.publish('u1', 'notification', {'id': i}) for i in range(SUBSCRIBER_QUEUE_SIZE + 3)]
+        await asyncio.sleep(0)
+        items = [queue.get_nowait() for _ in range(queue.qsize())]
+        # 队列满时丢弃积压的事件，只留一条 reset，之后的事件照常入队
+        self.assertEqual([(item[0], item[2]) for item in items],
+                         [(ids[SUBSCRIBER_QUEUE_SIZE], 'reset')] + [(i, 'notification') for i in ids[-2:]])
+        self.hub.unsubscribe('u1', queue)
+        await self.relay_stopped()
+
+    async def test_relay_stops_when_last_subscriber_leaves(self):
+        first = self.hub.subscribe('u1')
+        second = self.hub.subscribe('u1')
+        other = self.hub.subscribe('u2')
+        relay = self.hub._relay
+        await asyncio.sleep(0.05)
+        self.assertTrue(self.relay.called)
+        self.hub.unsubscribe('u1', first)
+        self.hub.unsubscribe('u2', other)
+        await asyncio.sleep(0.05)
+        self.assertFalse(relay.done())
+        self.hub.unsubscribe('u1', second)
+        await self.relay_stopped()
+        self.assertTrue(relay.done())
+        # 再次有订阅者时重新启动
+        queue = self.hub.subscribe('u1')
+        self.assertIsNot(self.hub._relay, relay)
+        self.hub.unsubscribe('u1', queue)
+        await self.relay_stopped()
+
+
+class NotificationCompactionTests(TestCase):
+    """点赞通知合并与已读通知归档"""
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(title='标题', content='内容', user_id='author')
+        for i in range(7):
+            LikeService.toggle_like_post(self.post.id, f'reader-{i}')
+        NotificationService.process_outbox()
+
+    def test_collapse_like_notifications(self):
+        other = Post.objects.create(title='另一篇', content='内容', user_id='author')
+        LikeService.toggle_like_post(other.id, 'reader-0')
+        NotificationService.process_outbox()
+        # 其中 3 条已读：已读与未读分别合并
+        read_ids = Notification.objects.filter(post_id=self.post.id).order_by('id').values_list('id', flat=True)[:3]
+        Notification.objects.filter(id__in=list(read_ids)).update(is_read=True)
+        self.assertEqual(NotificationService.get_unread_count('author'), 5)
+
+        out = StringIO()
+        call_command('compact_notifications', '--batch-size', '1', stdout=out)
+        self.assertIn('合并点赞通知 5 条', out.getvalue())
+        rows = {(n.post_id, n.is_read): n for n in Notification.objects.filter(recipient_user_id='author')}
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[(self.post.id, False)].aggregate_count, 4)
+        self.assertEqual(rows[(self.post.id, False)].message, '用户reader-6等4人赞了您的帖子《标题》')
+        self.assertEqual(rows[(self.post.id, True)].aggregate_count, 3)
+        self.assertEqual(rows[(other.id, False)].aggregate_count, 1)
+        self.assertEqual(NotificationService.get_unread_count('author'), 2)
+
+        # 再次合并时已合并的计数会累加
+        LikeService.toggle_like_post(self.post.id, 'reader-7')
+        NotificationService.process_outbox()
+        NotificationService.collapse_like_notifications()
+        self.assertEqual(Notification.objects.get(post_id=self.post.id, is_read=False).message,
+                         '用户reader-7等5人赞了您的帖子《标题》')
+
+    def test_collapse_counts_distinct_senders(self):
+        shared = Post.objects.create(title='共享', content='内容', user_id='author')
+        single = Post.objects.create(title='单人', content='内容', user_id='author')
+        # 取消后再点赞会再产生一条通知，合并时同一用户只算一人
+        for post in (shared, single):
+            for liked in (True, False, True, False, True):
+                LikeService.set_like_post(post.id, 'fan', liked)
+        LikeService.set_like_post(shared.id, 'other', True)
+        NotificationService.process_outbox()
+        self.assertEqual(Notification.objects.filter(post_id=shared.id).count(), 4)
+
+        NotificationService.collapse_like_notifications()
+        kept = Notification.objects.get(post_id=shared.id)
+        self.assertEqual((kept.aggregate_count, kept.message), (2, '用户other等2人赞了您的帖子《共享》'))
+        kept = Notification.objects.get(post_id=single.id)
+        self.assertEqual((kept.aggregate_count, kept.message), (1, '用户fan赞了您的帖子《单人》'))
+
+    def test_archive_read_notifications_in_batches(self):
+        old = timezone.now() - timedelta(days=100)
+        Notification.objects.filter(id__in=list(Notification.objects.values_list('id', flat=True)[:5])).update(
+            created_at=old, is_read=True)
+        Notification.objects.create(recipient_user_id='author', notification_type='reply', message='未读', created_at=old)
+
+        call_command('compact_notifications', '--skip-collapse', '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(NotificationArchive.objects.count(), 5)
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertFalse(Notification.objects.filter(created_at=old, is_read=True).exists())
+
+        Notification.objects.filter(message='未读').update(is_read=True)
+        call_command('compact_notifications', '--skip-collapse', '--delete', stdout=StringIO())
+        self.assertEqual(NotificationArchive.objects.count(), 5)
+        self.assertEqual(Notification.objects.count(), 2)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class BulkModerationTests(TestCase):
+    """管理后台批量管理帖子"""
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+        self.posts = [PostService.create_post({'title': f'帖子{i}', 'content': '内容'}, f'u{i}')['data']['id']
+                      for i in range(4)]
+        CommentService.create_comment(self.posts[0], {'content': '评论'}, 'reader')
+
+    def bulk(self, action, ids):
+        return self.client.post('/admin/forum/posts/bulk/', {'action': action, 'ids': ids},
+                                content_type='application/json')
+
+    def test_single_toggles_do_not_write_counters(self):
+        post_id = self.posts[0]
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.post(f'/admin/forum/posts/{post_id}/pin/').json(),
+                             {'success': True, 'is_sticky': True})
+            self.assertEqual(self.client.post(f'/admin/forum/posts/{post_id}/feature/').json(),
+                             {'success': True, 'is_featured': True})
+        # 只按主键做条件 UPDATE，不把读到的计数写回（并发的 F() 增减不会被覆盖）
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "interview_post"')]
+        self.assertEqual(len(updates), 2)
+        self.assertFalse(any('"comment_count" =' in sql or '"like_count" =' in sql for sql in updates))
+        post = Post.objects.get(pk=post_id)
+        self.assertEqual((post.is_sticky, post.is_featured, post.comment_count), (True, True, 1))
+        self.assertAlmostEqual(post.hot_score, compute_hot_score(1, 0, True, post.created_at))
+
+        self.assertFalse(self.client.post(f'/admin/forum/posts/{post_id}/pin/').json()['is_sticky'])
+        self.assertFalse(self.client.post(f'/admin/forum/posts/{post_id}/feature/').json()['is_featured'])
+        post = Post.objects.get(pk=post_id)
+        self.assertEqual((post.is_sticky, post.is_featured), (False, False))
+        self.assertAlmostEqual(post.hot_score, compute_hot_score(1, 0, False, post.created_at))
+        self.assertEqual(self.client.post('/admin/forum/posts/0/pin/').status_code, 404)
+        self.assertEqual(self.client.post('/admin/forum/posts/0/feature/').status_code, 404)
+
+    def test_actions_report_affected_counts(self):
+        Post.objects.filter(pk=self.posts[0]).update(is_sticky=True)
+        version = PostService.get_feed_version()
+        response = self.bulk('pin', self.posts + [0])
+        self.assertEqual(response.json(), {'success': True, 'action': 'pin', 'requested': 5, 'affected': 3})
+        self.assertEqual(Post.objects.filter(is_sticky=True).count(), 4)
+        self.assertEqual(PostService.get_feed_version(), version + 1)
+
+        self.assertEqual(self.bulk('feature', self.posts[:2]).json()['affected'], 2)
+        self.assertEqual(self.bulk('feature', self.posts[:2]).json()['affected'], 0)
+        for post in Post.objects.filter(pk__in=self.posts):
+            self.assertAlmostEqual(post.hot_score, compute_hot_score(
+                post.comment_count, post.like_count, post.is_featured, post.created_at))
+        self.bulk('unfeature', self.posts)
+        post = Post.objects.get(pk=self.posts[0])
+        self.assertAlmostEqual(post.hot_score, compute_hot_score(1, 0, False, post.created_at))
+
+        # 存在的帖子 + 删除帖子的索引行 + 写入墓碑 + 删除帖子 + 事务保存点（评论不在请求内查询）
+        with self.assertNumQueries(6):
+            PostService.bulk_moderate('delete', self.posts[2:])
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(PostTombstone.objects.count(), 2)
+
+    def test_validation(self):
+        self.assertEqual(self.bulk('archive', self.posts).status_code, 400)
+        self.assertEqual(self.bulk('pin', []).status_code, 400)
+        self.assertEqual(self.bulk('pin', ['1']).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.bulk('pin', self.posts).status_code, 401)
+
+
+class PostPurgeTests(TestCase):
+    """删除帖子写入墓碑，关联数据分批清理"""
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(title='标题', content='内容', user_id='author')
+        self.kept = Post.objects.create(title='保留', content='内容', user_id='author')
+        for post in (self.post, self.kept):
+            for i in range(3):
+                comment = CommentService.create_comment(post.id, {'content': f'评论{i}'}, f'reader-{i}')['data']
+                LikeService.toggle_like_comment(comment['id'], 'author')
+                LikeService.toggle_like_post(post.id, f'reader-{i}')
+        NotificationService.process_outbox()
+
+    def test_delete_tombstones_then_purges_in_batches(self):
+        self.assertEqual(PostService.delete_posts([self.post.id, 0]), 1)
+        self.assertFalse(Post.objects.filter(pk=self.post.id).exists())
+        self.assertTrue(PostTombstone.objects.filter(post_id=self.post.id).exists())
+        self.assertEqual(Comment.objects.filter(post_id=self.post.id).count(), 3)
+
+        out = StringIO()
+        # 命令在每批之前丢弃失效的连接；TestCase 的连接处于事务中，不能真正关闭
+        with mock.patch('interview.management.commands.purge_deleted_posts.close_old_connections') as close, \
+                mock.patch.object(PostService, 'purge_deleted_posts', wraps=PostService.purge_deleted_posts) as purge:
+            call_command('purge_deleted_posts', '--once', '--batch-size', '2', '--sleep', '0', stdout=out)
+        self.assertFalse(PostTombstone.objects.exists())
+        self.assertFalse(Comment.objects.filter(post_id=self.post.id).exists())
+        self.assertFalse(Like.objects.filter(post_id=self.post.id).exists())
+        self.assertFalse(Notification.objects.filter(post_id=self.post.id).exists())
+        self.assertEqual(Like.objects.count(), 6)
+        self.assertEqual(Comment.objects.filter(post_id=self.kept.id).count(), 3)
+        self.assertEqual(NotificationService.get_unread_count('author'), 6)
+        self.assertGreater(purge.call_count, 2)
+        self.assertEqual(close.call_count, purge.call_count)
+
+    def test_sweep_orphans(self):
+        # 旧版删除只删帖子行
+        Post.objects.filter(pk=self.post.id).delete()
+        Like.objects.create(user_id='x', comment_id=0)
+        out = StringIO()
+        call_command('sweep_orphans', '--dry-run', '--batch-size', '4', stdout=out)
+        self.assertIn('评论：发现孤儿 3 条', out.getvalue())
+        self.assertEqual(Comment.objects.filter(post_id=self.post.id).count(), 3)
+
+        out = StringIO()
+        call_command('sweep_orphans', '--batch-size', '4', stdout=out)
+        self.assertIn('点赞：删除孤儿 7 条', out.getvalue())
+        self.assertFalse(Comment.objects.filter(post_id=self.post.id).exists())
+        self.assertFalse(Notification.objects.filter(post_id=self.post.id).exists())
+        self.assertEqual(Like.objects.count(), 6)
+        self.assertEqual(Notification.objects.count(), 9)
+
+
+class ApplicationProjectionTests(TestCase):
+    """管理后台报名列表只查询列表列，详情返回全部字段"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+        self.apps = [StudentApplication.objects.create(
+            name=f'学生{i}', number=f'2024{i:04d}', grade='大一', other_lab='无', reason='理由' * 100,
+            gaokao_math=120, gaokao_english=130) for i in range(3)]
+        ApplicationSearchService.rebuild()
+
+    def test_list_and_search_use_summary_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/applications/', {'page_size': 2})
+        page_sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('"reason"', page_sql)
+        data = response.json()['data']
+        self.assertEqual(set(data[0]), set(application_summary_values.columns()))
+        self.assertEqual(data[0]['id'], self.apps[-1].id)
+        self.assertEqual(response.json()['pagination']['total_items'], 3)
+
+        by_name = self.client.get('/admin/applications/by-name/', {'name': '学生1'}).json()['data']
+        self.assertEqual([row['number'] for row in by_name], ['20240001'])
+        self.assertNotIn('reason', by_name[0])
+        self.assertEqual(self.client.get('/admin/applications/', {'view': 'raw'}).status_code, 400)
+
+    def test_full_view_and_detail_match_serializer(self):
+        expected = ApplicationDetailSerializer(StudentApplication.objects.get(pk=self.apps[0].id)).data
+        detail = self.client.get(f'/admin/applications/{self.apps[0].id}/').json()['data']
+        self.assertEqual(detail, expected)
+        full = self.client.get('/admin/applications/', {'view': 'full', 'page_size': 10}).json()['data']
+        self.assertEqual(full[-1], expected)
+        self.assertEqual(self.client.get('/admin/applications/0/').status_code, 404)
+
+
+class ApplicationSearchTests(TestCase):
+    """报名姓名/学号检索走检索词索引，结果排序并分页"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+
+    def create(self, name, number):
+        response = self.client.post('/admin/applications/create/', {'name': name, 'number': number},
+                                    content_type='application/json')
+        return response.json()['id']
+
+    def test_terms(self):
+        terms = application_terms('张三丰', '2024')
+        self.assertTrue({'n:张', 'n:张三', 'n:三丰', 'd:2', 'd:2024'} <= terms)
+        self.assertNotIn('d:024', terms)
+
+    def test_name_search_ranked_and_paginated(self):
+        contains = self.create('李张三', '20240001')
+        exact = self.create('张三', '20240002')
+        prefix = self.create('张三丰', '20240003')
+        self.create('三丰张', '20240004')  # 二元组 "张三" 不出现
+        self.create('王五', '20240005')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/applications/by-name/', {'name': '张三', 'page_size': 2}).json()
+        self.assertIn('interview_application_search', queries.captured_queries[-1]['sql'])
+        self.assertEqual([row['id'] for row in response['data']], [exact, prefix])
+        self.assertEqual(response['pagination']['total_items'], 3)
+        second = self.client.get('/admin/applications/by-name/', {'name': '张三', 'page_size': 2, 'page': 2}).json()
+        self.assertEqual([row['id'] for row in second['data']], [contains])
+        single = self.client.get('/admin/applications/by-name/', {'name': '丰'}).json()
+        self.assertEqual(single['pagination']['total_items'], 2)
+
+    def test_by_name_validates_paging(self):
+        self.create('张三', '20240001')
+        url = '/admin/applications/by-name/'
+        for params in ({'page': 'x'}, {'page_size': '1.5'}, {'page_size': ''}):
+            response = self.client.get(url, {'name': '张三', **params})
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json()['message'], 'page 和 page_size 必须为整数')
+        # 页大小限制在 1..100 之间
+        self.assertEqual(self.client.get(url, {'name': '张三', 'page_size': 0}).json()['pagination']['page_size'], 1)
+        self.assertEqual(self.client.get(url, {'name': '张三', 'page_size': 10 ** 9}).json()['pagination']['page_size'],
+                         100)
+
+    def test_index_follows_update_and_delete(self):
+        app_id = self.create('张三', '20240001')
+        self.client.post(f'/admin/applications/{app_id}/update/', {'name': '赵六', 'number': '20250001'},
+                         content_type='application/json')
+        self.assertEqual(self.client.get('/admin/applications/by-name/', {'name': '张三'}).json()['data'], [])
+        self.assertEqual(len(self.client.get('/admin/applications/by-name/', {'name': '赵六'}).json()['data']), 1)
+        listed = self.client.get('/admin/applications/', {'keyword': '2025'}).json()['data']
+        self.assertEqual([row['id'] for row in listed], [app_id])
+        self.assertEqual(self.client.get('/admin/applications/', {'keyword': '2024'}).json()['data'], [])
+
+        self.client.post(f'/admin/applications/{app_id}/delete/')
+        self.assertFalse(ApplicationSearchTerm.objects.exists())
+
+    def test_number_prefix_ranks_exact_first(self):
+        older = self.create('甲', '2024')
+        newer = self.create('乙', '20240001')
+        listed = self.client.get('/admin/applications/', {'keyword': '2024'}).json()['data']
+        self.assertEqual([row['id'] for row in listed], [older, newer])
+
+    def test_rebuild_command(self):
+        app = StudentApplication.objects.create(name='张三', number='20240001', grade='大一', gaokao_math=1,
+                                                gaokao_english=1)
+        ApplicationSearchTerm.objects.create(term='n:旧', application_id=app.id + 100)
+        out = StringIO()
+        call_command('rebuild_application_search', stdout=out)
+        self.assertIn('1 条', out.getvalue())
+        self.assertFalse(ApplicationSearchTerm.objects.filter(application_id=app.id + 100).exists())
+        self.assertEqual(set(ApplicationSearchTerm.objects.values_list('term', flat=True)),
+                         application_terms('张三', '20240001'))
+
+
+class ApplicationImportTests(TestCase):
+    """报名批量导入：逐行校验、学号去重、按块批量写入"""
+    HEADER = '姓名,学号,年级,电话,高考数学成绩,高考英语成绩,发展方向,邮件\n'
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+
+    def csv(self, rows):
+        return (self.HEADER + ''.join(f'{name},{number},大一,138,{math},130,后端,a@b.c\n'
+                                      for name, number, math in rows)).encode('utf-8-sig')
+
+    def test_upload_reports_row_errors(self):
+        ok, _ = submit_application({'name': '老生', 'number': '2024', 'grade': '大一', 'phone_number': '1',
+                                    'gaokao_math': '1', 'gaokao_english': '1', 'follow_direction': '后端',
+                                    'email': 'a@b.c'})
+        self.assertTrue(ok)
+        content = self.csv([('张三', '20240001', 120), ('李四', '20240002', 'abc'), ('王五', '', 110),
+                            ('赵六', '20240001', 100), ('老生', '2024', 100)]) + b'\n'
+        response = self.client.post('/admin/applications/import/',
+                                    {'file': SimpleUploadedFile('apps.csv', content)})
+        report = response.json()
+        self.assertEqual((report['total'], report['created'], report['failed']), (5, 1, 4))
+        self.assertEqual([(e['row'], e['message']) for e in report['errors']], [
+            (3, '数据格式错误'), (4, '学号不能为空'), (5, '该学号已提交过申请'), (6, '该学号已提交过申请')])
+        app = StudentApplication.objects.get(number='20240001')
+        self.assertEqual((app.name, app.gaokao_math), ('张三', 120))
+        found = self.client.get('/admin/applications/by-name/', {'name': '张三'}).json()['data']
+        self.assertEqual([row['id'] for row in found], [app.id])
+
+    @unittest.skipUnless(load_workbook, '未安装 openpyxl')
+    def test_upload_xlsx(self):
+        from openpyxl import Workbook
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(self.HEADER.strip().split(','))
+        # 学号、成绩在表格中常为数字单元格，读出后按整数的字符串处理
+        sheet.append(['张三', 20240001, '大一', 13800000000, 120.0, 130, '后端', 'a@b.c'])
+        sheet.append([None] * 8)
+        sheet.append(['李四', '20240002', '大一', '138', '满分', 130, '后端', 'a@b.c'])
+        sheet.append(['王五', 20240003.0, '大二', '139', 110, 125, '前端', 'c@d.e'])
+        content = BytesIO()
+        workbook.save(content)
+
+        response = self.client.post('/admin/applications/import/',
+                                    {'file': SimpleUploadedFile('apps.xlsx', content.getvalue())})
+        report = response.json()
+        self.assertEqual((report['total'], report['created'], report['failed']), (3, 2, 1))
+        self.assertEqual([(e['row'], e['number']) for e in report['errors']], [(4, '20240002')])
+        self.assertEqual(list(StudentApplication.objects.order_by('number')
+                              .values_list('number', 'phone_number', 'gaokao_math')),
+                         [('20240001', '13800000000', 120), ('20240003', '139', 110)])
+
+    def test_multiline_quoted_cell(self):
+        # Excel 导出的单元格内换行（\r\n、\n）与 Unicode 行分隔符都保留在同一个单元格中
+        reason = '喜欢编程\r\n想学后端\n也想学\u2028前端'
+        content = (self.HEADER.strip() + ',报名原因\r\n'
+                   + f'张三,20240001,大一,138,120,130,后端,a@b.c,"{reason}"\r\n'
+                   + '李四,20240002,大一,138,110,130,前端,c@d.e,简短\r\n').encode('utf-8-sig')
+        upload = SimpleUploadedFile('apps.csv', content)
+        report = ApplicationImportService.import_file(upload, 'csv')
+        self.assertEqual((report['total'], report['created'], report['failed']), (2, 2, 0))
+        self.assertEqual(StudentApplication.objects.get(number='20240001').reason, reason)
+        self.assertEqual(StudentApplication.objects.get(number='20240002').reason, '简短')
+        self.assertFalse(upload.closed)
+
+    def test_rejects_bad_files(self):
+        missing = self.client.post('/admin/applications/import/',
+                                   {'file': SimpleUploadedFile('apps.csv', '姓名,学号\n张三,1\n'.encode())})
+        self.assertEqual(missing.status_code, 400)
+        self.assertIn('年级', missing.json()['message'])
+        self.assertEqual(self.client.post('/admin/applications/import/',
+                                          {'file': SimpleUploadedFile('apps.txt', b'x')}).status_code, 400)
+        self.assertEqual(self.client.post('/admin/applications/import/').status_code, 400)
+
+    def test_queries_constant_per_chunk(self):
+        def run(start, count):
+            rows = [(f'学生{i}', f'2024{i:04d}', 120) for i in range(start, start + count)]
+            with CaptureQueriesContext(connection) as queries:
+                report = ApplicationImportService.import_file(BytesIO(self.csv(rows)), 'csv', chunk_size=20)
+            self.assertEqual(report['created'], count)
+            return len(queries)
+
+        self.assertEqual(run(0, 80), 2 * run(100, 40))
+        self.assertEqual(StudentApplication.objects.count(), 120)
+
+    def test_command_and_dry_run(self):
+        with tempfile.NamedTemporaryFile(suffix='.csv') as file:
+            file.write(self.csv([('张三', '20240001', 120), ('李四', '20240002', 'x')]))
+            file.flush()
+            out = StringIO()
+            call_command('import_applications', file.name, '--dry-run', stdout=out)
+            self.assertFalse(StudentApplication.objects.exists())
+            self.assertIn('第 3 行', out.getvalue())
+            call_command('import_applications', file.name, stdout=StringIO())
+        self.assertEqual(list(StudentApplication.objects.values_list('number', flat=True)), ['20240001'])
@@ -0,0 +1,126 @@
+"""
+论坛写接口限流
+- 基于缓存的滑动窗口计数：每个窗口一个计数器，用 cache.add + cache.incr 原子自增，
+  当前请求数按 上一窗口计数 × 未过去的比例 + 当前窗口计数 估算，避免窗口边界处的突发
+- 每个接口同时按用户（X-User-ID，未提供时退化为 IP）和按 IP 限流，速率分别取
+  REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] 中的 <scope> 与 <scope>_ip，未配置的 scope 不限流
+- 客户端 IP 取 REMOTE_ADDR；只有配置了 REST_FRAMEWORK['NUM_PROXIES']（可信反向代理层数）时才从
+  X-Forwarded-For 右侧取代理追加的地址，客户端伪造的 X-Forwarded-For 不会改变限流键
+- 只限制写请求，GET 等安全方法直接放行；超限时 DRF 返回 429 并带 Retry-After
+- 计数存放在 CACHES['throttle']（Redis 或进程内缓存，incr 为原子操作，每个请求增加的耗时低于 1ms），
+  未配置该别名时使用默认缓存
+"""
+import math
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+THROTTLE_CACHE_ALIAS = 'throttle'
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    滑动窗口限流基类，子类实现 get_cache_key
+    - 每次请求三次缓存操作（add、incr、get），不读写时间戳列表，多进程共享缓存时计数也不会丢失；
+      被拒绝时再 decr 一次
+    """
+
+    @property
+    def cache(self):
+        return caches[THROTTLE_CACHE_ALIAS if THROTTLE_CACHE_ALIAS in settings.CACHES else 'default']
+
+    def get_ident(self, request):
+        """
+        客户端 IP：NUM_PROXIES 未配置（None）或为 0 时不信任 X-Forwarded-For
+        （DRF 默认在 NUM_PROXIES 为 None 时直接使用整个 X-Forwarded-For 头，可被客户端任意伪造）
+        """
+        num_proxies = api_settings.NUM_PROXIES
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if num_proxies and forwarded:
+            addrs = [addr.strip() for addr in forwarded.split(',')]
+            return addrs[-min(num_proxies, len(addrs))]
+        return request.META.get('REMOTE_ADDR')
+
+    def get_rate(self):
+        # 每次实例化时读取配置，修改配置（包括测试中的 override_settings）后立即生效
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS or self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        window, elapsed = divmod(now, self.duration)
+        current_key = f'{self.key}:{int(window)}'
+        # 计数器保留两个窗口，下一窗口估算时还要用到
+        self.cache.add(current_key, 0, self.duration * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # add 与 incr 之间计数器被淘汰
+            self.cache.set(current_key, 1, self.duration * 2)
+            current = 1
+        previous = self.cache.get(f'{self.key}:{int(window) - 1}', 0)
+
+        remaining = 1 - elapsed / self.duration
+        if previous * remaining + current <= self.num_requests:
+            return True
+        # 被拒绝的请求不占用名额，客户端按 Retry-After 重试即可恢复
+        try:
+            self.cache.decr(current_key)
+        except ValueError:
+            pass
+
+        # 等待时间：当前窗口已超限时等到窗口结束，否则等上一窗口的权重衰减到留出一个名额
+        if current > self.num_requests or not previous:
+            self.retry_after = self.duration - elapsed
+        else:
+            excess = previous * remaining + current - self.num_requests
+            self.retry_after = min(excess / previous * self.duration, self.duration - elapsed)
+        return False
+
+    def wait(self):
+        return max(1, math.ceil(self.retry_after))
+
+
+class UserRateThrottle(SlidingWindowRateThrottle):
+    """
+    按用户限流：已登录用户按账号，否则按 X-User-ID，都没有时按 IP
+    - X-User-ID 由客户端生成，轮换它可以绕过本限制，总量由同时生效的 IPRateThrottle 兜底
+    """
+
+    def get_cache_key(self, request, view):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            ident = f'account:{user.pk}'
+        else:
+            user_id = request.headers.get('X-User-ID')
+            ident = f'user:{user_id}' if user_id else f'ip:{self.get_ident(request)}'
+        return f'throttle:{self.scope}:{ident}'
+
+
+class IPRateThrottle(SlidingWindowRateThrottle):
+    """按客户端 IP 限流，防止通过伪造 X-User-ID 绕过按用户的限制"""
+
+    def get_cache_key(self, request, view):
+        return f'throttle:{self.scope}:ip:{self.get_ident(request)}'
+
+
+def write_throttles(scope):
+    """
+    生成某个写接口的限流类列表，用于 @throttle_classes
+    :param scope: 限流范围，按用户速率取 scope，按 IP 速率取 scope_ip
+    :return: [按用户限流类, 按 IP 限流类]
+    """
+    name = ''.join(part.title() for part in scope.split('_'))
+    return [
+        type(f'{name}UserRateThrottle', (UserRateThrottle,), {'scope': scope}),
+        type(f'{name}IPRateThrottle', (IPRateThrottle,), {'scope': f'{scope}_ip'}),
+    ]
@@ -8,19 +8,27 @@ urlpatterns = [
 
     # 评论相关API
     path('posts/<int:post_id>/comments/', views.comment_list, name='comment_list'),  # 评论列表和创建
+    path('posts/<int:post_id>/comments/tree/', views.comment_tree, name='comment_tree'),  # 评论树（楼中楼）
+
+    # 搜索API
+    path('search/', views.search, name='search'),  # 帖子与评论全文搜索
 
     # 通知相关API
     path('notifications/', views.notification_list, name='notification_list'),  # 通知列表
     path('notifications/<int:pk>/read/', views.mark_notification_read, name='mark_notification_read'),  # 标记单条通知为已读
+    path('notifications/read/', views.mark_notifications_read, name='mark_notifications_read'),  # 批量标记通知为已读
     path('notifications/read-all/', views.mark_all_notifications_read, name='mark_all_notifications_read'),  # 标记所有通知为已读
     path('notifications/unread-count/', views.notification_unread_count, name='notification_unread_count'),  # 未读计数
+    path('notifications/stream/', views.notification_stream, name='notification_stream'),  # 通知实时推送（SSE）
 
     # 点赞相关API
     path('posts/<int:post_id>/like/', views.post_like_toggle, name='post_like_toggle'),
     path('comments/<int:comment_id>/like/', views.comment_like_toggle, name='comment_like_toggle'),
+    path('likes/state/', views.like_states, name='like_states'),  # 批量点赞状态
 
     # 公告/系统通知
     path('announcements/', views.create_announcement, name='create_announcement'),
+    path('announcements/<int:pk>/read/', views.mark_announcement_read, name='mark_announcement_read'),  # 标记公告为已读
 # 提交相关api
     path("apply/", views.application_form, name="apply"),  # 申请表单
     path("rate/", views.RateApplicationView.as_view(), name="rate"),  # 评分接口
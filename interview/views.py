@@ -1,7 +1,20 @@
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.response import Response
-from .service.forum import PostService, CommentService, NotificationService, LikeService
+from .service.forum import (PostService, CommentService, NotificationService, LikeService, parse_fields, FEED_SORTS,
+                            BATCH_ID_LIMIT, DETAIL_INCLUDES)
+from .service.events import hub, format_event
+from .service.search import SearchService
+from .throttling import write_throttles
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from functools import wraps
+import asyncio
+import hashlib
+import time
 import uuid
 from django.shortcuts import render
 from .services import interview_services
@@ -11,11 +24,90 @@ from django.views import View  # 导入业务逻辑
 from .models import StudentApplication
 
 
+# 可缓存的 GET 响应：反向代理最多直接复用的秒数，过期后携带 If-None-Match 回源校验
+HTTP_CACHE_MAX_AGE = 5
+
+
+def conditional_get(stamp_func):
+    """
+    条件 GET 装饰器（ETag / Last-Modified）
+    - stamp_func(request, *args, **kwargs) 返回 (版本戳, 最后变更时间) 或 None（不做条件处理）
+    - 版本戳与查询参数、X-User-ID 一起计算强 ETag，无需先序列化响应体
+    - If-None-Match / If-Modified-Since 命中时直接返回 304，不执行视图
+    - 响应按 X-User-ID 区分缓存（liked 字段因人而异）
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            stamp = stamp_func(request, *args, **kwargs)
+            if stamp is None:
+                return view(request, *args, **kwargs)
+
+            version, modified = stamp
+            raw = repr((version, modified, request.GET.urlencode(), request.headers.get('X-User-ID', '')))
+            etag = quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest())
+            last_modified = None
+            if modified is not None:
+                if timezone.is_naive(modified):
+                    modified = timezone.make_aware(modified)
+                last_modified = int(modified.timestamp())
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response.headers['ETag'] = etag
+                if last_modified is not None:
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                patch_cache_control(response, public=True, max_age=HTTP_CACHE_MAX_AGE, must_revalidate=True)
+                patch_vary_headers(response, ('X-User-ID',))
+            return response
+        return wrapper
+    return decorator
+
+
+def parse_ids(value):
+    """
+    解析批量接口的ID列表
+    :param value: JSON 数组或逗号分隔的字符串
+    :return: 整数ID列表
+    :raises ValueError: 格式不正确或数量超过 BATCH_ID_LIMIT
+    """
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list):
+        raise ValueError('ids must be a list')
+    ids = [int(v) for v in value]
+    if len(ids) > BATCH_ID_LIMIT:
+        raise ValueError('too many ids')
+    return ids
+
+
+def _post_detail_stamp(request, pk):
+    stamp = PostService.get_post_stamp(pk)
+    if stamp is None:
+        return None
+    modified = stamp[0]
+    # 附带评论时，评论点赞等不影响帖子行的变化由评论列表版本号体现
+    if 'comments' in (parse_fields(request.GET.get('include')) or ()):
+        comments_version, comments_modified = CommentService.get_comments_stamp(pk)
+        stamp += (comments_version, comments_modified)
+        modified = max(modified, comments_modified) if comments_modified else modified
+    return stamp, modified
+
+
 @api_view(['GET', 'POST'])
+@throttle_classes(write_throttles('post_create'))
+@conditional_get(lambda request: PostService.get_feed_stamp())
 def post_list(request):
     """
     帖子列表API视图
-    - GET: 获取帖子列表
+    - GET: 获取帖子列表（列表项只含摘要 excerpt，正文通过帖子详情获取；?fields=id,title 指定返回字段；
+      ?sort=hot 按热度排序，默认 latest 按发帖时间）
     - POST: 创建新帖子
     """
     # 获取或创建用户标识
@@ -27,9 +119,27 @@ def post_list(request):
         # 获取查询参数
         page = request.GET.get('page', 1)
         page_size = request.GET.get('page_size', 10)
+        fields = parse_fields(request.GET.get('fields'))
+        sort = request.GET.get('sort', 'latest')
+        if sort not in FEED_SORTS:
+            return Response({
+                'success': False,
+                'message': 'sort 参数只能为 latest 或 hot'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # 携带 cursor 参数（可为空，表示第一页）时使用游标分页，否则沿用页码分页
+        if 'cursor' in request.GET:
+            with_total = request.GET.get('with_total', 'false').lower() == 'true'
+            result = PostService.get_posts_by_cursor(
+                request.GET.get('cursor'), page_size, with_total,
+                viewer_id=request.headers.get('X-User-ID'), fields=fields, sort=sort)
+            if not result['success']:
+                return Response(result, status=status.HTTP_400_BAD_REQUEST)
+            return Response(result)
 
         # 调用服务层获取帖子列表
-        result = PostService.get_posts(page, page_size)
+        result = PostService.get_posts(
+            page, page_size, viewer_id=request.headers.get('X-User-ID'), fields=fields, sort=sort)
 
         # 返回响应
         return Response(result)
@@ -48,13 +158,22 @@ def post_list(request):
 
 
 @api_view(['GET'])
+@conditional_get(_post_detail_stamp)
 def post_detail(request, pk):
     """
     帖子详情API视图
     - GET: 获取指定帖子的详细信息
+      ?include=comments,likes 同时返回第一页评论、当前用户的点赞状态，打开帖子只需一次请求
     """
+    include = parse_fields(request.GET.get('include')) or frozenset()
+    if not include <= DETAIL_INCLUDES:
+        return Response({
+            'success': False,
+            'message': 'include 参数只能包含 comments、likes'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
     # 调用服务层获取帖子详情
-    result = PostService.get_post_detail(pk)
+    result = PostService.get_post_detail(pk, include, viewer_id=request.headers.get('X-User-ID'))
 
     # 根据操作结果返回响应
     if result['success']:
@@ -64,10 +183,12 @@ def post_detail(request, pk):
 
 
 @api_view(['GET', 'POST'])
+@throttle_classes(write_throttles('comment_create'))
+@conditional_get(lambda request, post_id: CommentService.get_comments_stamp(post_id))
 def comment_list(request, post_id):
     """
     评论列表API视图
-    - GET: 获取指定帖子的评论列表
+    - GET: 获取指定帖子的评论列表（?fields= 指定返回字段）
     - POST: 为指定帖子创建新评论
     """
     # 获取或创建用户标识
@@ -81,7 +202,9 @@ def comment_list(request, post_id):
         page_size = request.GET.get('page_size', 20)
 
         # 调用服务层获取评论列表
-        result = CommentService.get_comments(post_id, page, page_size)
+        result = CommentService.get_comments(
+            post_id, page, page_size, viewer_id=request.headers.get('X-User-ID'),
+            fields=parse_fields(request.GET.get('fields')))
 
         # 返回响应
         return Response(result)
@@ -95,15 +218,57 @@ def comment_list(request, post_id):
             # 添加用户标识到响应中
             result['user_id'] = user_id
             return Response(result, status=status.HTTP_201_CREATED)
+        elif result['message'] == '帖子不存在':
+            return Response(result, status=status.HTTP_404_NOT_FOUND)
         else:
             return Response(result, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+def comment_tree(request, post_id):
+    """
+    评论树API视图
+    - GET: 按顶层评论分页获取指定帖子的评论，回复内联返回
+    """
+    page = request.GET.get('page', 1)
+    page_size = request.GET.get('page_size', 20)
+    try:
+        max_depth = int(request.GET.get('max_depth', 3))
+        max_replies = int(request.GET.get('max_replies', 50))
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'max_depth 和 max_replies 必须为整数'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    result = CommentService.get_comment_tree(
+        post_id, page, page_size, max_depth, max_replies, viewer_id=request.headers.get('X-User-ID'))
+    return Response(result)
+
+
+@api_view(['GET'])
+def search(request):
+    """
+    全文搜索API视图
+    - GET: 按相关度搜索帖子与评论，?q= 搜索词（空格分隔须同时出现），
+      ?type=post|comment 限定类型，?cursor= 翻页
+    """
+    result = SearchService.search(
+        request.GET.get('q', ''),
+        request.GET.get('cursor'),
+        request.GET.get('page_size', 20),
+        request.GET.get('type'),
+    )
+    if not result['success']:
+        return Response(result, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result)
+
+
 @api_view(['GET'])
 def notification_list(request):
     """
     通知列表API视图
-    - GET: 获取当前用户的通知列表
+    - GET: 获取当前用户的通知列表（?fields= 指定返回字段）
     """
     # 获取用户标识
     user_id = request.headers.get('X-User-ID')
@@ -121,7 +286,8 @@ def notification_list(request):
     unread_only = request.GET.get('unread_only', 'false').lower() == 'true'
 
     # 调用服务层获取通知列表
-    result = NotificationService.get_notifications(user_id, page, page_size, unread_only)
+    result = NotificationService.get_notifications(
+        user_id, page, page_size, unread_only, fields=parse_fields(request.GET.get('fields')))
 
     # 返回响应
     return Response(result)
@@ -140,29 +306,129 @@ def notification_unread_count(request):
     return Response({'success': True, 'count': count})
 
 
-@api_view(['POST'])
+# SSE 心跳间隔与单个连接最长存活时间（秒）；到期后由 EventSource 携带 Last-Event-ID 自动重连
+SSE_HEARTBEAT_SECONDS = 15
+SSE_MAX_LIFETIME_SECONDS = 300
+
+
+async def notification_stream(request):
+    """
+    通知实时推送（Server-Sent Events）
+    - GET: 推送新通知、公告与未读计数变化，空闲时发送心跳
+    - EventSource 无法设置请求头，用户标识也可通过 ?user_id= 传入
+    - 支持 Last-Event-ID 续传；缓冲区无法覆盖时发送 reset 事件，客户端应重新拉取列表
+    - 需以 ASGI 方式部署（uvicorn CSECL.asgi:application），空闲连接不占用线程
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'message': '请使用GET方法'}, status=405)
+    user_id = request.headers.get('X-User-ID') or request.GET.get('user_id')
+    if not user_id:
+        return JsonResponse({'success': False, 'message': '未提供用户标识'}, status=400)
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
+
+    get_unread_count = sync_to_async(NotificationService.get_unread_count, thread_sensitive=False)
+
+    async def events():
+        queue = hub.subscribe(user_id)
+        try:
+            yield 'retry: 3000\n\n'
+            sent_id = last_event_id
+            if last_event_id:
+                replay, gap = hub.replay(user_id, last_event_id)
+                if gap:
+                    yield format_event('reset', {})
+                for event_id, _, event, data in replay:
+                    yield format_event(event, data, event_id)
+                    sent_id = event_id
+
+            count = await get_unread_count(user_id)
+            yield format_event('unread_count', {'count': count})
+
+            deadline = time.monotonic() + SSE_MAX_LIFETIME_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    event_id, _, event, data = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                if event_id <= sent_id:
+                    continue  # 订阅后、补发前产生的事件已补发过
+                sent_id = event_id
+                yield format_event(event, data, event_id)
+
+                new_count = await get_unread_count(user_id)
+                if new_count != count:
+                    count = new_count
+                    yield format_event('unread_count', {'count': count})
+        finally:
+            hub.unsubscribe(user_id, queue)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # 关闭反向代理缓冲
+    return response
+
+
+# 点赞接口的请求方法 -> 目标状态：POST 切换；PUT 点赞、DELETE 取消为幂等操作，可安全重试
+LIKE_METHOD_STATES = {'POST': None, 'PUT': True, 'DELETE': False}
+
+
+@api_view(['POST', 'PUT', 'DELETE'])
+@throttle_classes(write_throttles('like'))
 def post_like_toggle(request, post_id):
-    """帖子点赞/取消点赞"""
+    """
+    帖子点赞
+    - POST: 切换点赞状态
+    - PUT: 点赞，DELETE: 取消点赞（重复请求结果不变）
+    """
     user_id = request.headers.get('X-User-ID')
     if not user_id:
         return Response({'success': False, 'message': '未提供用户标识'}, status=status.HTTP_400_BAD_REQUEST)
-    result = LikeService.toggle_like_post(post_id, user_id)
+    result = LikeService.set_like_post(post_id, user_id, LIKE_METHOD_STATES[request.method])
     status_code = status.HTTP_200_OK if result.get('success') else status.HTTP_404_NOT_FOUND
     return Response(result, status=status_code)
 
 
-@api_view(['POST'])
+@api_view(['POST', 'PUT', 'DELETE'])
+@throttle_classes(write_throttles('like'))
 def comment_like_toggle(request, comment_id):
-    """评论点赞/取消点赞"""
+    """
+    评论点赞
+    - POST: 切换点赞状态
+    - PUT: 点赞，DELETE: 取消点赞（重复请求结果不变）
+    """
     user_id = request.headers.get('X-User-ID')
     if not user_id:
         return Response({'success': False, 'message': '未提供用户标识'}, status=status.HTTP_400_BAD_REQUEST)
-    result = LikeService.toggle_like_comment(comment_id, user_id)
+    result = LikeService.set_like_comment(comment_id, user_id, LIKE_METHOD_STATES[request.method])
     status_code = status.HTTP_200_OK if result.get('success') else status.HTTP_404_NOT_FOUND
     return Response(result, status=status_code)
 
 
+@api_view(['GET'])
+def like_states(request):
+    """
+    批量点赞状态API视图
+    - GET: ?post_ids=1,2&comment_ids=3,4，返回各对象的点赞数与当前用户是否已点赞
+    """
+    try:
+        post_ids = parse_ids(request.GET.get('post_ids'))
+        comment_ids = parse_ids(request.GET.get('comment_ids'))
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': f'post_ids / comment_ids 必须为逗号分隔的整数，且各不超过 {BATCH_ID_LIMIT} 个'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    result = LikeService.get_like_states(request.headers.get('X-User-ID'), post_ids, comment_ids)
+    return Response({'success': True, **result})
+
+
 @api_view(['POST'])
+@throttle_classes(write_throttles('announcement'))
 def create_announcement(request):
     """创建公告（广播或定向）。简单版未接权限，后续可加。"""
     user_id = request.headers.get('X-User-ID')  # 作为 sender
@@ -201,6 +467,49 @@ def mark_notification_read(request, pk):
         return Response(result, status=status_code)
 
 
+@api_view(['POST'])
+def mark_notifications_read(request):
+    """
+    批量标记通知为已读API视图
+    - POST: {"ids": [1, 2, 3]}，只标记属于当前用户的通知
+    """
+    user_id = request.headers.get('X-User-ID')
+    if not user_id:
+        return Response({
+            'success': False,
+            'message': '未提供用户标识'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        ids = parse_ids(request.data.get('ids'))
+    except (TypeError, ValueError):
+        return Response({
+            'success': False,
+            'message': f'ids 必须为整数数组，且不超过 {BATCH_ID_LIMIT} 个'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    result = NotificationService.mark_notifications_read(ids, user_id)
+    return Response(result)
+
+
+@api_view(['POST'])
+def mark_announcement_read(request, pk):
+    """
+    标记公告为已读API视图
+    - POST: 将指定公告标记为当前用户已读
+    """
+    user_id = request.headers.get('X-User-ID')
+    if not user_id:
+        return Response({
+            'success': False,
+            'message': '未提供用户标识'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    result = NotificationService.mark_announcement_read(pk, user_id)
+    if result['success']:
+        return Response(result)
+    return Response(result, status=status.HTTP_404_NOT_FOUND)
+
+
 @api_view(['POST'])
 def mark_all_notifications_read(request):
     """